@@ -1,34 +1,9 @@
-import pandas as pd
-import streamlit as st
-import yfinance as yf
-# =====================================================
-# IMPORTS
-# =====================================================
+import functools
+import uuid
 
-from data.universe import get_all_tickers, get_ticker_name_map
-
-from services.data_loader import load_global_energy_data
-from services.preprocessing import preprocess_price_data
-from services.indicators import add_indicators
-from services.forecasting import powerbi_style_forecast
-from services.live_price import get_live_price_snapshot
-from services.fundamentals import load_fundamentals
-from components.metrics import calculate_kpis
-from components.charts import (
-    price_ma_chart,
-    volume_chart,
-    returns_chart,
-    forecast_chart,
-    drawdown_chart,
-    revenue_profit_chart,
-    normalized_comparison_chart,
-)
-from components.yahoo_style_chart import render_stock_chart
+import streamlit as st
 from auth.login import login_page, logout_button
-from utils.helpers import format_number, format_percentage
-from utils.date_filters import filter_by_start_date
-
-
+from utils.startup import measure_imports, get_import_times
 
 # ======================================================='
 # login 
@@ -42,6 +17,88 @@ if not st.session_state["logged_in"]:
     login_page()
     st.stop()
 
+# =====================================================
+# IMPORTS
+# =====================================================
+# Analytics stack is imported only once logged in, so the login
+# screen stays light; modules only one section needs are imported by
+# that section's renderer. Cold import costs show in the sidebar.
+
+with measure_imports("analytics"):
+    import pandas as pd
+
+    from data.universe import (
+        get_all_tickers,
+        get_ticker_name_map,
+        get_ticker_labels,
+        search_instruments,
+        get_benchmark_tickers,
+        BENCHMARKS,
+    )
+
+    from services.data_loader import (
+        ensure_published,
+        load_benchmark_data,
+        get_bootstrap_reports,
+    )
+    from services.preprocessing import preprocess_price_data
+    from services.validation import get_quality_reports
+    from services.query_engine import (
+        query_prices,
+        resample_prices,
+        store_version,
+        ticker_kpis,
+    )
+    from services.indicators import get_indicators
+    from services.live_price import get_live_price_snapshot, get_live_price_snapshots
+    from services.freshness import start_rerun_budget
+    from services.provider import get_stats as get_provider_stats
+    from services.shared_cache import try_shared_cache
+    from services.custom_tickers import fetch_custom_history, quality_key
+    from services.screener import (
+        get_store_snapshot,
+        run_screen,
+        ScreenError,
+        SCREEN_FIELDS,
+    )
+    from services.alerts import get_alert_engine, default_rules, DEFAULT_DROP_PCT
+    from components.metrics import calculate_kpis
+    from components.charts import (
+        price_ma_chart,
+        volume_chart,
+        returns_chart,
+        forecast_chart,
+        drawdown_chart,
+        revenue_profit_chart,
+        normalized_comparison_chart,
+        correlation_heatmap,
+        rolling_correlation_chart,
+        rolling_beta_chart,
+        rolling_r2_chart,
+        var_chart,
+        technical_indicators_chart,
+    )
+    from components.yahoo_style_chart import render_stock_chart
+    from utils.helpers import format_number, format_percentage, format_as_of
+    from utils.date_filters import filter_by_start_date
+
+BETA_WINDOWS = (60, 120, 250)
+VAR_WINDOW = 250
+RERUN_BUDGET_SECONDS = 10.0
+UNIVERSE_TTL_SECONDS = 15 * 60
+FORECAST_SHARED_TTL_SECONDS = 6 * 60 * 60
+SEARCH_LIMIT = 100
+
+# Overview studies -> indicator columns they need
+TECHNICAL_STUDIES = {
+    "Bollinger": ["bb_middle_20", "bb_upper_20", "bb_lower_20"],
+    "RSI": ["rsi_14"],
+    "MACD": ["macd", "macd_signal", "macd_hist"],
+    "ATR": ["atr_14"],
+}
+DEFAULT_SCREEN = "drawdown_pct < -20 and volatility_20 > 2 and close above ma_50"
+
+
 # =====================================================
 # PAGE CONFIG
 # =====================================================
@@ -52,28 +109,186 @@ st.set_page_config(
     layout="wide",
 )
 
+# Cap how long network fetches may block this rerun
+start_rerun_budget(RERUN_BUDGET_SECONDS)
+
 st.title("🌍 Global Energy Market Analytics Dashboard")
 
 
+# =====================================================
+# CACHED INTERMEDIATES
+# =====================================================
+# Per-ticker results are keyed by (ticker, last bar, rows), so reruns
+# reuse them until new data arrives.
+
+@st.cache_data(show_spinner=False, ttl=UNIVERSE_TTL_SECONDS)
+def ensure_universe_store(tickers: tuple) -> bool:
+    return ensure_published(list(tickers))
+
+
+# Universe reads go through the query engine; the store version in the
+# key drops entries once new data is published.
+@st.cache_data(show_spinner=False, max_entries=32)
+def query_universe_prices(tickers: tuple, columns, version) -> pd.DataFrame:
+    return query_prices(list(tickers), columns=list(columns) if columns else None)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def query_universe_kpis(ticker, version) -> dict:
+    row = ticker_kpis([ticker])
+    if row.empty:
+        return calculate_kpis(pd.DataFrame())
+
+    # NaN -> None, as calculate_kpis reports missing values
+    return {
+        k: (None if pd.isna(v) else float(v))
+        for k, v in row.drop(columns="stock").iloc[0].items()
+    }
+
+
+@st.cache_data(show_spinner=False, ttl=UNIVERSE_TTL_SECONDS)
+def load_benchmark_prices(tickers: tuple) -> pd.DataFrame:
+    return preprocess_price_data(load_benchmark_data(list(tickers)))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def enrich_prices(_df, ticker, last_date, rows) -> pd.DataFrame:
+    return get_indicators(preprocess_price_data(_df))
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_forecast(_df, ticker, last_date, horizon_days) -> pd.DataFrame:
+    with measure_imports("forecast"):
+        from services.forecasting import powerbi_style_forecast
+
+    compute = lambda: powerbi_style_forecast(_df, horizon_days=horizon_days)
+
+    # Also shared with the other app processes on this host
+    shared_cache = try_shared_cache()
+    if shared_cache is None:
+        return compute()
+
+    return shared_cache.remember(
+        ("forecast", ticker, str(last_date), len(_df), horizon_days),
+        compute,
+        ttl=FORECAST_SHARED_TTL_SECONDS,
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_period_returns(ticker, rule, last_date) -> pd.DataFrame:
+    # Aggregated in the query engine, straight from the parquet store
+    return resample_prices([ticker], rule)
+
+
+def notify_alerts(quotes: dict):
+    """Feed live quotes to the alert engine and toast what fired."""
+    # Each session applies its own drop threshold
+    rules = default_rules(st.session_state.get("alert_drop_pct", DEFAULT_DROP_PCT))
+    # ...and is notified of its own transitions
+    session = st.session_state.setdefault("alert_session", uuid.uuid4().hex)
+    for alert in get_alert_engine().process(quotes, rules, session=session):
+        st.toast(alert.message, icon="🔔")
+
+
+def section(render):
+    """
+    Run a tab body as a fragment: its widgets rerun only that body.
+    Fragment reruns skip the top of the script, so each starts its
+    own latency budget.
+    """
+    @st.fragment
+    @functools.wraps(render)
+    def run(*args, **kwargs):
+        start_rerun_budget(RERUN_BUDGET_SECONDS)
+        return render(*args, **kwargs)
+
+    return run
+
+
 # =====================================================
 # SIDEBAR – STOCK SELECTION
 # =====================================================
 logout_button()
 st.sidebar.header("Stock Selection")
 
+with st.sidebar.expander("⚙️ Data Provider Stats", expanded=False):
+    provider_stats = get_provider_stats()
+    st.caption(
+        f"Requests: {provider_stats['requests']} · "
+        f"Retries: {provider_stats['retries']} · "
+        f"Failures: {provider_stats['failures']}"
+    )
+    st.caption(
+        f"Throttle waits: {provider_stats['throttle_waits']} "
+        f"({provider_stats['throttle_wait_seconds']:.1f}s)"
+    )
+    shared_cache = try_shared_cache()
+    if shared_cache is None:
+        st.caption("Shared cache: unavailable (process-local caching)")
+    else:
+        shared_stats = shared_cache.stats()
+        st.caption(
+            f"Shared cache: {shared_stats['entries']} entries "
+            f"({shared_stats['bytes'] / 1024 / 1024:.1f} MB)"
+        )
+    import_times = get_import_times()
+    if import_times:
+        st.caption(
+            "Cold imports: "
+            + " · ".join(f"{label} {seconds:.2f}s" for label, seconds in import_times.items())
+        )
+    for key, quality in get_quality_reports().items():
+        if key.startswith(quality_key("")):
+            continue  # custom tickers are reported with the selection
+        flagged = quality[quality["quarantined"] > 0]
+        if not flagged.empty:
+            st.caption(
+                f"Data quality ({key}): {int(flagged['quarantined'].sum())} bars quarantined "
+                f"across {len(flagged)} tickers"
+            )
+    for report in get_bootstrap_reports().values():
+        st.caption(
+            f"Bootstrap coverage: {report['loaded']}/{report['requested']} "
+            f"({report['coverage_pct']:.0f}%)"
+            + (f" · missing: {', '.join(report['failed'])}" if report["failed"] else "")
+        )
+
+with st.sidebar.expander("🔔 Alerts", expanded=False):
+    st.number_input(
+        "Intraday drop alert (%)",
+        min_value=0.5,
+        max_value=50.0,
+        value=DEFAULT_DROP_PCT,
+        step=0.5,
+        key="alert_drop_pct"
+    )
+
+    recent_alerts = get_alert_engine().store.recent(limit=10)
+    if not recent_alerts:
+        st.caption("No alerts yet. Rules: MA50 cross, 52-week high break, intraday drop.")
+    for alert in recent_alerts:
+        st.caption(f"{format_as_of(alert.ts)} · {alert.message}")
+
 ticker_name_map = get_ticker_name_map()
+ticker_labels = get_ticker_labels()
 all_tickers = sorted(get_all_tickers())
 
-# ➕ Add custom option
-all_tickers_with_other = all_tickers + ["OTHER"]
+# 🔎 Indexed search narrows the list (the registry can hold thousands)
+ticker_query = st.sidebar.text_input(
+    "Search ticker or company",
+    placeholder="e.g. XOM, shell, reliance"
+)
+matching_tickers = search_instruments(ticker_query, limit=SEARCH_LIMIT)
 
+# ➕ Add custom option
 selected_option = st.sidebar.selectbox(
     "Select Global Energy Stock",
-    options=all_tickers_with_other,
+    options=matching_tickers + ["OTHER"],
     format_func=lambda x: (
         "➕ Other (Custom Ticker)"
         if x == "OTHER"
-        else f"{x} — {ticker_name_map.get(x, x)}"
+        else ticker_labels[x]
     ),
 )
 if selected_option == "OTHER":
@@ -110,32 +325,31 @@ is_custom_ticker = selected_stock not in all_tickers
 # =====================================================
 
 if is_custom_ticker:
-    df = yf.download(
-        selected_stock,
-        period="5y",
-        interval="1d",
-        progress=False,
-        auto_adjust=False
-    )
+    custom_frames, _ = fetch_custom_history([selected_stock], period="5y")
+    df = custom_frames.get(selected_stock)
 
     if df is None or df.empty:
         st.error("Invalid or unsupported ticker.")
         st.stop()
 
-    df = df.reset_index()
-    df["stock"] = selected_stock
+    custom_quality = get_quality_reports().get(quality_key(selected_stock))
+    if custom_quality is not None and custom_quality["quarantined"].sum() > 0:
+        st.sidebar.caption(
+            f"Data quality: {int(custom_quality['quarantined'].sum())} bars quarantined"
+        )
 else:
-    df = load_global_energy_data(all_tickers)
-
-    if df is None or df.empty:
+    if not ensure_universe_store(tuple(all_tickers)):
         st.error("No data available. Please check the data source.")
         st.stop()
 
-    df = df[df["stock"] == selected_stock]
+    df = query_universe_prices((selected_stock,), None, store_version())
+
+    if df.empty:
+        st.error("No data available. Please check the data source.")
+        st.stop()
 
 
-df = preprocess_price_data(df)
-df = add_indicators(df)
+df = enrich_prices(df, selected_stock, df["Date"].max(), len(df))
 
 if df.empty:
     st.warning("No usable data after preprocessing.")
@@ -146,42 +360,45 @@ if df.empty:
 # KPIs
 # =====================================================
 
-kpis = calculate_kpis(df)
+if is_custom_ticker:
+    kpis = calculate_kpis(df)
+else:
+    # Aggregated in the query engine (same numbers as calculate_kpis)
+    kpis = query_universe_kpis(selected_stock, store_version())
 
 
 # =====================================================
-# TABS
+# ALERT REFERENCE LEVELS
 # =====================================================
 
-tabs = st.tabs([
-    "📈 Overview",
-    "📊 Performance",
-    "⚠️ Risk",
-    "🔁 Peer Comparison",
-    "📄 Fundamentals",
-    "🔮 Forecast",
-    "📝 Notes",
-    "🗂 Data",
-])
-
+if is_custom_ticker:
+    get_alert_engine().update_reference(
+        selected_stock,
+        ma_50=df["ma_50"].iloc[-1],
+        # 52-week high before the latest session
+        prior_high_52w=df["High"].iloc[:-1].tail(252).max(),
+    )
+else:
+    get_alert_engine().set_reference(get_store_snapshot(all_tickers))
 
 
 # =====================================================
 # 📈 OVERVIEW TAB
 # =====================================================
 
-with tabs[0]:
-
-
+@section
+def render_overview(df, kpis, selected_stock):
     live = get_live_price_snapshot(selected_stock)
+    notify_alerts({selected_stock: live})
 
     col1, col2, col3, col4, col5 = st.columns(5)
 
     if live:
         col1.metric(
-            "Live Price",
+            "Live Price (stale)" if live.get("stale") else "Live Price",
             format_number(live["current_price"]),
-            f"{live['pct_change']:.2f}%"
+            f"{live['pct_change']:.2f}%",
+            help=f"As of {format_as_of(live.get('as_of'))}"
         )
     else:
         col1.metric("Live Price", "N/A")
@@ -205,6 +422,20 @@ with tabs[0]:
     fig_price = price_ma_chart(df, selected_stock)
     if fig_price:
         st.plotly_chart(fig_price, use_container_width=True)
+
+    # Only the selected studies are computed (cached per ticker / last bar)
+    studies = st.multiselect(
+        "Technical indicators",
+        list(TECHNICAL_STUDIES),
+        key="technical_studies"
+    )
+    if studies:
+        columns = [c for study in studies for c in TECHNICAL_STUDIES[study]]
+        fig_tech = technical_indicators_chart(
+            get_indicators(df, columns), selected_stock, studies
+        )
+        if fig_tech:
+            st.plotly_chart(fig_tech, use_container_width=True)
     st.divider()
     
     start_date = st.date_input(
@@ -220,12 +451,13 @@ with tabs[0]:
     if fig_volume:
         st.plotly_chart(fig_volume, use_container_width=True)
 
+
 # =====================================================
 # 📊 PERFORMANCE TAB
 # =====================================================
 
-with tabs[1]:
-
+@section
+def render_performance(df, kpis, selected_stock):
     col1, col2, col3 = st.columns(3)
 
     col1.metric("CAGR", format_percentage(kpis["cagr_pct"]))
@@ -238,11 +470,44 @@ with tabs[1]:
     if fig_returns:
         st.plotly_chart(fig_returns, use_container_width=True)
 
+    with st.expander("📅 Period Returns", expanded=False):
+        period_label = st.radio(
+            "Period",
+            ["Monthly", "Quarterly", "Yearly"],
+            horizontal=True,
+            key="period_returns_rule"
+        )
+        periods = cached_period_returns(
+            selected_stock,
+            {"Monthly": "M", "Quarterly": "Q", "Yearly": "Y"}[period_label],
+            df["Date"].max()
+        )
+
+        if periods.empty:
+            st.caption("Period data not available yet.")
+        else:
+            st.dataframe(
+                periods.drop(columns="stock").sort_values("Date", ascending=False),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Date": st.column_config.DateColumn("Period"),
+                    "return_pct": st.column_config.NumberColumn("Return", format="%.2f%%"),
+                }
+            )
+
+
 # =====================================================
 # ⚠️ RISK TAB
 # =====================================================
 
-with tabs[2]:
+@section
+def render_risk(df, kpis, selected_stock, is_custom_ticker, all_tickers):
+    with measure_imports("risk"):
+        from services.price_panel import get_price_panel
+        from services.regression import get_rolling_regression
+        from services.risk import get_rolling_var
+        from services.drawdowns import get_drawdown_episodes, worst_drawdowns
 
     col1, col2 = st.columns(2)
 
@@ -255,16 +520,361 @@ with tabs[2]:
     if fig_dd:
         st.plotly_chart(fig_dd, use_container_width=True)
 
+    # Panel shared by the risk analytics below
+    risk_key = f"{'custom' if is_custom_ticker else 'universe'}:{selected_stock}"
+    risk_panel = get_price_panel(df, key=risk_key)
+
+    # -------------------------------------------------
+    # Worst drawdown episodes
+    # -------------------------------------------------
+    st.subheader("Worst Drawdown Episodes")
+
+    top_n = st.number_input(
+        "Number of episodes",
+        min_value=1,
+        max_value=20,
+        value=5,
+        step=1
+    )
+
+    episodes = get_drawdown_episodes(risk_panel, key=risk_key)
+    worst = worst_drawdowns(episodes, selected_stock, n=int(top_n))
+
+    if worst.empty:
+        st.info("No drawdown episodes found.")
+    else:
+        st.dataframe(
+            worst.drop(columns="stock"),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "peak_date": st.column_config.DateColumn("Peak"),
+                "trough_date": st.column_config.DateColumn("Trough"),
+                "recovery_date": st.column_config.DateColumn("Recovery"),
+                "depth_pct": st.column_config.NumberColumn("Depth", format="%.2f%%"),
+                "decline_days": st.column_config.NumberColumn("Peak → Trough (days)"),
+                "time_to_recover_days": st.column_config.NumberColumn("Trough → Recovery (days)"),
+                "duration_days": st.column_config.NumberColumn("Duration (days)"),
+                "recovered": st.column_config.CheckboxColumn("Recovered"),
+            }
+        )
+
+    # -------------------------------------------------
+    # Value-at-Risk / Expected Shortfall
+    # -------------------------------------------------
+    st.divider()
+    st.subheader("Value-at-Risk & Expected Shortfall")
+
+    col1, col2 = st.columns(2)
+    var_confidence = col1.radio(
+        "Confidence",
+        [0.95, 0.99],
+        format_func=lambda c: f"{c:.0%}",
+        horizontal=True
+    )
+    var_horizon = col2.radio(
+        "Horizon",
+        [1, 10],
+        format_func=lambda h: f"{h}-Day",
+        horizontal=True
+    )
+
+    var_result = get_rolling_var(
+        risk_panel,
+        confidence=var_confidence,
+        window=VAR_WINDOW,
+        key=risk_key
+    )
+    var_df = var_result.series(selected_stock)
+
+    if var_df.empty or var_df.drop(columns="Date").isna().all().all():
+        st.info("Not enough history for VaR / ES.")
+    else:
+        latest_var = var_df.ffill().iloc[-1]
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Historical VaR", format_percentage(latest_var[f"var_historical_{var_horizon}d"]))
+        col2.metric("Historical ES", format_percentage(latest_var[f"es_historical_{var_horizon}d"]))
+        col3.metric("Parametric VaR", format_percentage(latest_var[f"var_parametric_{var_horizon}d"]))
+        col4.metric("Parametric ES", format_percentage(latest_var[f"es_parametric_{var_horizon}d"]))
+
+        fig_var = var_chart(var_df, selected_stock, var_horizon, var_confidence)
+        if fig_var:
+            st.plotly_chart(fig_var, use_container_width=True)
+
+    # -------------------------------------------------
+    # Sensitivity to crude oil (rolling beta)
+    # -------------------------------------------------
+    st.divider()
+    st.subheader("Sensitivity to Crude Oil")
+
+    benchmark_tickers = get_benchmark_tickers()
+    benchmark_df = load_benchmark_prices(tuple(benchmark_tickers))
+
+    if benchmark_df.empty:
+        st.warning("Crude oil benchmark data not available.")
+    else:
+        beta_window = st.select_slider(
+            "Beta Window (trading days)",
+            options=list(BETA_WINDOWS),
+            value=120
+        )
+
+        regression_df = pd.concat([df, benchmark_df], ignore_index=True)
+        regression_key = f"{risk_key}:benchmarks"
+
+        regression_panel = get_price_panel(regression_df, key=regression_key)
+        regression = get_rolling_regression(
+            regression_panel,
+            benchmark_tickers,
+            windows=BETA_WINDOWS,
+            key=regression_key
+        )
+
+        beta_frames = {
+            BENCHMARKS[b]: regression.series(selected_stock, b, beta_window)
+            for b in regression.benchmarks
+        }
+
+        cols = st.columns(max(len(beta_frames), 1) * 2)
+        for i, (label, g) in enumerate(beta_frames.items()):
+            latest = g.dropna(subset=["beta"]).tail(1)
+            beta_val = latest["beta"].iloc[0] if not latest.empty else None
+            r2_val = latest["r2"].iloc[0] if not latest.empty else None
+            cols[2 * i].metric(f"Beta vs {label}", format_number(beta_val))
+            cols[2 * i + 1].metric(f"R² vs {label}", format_number(r2_val))
+
+        fig_beta = rolling_beta_chart(beta_frames, selected_stock, beta_window)
+        if fig_beta:
+            st.plotly_chart(fig_beta, use_container_width=True)
+
+        fig_r2 = rolling_r2_chart(beta_frames, selected_stock, beta_window)
+        if fig_r2:
+            st.plotly_chart(fig_r2, use_container_width=True)
+
+
+# =====================================================
+# 🔁 PEER COMPARISON TAB
+# =====================================================
+
+@section
+def render_peers(df, selected_stock, all_tickers, ticker_labels):
+    with measure_imports("peers"):
+        from services.price_panel import get_price_panel
+        from services.correlation import (
+            get_rolling_moments,
+            correlation_matrix,
+            pair_correlation_series,
+            rank_peers,
+        )
+
+    st.subheader("Peer Comparison")
+
+    peer_stocks = st.multiselect(
+        "Select energy stocks",
+        options=sorted(all_tickers),
+        format_func=lambda x: ticker_labels.get(x, x),
+        default=[]
+    )
+
+    custom_peer_input = st.text_input(
+        "Add custom tickers (comma separated)",
+        placeholder="e.g. AAPL, TSLA, MSFT, BTC-USD"
+    )
+
+    # -------------------------------------------------
+    # Build final peer list
+    # -------------------------------------------------
+    final_peer_stocks = peer_stocks.copy()
+
+    if custom_peer_input:
+        custom_tickers = [
+            t.strip().upper()
+            for t in custom_peer_input.split(",")
+            if t.strip()
+        ]
+        final_peer_stocks.extend(custom_tickers)
+
+    # Remove duplicates, preserve order
+    final_peer_stocks = list(dict.fromkeys(final_peer_stocks))
+
+    # -------------------------------------------------
+    # Live quotes for the peer list (one concurrent fan-out)
+    # -------------------------------------------------
+    if final_peer_stocks:
+        peer_quotes = get_live_price_snapshots(final_peer_stocks)
+        notify_alerts(peer_quotes)
+        quote_rows = [
+            {
+                "Stock": ticker,
+                "Price": q.get("current_price"),
+                "Change %": q.get("pct_change"),
+                "As of": format_as_of(q.get("as_of")) + (" (stale)" if q.get("stale") else ""),
+            }
+            for ticker, q in peer_quotes.items()
+        ]
+        st.dataframe(
+            pd.DataFrame(quote_rows),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Price": st.column_config.NumberColumn(format="%.2f"),
+                "Change %": st.column_config.NumberColumn(format="%.2f%%"),
+            }
+        )
+
+    if len(final_peer_stocks) < 2:
+        st.info("Select at least two stocks to compare.")
+    else:
+        start_date = st.date_input(
+            "Comparison Start Date",
+            value=df["Date"].min()
+        )
+
+        peer_frames = []
+
+        # -------------------------------------------------
+        # 1️⃣ Predefined energy stocks (CSV)
+        # -------------------------------------------------
+        predefined_peers = [s for s in final_peer_stocks if s in all_tickers]
+
+        if predefined_peers:
+            # Sliced in the query engine (filters pushed into the parquet scan)
+            peer_df_pre = query_prices(predefined_peers, start=start_date)
+            peer_frames.append(peer_df_pre)
+
+        # -------------------------------------------------
+        # 2️⃣ Custom tickers (Yahoo Finance)
+        # -------------------------------------------------
+        custom_peers = [s for s in final_peer_stocks if s not in all_tickers]
+
+        if custom_peers:
+            custom_frames, failed_peers = fetch_custom_history(custom_peers, period="5y")
+
+            for ticker in custom_peers:
+                temp = custom_frames.get(ticker)
+                if temp is None:
+                    continue
+                temp = temp[temp["Date"] >= pd.to_datetime(start_date)]
+                peer_frames.append(temp)
+
+            if failed_peers:
+                st.warning(f"No data for: {', '.join(failed_peers)}")
+
+        if not peer_frames:
+            st.warning("No valid data available for selected stocks.")
+        else:
+            peer_df = pd.concat(peer_frames, ignore_index=True)
+            peer_df = preprocess_price_data(peer_df)
+
+            if peer_df["stock"].nunique() < 2:
+                st.warning("At least two stocks with valid data are required.")
+            else:
+                peer_key = f"peers:{start_date}:{','.join(sorted(peer_df['stock'].unique()))}"
+                fig_peer = normalized_comparison_chart(peer_df, key=peer_key)
+                st.plotly_chart(fig_peer, use_container_width=True)
 
+    # -------------------------------------------------
+    # 3️⃣ Return correlation across the universe
+    # -------------------------------------------------
+    st.divider()
+    st.subheader("Return Correlation")
 
+    # Only the closes are read from the store
+    universe_df = query_universe_prices(tuple(all_tickers), ("Close",), store_version())
 
+    if universe_df.empty:
+        st.warning("Universe data not available for correlation analysis.")
+    else:
+        corr_window = st.select_slider(
+            "Correlation Window (trading days)",
+            options=[20, 60, 120, 250],
+            value=60
+        )
+
+        universe_panel = get_price_panel(universe_df)
+        moments = get_rolling_moments(universe_panel)
+        corr = correlation_matrix(moments, corr_window)
+
+        fig_corr = correlation_heatmap(corr, corr_window)
+        if fig_corr:
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+        if selected_stock in corr.index:
+            most_corr, least_corr = rank_peers(corr, selected_stock, n=5)
+
+            col1, col2 = st.columns(2)
+            col1.markdown(f"**Most correlated with {selected_stock}**")
+            col1.dataframe(most_corr, hide_index=True, use_container_width=True)
+            col2.markdown(f"**Least correlated with {selected_stock}**")
+            col2.dataframe(least_corr, hide_index=True, use_container_width=True)
+
+            compare_to = [s for s in peer_stocks if s != selected_stock] or most_corr["stock"].tolist()
+            corr_series = pair_correlation_series(
+                moments, selected_stock, compare_to, corr_window
+            )
+            fig_roll_corr = rolling_correlation_chart(corr_series, selected_stock, corr_window)
+            if fig_roll_corr:
+                st.plotly_chart(fig_roll_corr, use_container_width=True)
+        else:
+            st.caption("Peer ranking is available for stocks in the energy universe.")
+
+
+# =====================================================
+# 🧮 SCREENER TAB
+# =====================================================
+
+@section
+def render_screener(all_tickers):
+    st.subheader("Stock Screener")
+
+    # Aggregated per ticker in the query engine
+    snapshot = get_store_snapshot(all_tickers)
+
+    if snapshot.empty:
+        st.warning("Universe data not available for screening.")
+        return
+
+    expression = st.text_input(
+        "Screen",
+        value=DEFAULT_SCREEN,
+        help="Fields: stock, " + ", ".join(SCREEN_FIELDS) + ". "
+             "Operators: < <= > >= == != above below, + - * /, and / or / not."
+    )
+
+    col1, col2 = st.columns(2)
+    sort_by = col1.selectbox("Sort by", SCREEN_FIELDS, index=SCREEN_FIELDS.index("drawdown_pct"))
+    descending = col2.toggle("Descending", value=False, key="screen_descending")
+
+    try:
+        matches = run_screen(snapshot, expression, sort_by=sort_by, descending=descending)
+    except ScreenError as exc:
+        st.error(f"Invalid screen: {exc}")
+        return
+
+    st.caption(f"{len(matches)} of {len(snapshot)} stocks match · latest bar per stock")
+    st.dataframe(
+        matches,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "date": st.column_config.DateColumn("Date"),
+            "drawdown_pct": st.column_config.NumberColumn(format="%.2f%%"),
+            "daily_return_pct": st.column_config.NumberColumn(format="%.2f%%"),
+            "pct_from_52w_high": st.column_config.NumberColumn(format="%.2f%%"),
+            "total_return_pct": st.column_config.NumberColumn(format="%.2f%%"),
+        }
+    )
 
 
 # =====================================================
 # 📄 FUNDAMENTALS TAB
 # =====================================================
 
-with tabs[4]:
+@section
+def render_fundamentals(selected_stock):
+    with measure_imports("fundamentals"):
+        from services.fundamentals import load_fundamentals
 
     st.subheader("Company Fundamentals")
 
@@ -286,53 +896,40 @@ with tabs[4]:
         )
         
         st.plotly_chart(fig_fund, use_container_width=True)
+        if fin_df.attrs.get("stale"):
+            st.caption(
+                f"⏳ Showing cached fundamentals from {format_as_of(fin_df.attrs.get('as_of'))} "
+                "— refreshing in background."
+            )
         st.caption(
     "Financial data availability depends on company reporting standards. "
     "Some periods may be unavailable for certain stocks."
         )
 
 
-
 # =====================================================
 # 🔮 FORECAST TAB
 # =====================================================
 
-with tabs[5]:
-
+@section
+def render_forecast(df, selected_stock):
     st.info(
         "Forecast uses exponential smoothing (Power BI–style trend).\n"
         "For analytical exploration only."
     )
 
-    forecast_df = powerbi_style_forecast(df, horizon_days=30)
+    forecast_df = cached_forecast(df, selected_stock, df["Date"].max(), 30)
     fig_forecast = forecast_chart(df, forecast_df, selected_stock)
 
     if fig_forecast:
         st.plotly_chart(fig_forecast, use_container_width=True)
 
 
-# =====================================================
-# 🗂 DATA TAB
-# =====================================================
-
-with tabs[7]:
-
-    st.dataframe(df, use_container_width=True)
-
-    st.download_button(
-        "⬇️ Download CSV",
-        df.to_csv(index=False),
-        file_name=f"{selected_stock}_data.csv",
-        mime="text/csv",
-    )
-
-
 # =====================================================
 # 📝 NOTES TAB
 # =====================================================
 
-with tabs[6]:
-
+def render_notes():
     st.subheader("📘 Dashboard Notes & Methodology")
 
     st.markdown("""
@@ -376,6 +973,14 @@ with tabs[6]:
 
     **VWAP (Volume Weighted Average Price)**  
     Shows the average traded price weighted by volume (intraday only).
+
+    **Value-at-Risk (VaR) & Expected Shortfall (ES)**  
+    VaR is the loss not exceeded with the chosen confidence over 1 or 10 days;
+    ES is the average loss on days worse than VaR. Historical figures use the
+    last 250 trading days of returns, parametric figures assume normal returns.
+
+    **Beta vs Crude Oil**  
+    Rolling regression slope of daily stock returns on Brent / WTI returns.
     """)
 
     st.divider()
@@ -389,6 +994,16 @@ with tabs[6]:
 
     st.divider()
 
+    st.markdown("""
+    ### 🧮 Screener
+    - Screens run on the **latest bar** of every stock in the universe
+    - Conditions combine fields with `and` / `or` / `not`,
+      e.g. `drawdown_pct < -20 and volatility_20 > 2 and close above ma_50`
+    - Stocks with missing values for a field never match a condition on it
+    """)
+
+    st.divider()
+
     st.markdown("""
     ### 🔮 Forecasting Method
     - Forecasting uses **exponential smoothing**
@@ -423,93 +1038,159 @@ with tabs[6]:
 
 
 # =====================================================
-# 🔁 PEER COMPARISON TAB
+# 🗂 DATA TAB
 # =====================================================
 
-with tabs[3]:
+@section
+def render_data(df, selected_stock, all_tickers):
+    with measure_imports("data"):
+        from services.table_view import get_table_view, get_store_view, PAGE_SIZES
+        from services.export import (
+            export_frame,
+            export_universe,
+            store_columns,
+            FORMATS as EXPORT_FORMATS,
+        )
 
-    st.subheader("Peer Comparison")
+    universe_columns = store_columns()
+    scopes = ["Selected stock"] + (["Whole universe"] if universe_columns else [])
 
-    peer_stocks = st.multiselect(
-        "Select energy stocks",
-        options=sorted(all_tickers),
-        format_func=lambda x: f"{x} — {ticker_name_map.get(x, x)}",
-        default=[]
+    # -------------------------------------------------
+    # Table (filtered / sorted server side, one page sent)
+    # -------------------------------------------------
+    table_scope = st.radio("Table", scopes, horizontal=True, key="table_scope")
+
+    if table_scope == "Whole universe":
+        view = get_store_view(all_tickers)
+    else:
+        view = get_table_view(df, key="data_tab")
+
+    col1, col2, col3, col4 = st.columns(4)
+    sort_by = col1.selectbox("Sort by", view.indexed_columns)
+    descending = col2.toggle("Descending", value=True)
+    page_size = col3.selectbox("Rows per page", PAGE_SIZES, index=1)
+    page = col4.number_input("Page", min_value=1, value=1, step=1, key="table_page")
+
+    col1, col2 = st.columns(2)
+    table_range = col1.date_input(
+        "Table Date Range",
+        value=(df["Date"].min().date(), df["Date"].max().date()),
+        key="table_date_range"
+    )
+    table_tickers = None
+    if table_scope == "Whole universe":
+        table_tickers = col2.multiselect("Stocks", options=sorted(all_tickers), key="table_tickers")
+
+    page_df, total_rows, total_pages = view.query(
+        page=int(page),
+        page_size=page_size,
+        sort_by=sort_by,
+        descending=descending,
+        start=table_range[0] if len(table_range) > 0 else None,
+        end=table_range[1] if len(table_range) > 1 else None,
+        tickers=table_tickers,
     )
 
-    custom_peer_input = st.text_input(
-        "Add custom tickers (comma separated)",
-        placeholder="e.g. AAPL, TSLA, MSFT, BTC-USD"
+    st.dataframe(page_df, hide_index=True, use_container_width=True)
+    st.caption(
+        f"Page {min(int(page), total_pages)} of {total_pages} · "
+        f"{total_rows:,} matching rows"
     )
 
     # -------------------------------------------------
-    # Build final peer list
+    # Export (built only when requested, written in chunks)
     # -------------------------------------------------
-    final_peer_stocks = peer_stocks.copy()
+    st.divider()
+    st.subheader("Export")
 
-    if custom_peer_input:
-        custom_tickers = [
-            t.strip().upper()
-            for t in custom_peer_input.split(",")
-            if t.strip()
-        ]
-        final_peer_stocks.extend(custom_tickers)
+    col1, col2 = st.columns(2)
+    export_scope = col1.radio("Scope", scopes, horizontal=True)
+    export_format = col2.radio(
+        "Format",
+        list(EXPORT_FORMATS),
+        format_func=str.upper,
+        horizontal=True
+    )
 
-    # Remove duplicates, preserve order
-    final_peer_stocks = list(dict.fromkeys(final_peer_stocks))
+    source_columns = list(df.columns) if export_scope == "Selected stock" else universe_columns
 
-    if len(final_peer_stocks) < 2:
-        st.info("Select at least two stocks to compare.")
-    else:
-        start_date = st.date_input(
-            "Comparison Start Date",
-            value=df["Date"].min()
-        )
+    date_range = st.date_input(
+        "Date Range",
+        value=(df["Date"].min().date(), df["Date"].max().date()),
+        key="export_date_range"
+    )
+    export_columns = st.multiselect(
+        "Columns",
+        options=[c for c in source_columns if c not in ("Date", "stock")],
+        default=[c for c in source_columns if c not in ("Date", "stock")]
+    )
 
-        peer_frames = []
+    # Half-picked range (start only) -> open end
+    export_start = date_range[0] if len(date_range) > 0 else None
+    export_end = date_range[1] if len(date_range) > 1 else None
 
-        # -------------------------------------------------
-        # 1️⃣ Predefined energy stocks (CSV)
-        # -------------------------------------------------
-        predefined_peers = [s for s in final_peer_stocks if s in all_tickers]
+    export_request = (
+        export_scope, export_format, selected_stock,
+        export_start, export_end, tuple(export_columns),
+    )
 
-        if predefined_peers:
-            peer_df_pre = load_global_energy_data(all_tickers)
-            peer_df_pre = peer_df_pre[
-                (peer_df_pre["stock"].isin(predefined_peers)) &
-                (peer_df_pre["Date"] >= pd.to_datetime(start_date))
-            ]
-            peer_frames.append(peer_df_pre)
+    if st.button("Prepare export"):
+        filters = dict(start=export_start, end=export_end, columns=export_columns)
 
-        # -------------------------------------------------
-        # 2️⃣ Custom tickers (Yahoo Finance)
-        # -------------------------------------------------
-        custom_peers = [s for s in final_peer_stocks if s not in all_tickers]
+        with st.spinner("Writing export..."):
+            if export_scope == "Whole universe":
+                path, rows = export_universe(export_format, tickers=all_tickers, **filters)
+                file_name = f"global_energy_universe.{export_format}"
+            else:
+                path, rows = export_frame(df, selected_stock, export_format, **filters)
+                file_name = f"{selected_stock}_data.{export_format}"
 
-        for ticker in custom_peers:
-            temp = yf.download(
-                ticker,
-                period="5y",
-                interval="1d",
-                progress=False,
-                auto_adjust=False
-            )
-            temp = temp.reset_index()
-            temp = preprocess_price_data(temp)
-            if temp.empty:
-                continue
-            temp["stock"] = ticker
-            temp = temp[temp["Date"] >= pd.to_datetime(start_date)]
-            peer_frames.append(temp)
+        st.session_state["export_file"] = (export_request, path, rows, file_name)
 
-        if not peer_frames:
-            st.warning("No valid data available for selected stocks.")
+    prepared = st.session_state.get("export_file")
+
+    if prepared and prepared[0] == export_request:
+        _, path, rows, file_name = prepared
+
+        if path is None:
+            st.warning("No rows match the selected range.")
         else:
-            peer_df = pd.concat(peer_frames, ignore_index=True)
-            peer_df = preprocess_price_data(peer_df)
+            try:
+                with open(path, "rb") as f:
+                    st.download_button(
+                        f"⬇️ Download {export_format.upper()} ({rows:,} rows)",
+                        f,
+                        file_name=file_name,
+                        mime=EXPORT_FORMATS[export_format],
+                    )
+            except FileNotFoundError:
+                st.info("This export has expired. Prepare it again.")
 
-            if peer_df["stock"].nunique() < 2:
-                st.warning("At least two stocks with valid data are required.")
-            else:
-                fig_peer = normalized_comparison_chart(peer_df)
-                st.plotly_chart(fig_peer, use_container_width=True)
\ No newline at end of file
+
+# =====================================================
+# SECTIONS
+# =====================================================
+# Only the active section is evaluated on a rerun, and each section
+# is a fragment: its own widgets rerun that section alone.
+
+SECTIONS = {
+    "📈 Overview": lambda: render_overview(df, kpis, selected_stock),
+    "📊 Performance": lambda: render_performance(df, kpis, selected_stock),
+    "⚠️ Risk": lambda: render_risk(df, kpis, selected_stock, is_custom_ticker, all_tickers),
+    "🔁 Peer Comparison": lambda: render_peers(df, selected_stock, all_tickers, ticker_labels),
+    "🧮 Screener": lambda: render_screener(all_tickers),
+    "📄 Fundamentals": lambda: render_fundamentals(selected_stock),
+    "🔮 Forecast": lambda: render_forecast(df, selected_stock),
+    "📝 Notes": render_notes,
+    "🗂 Data": lambda: render_data(df, selected_stock, all_tickers),
+}
+
+active_section = st.radio(
+    "Section",
+    options=list(SECTIONS),
+    horizontal=True,
+    key="active_section",
+    label_visibility="collapsed",
+)
+
+SECTIONS[active_section]()
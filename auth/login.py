@@ -6,26 +6,42 @@ guest_user = {
     "username": "guestuser",
     "password_hash": "$2b$12$3.PlxP4L.J6zKKUFWZodduhxWtKyGjyw57/2tL18XUVfdG47Eq4Gy"
         }
+BG_IMAGE_PATH = "data/stock_bg.jpg"
+
+
+# Read and encoded once per process, shared by every session
+@st.cache_resource(show_spinner=False)
 def load_bg_image(image_path):
-    with open(image_path, "rb") as img:
-        return base64.b64encode(img.read()).decode()
+    try:
+        with open(image_path, "rb") as img:
+            return base64.b64encode(img.read()).decode()
+    except OSError:
+        return None
 
 def login_page():
-    bg_img = load_bg_image("data/stock_bg.jpg")
+    bg_img = load_bg_image(BG_IMAGE_PATH)
 
-    st.markdown(
+    bg_css = (
         f"""
-        <style>
-        /* Hide Streamlit header & footer */
-        header {{visibility: hidden;}}
-        footer {{visibility: hidden;}}
-
         .stApp {{
             background-image: url("data:image/jpg;base64,{bg_img}");
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
         }}
+        """
+        if bg_img
+        else ""
+    )
+
+    st.markdown(
+        f"""
+        <style>
+        /* Hide Streamlit header & footer */
+        header {{visibility: hidden;}}
+        footer {{visibility: hidden;}}
+
+        {bg_css}
 
         .login-container {{
             position: fixed;
@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+from services.price_panel import get_price_panel
+
 
 
 
@@ -266,10 +269,13 @@ def drawdown_chart(df: pd.DataFrame):
     return fig
 
 
-def normalized_comparison_chart(df: pd.DataFrame):
+def normalized_comparison_chart(df: pd.DataFrame, key: str = "peers"):
     """
     Compare multiple stocks by normalizing prices to 100
     at the selected start date.
+    Uses the calendar-aligned price panel (cached under `key`, so
+    reruns on the same frame reuse it), and all peers are rebased
+    in a single array operation.
     """
 
     if df is None or df.empty:
@@ -285,26 +291,25 @@ def normalized_comparison_chart(df: pd.DataFrame):
     if not pd.api.types.is_datetime64_any_dtype(df["Date"]):
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
 
-    df = df.sort_values(["stock", "Date"])
+    panel = get_price_panel(df, key=key)
+    normalized = panel.normalized(base=100.0)
 
-    fig = go.Figure()
+    # Only plot sessions each stock actually traded
+    normalized[~panel.observed] = np.nan
 
-    for stock, g in df.groupby("stock"):
-        if g.empty:
-            continue
+    fig = go.Figure()
 
-        base_price = g["Close"].iloc[0]
-        if base_price == 0 or pd.isna(base_price):
+    for i, stock in enumerate(panel.tickers):
+        if np.isnan(normalized[:, i]).all():
             continue
 
-        normalized_price = (g["Close"] / base_price) * 100
-
         fig.add_trace(
             go.Scatter(
-                x=g["Date"],
-                y=normalized_price,
+                x=panel.dates,
+                y=normalized[:, i],
                 mode="lines",
-                name=stock
+                name=stock,
+                connectgaps=True
             )
         )
 
@@ -364,3 +369,264 @@ def revenue_profit_chart(df: pd.DataFrame, stock: str, frequency: str):
 
 
     return fig
+
+
+def correlation_heatmap(corr: pd.DataFrame, window: int):
+    """
+    Correlation matrix heatmap of daily returns.
+    """
+
+    if corr is None or corr.empty:
+        return None
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=corr.values,
+            x=corr.columns,
+            y=corr.index,
+            zmin=-1,
+            zmax=1,
+            colorscale="RdBu",
+            reversescale=True,
+            colorbar=dict(title="ρ")
+        )
+    )
+
+    fig.update_layout(
+        title=f"Return Correlation ({window}D Rolling, Latest)",
+        template="plotly_dark",
+        height=560,
+        yaxis=dict(autorange="reversed")
+    )
+
+    return fig
+
+
+def rolling_correlation_chart(corr_df: pd.DataFrame, stock: str, window: int):
+    """
+    Rolling correlation of one stock against selected peers.
+    """
+
+    if corr_df is None or corr_df.empty:
+        return None
+
+    fig = go.Figure()
+
+    for peer in corr_df.columns:
+        fig.add_trace(
+            go.Scatter(
+                x=corr_df.index,
+                y=corr_df[peer],
+                mode="lines",
+                name=peer
+            )
+        )
+
+    fig.update_layout(
+        title=f"{stock} — {window}D Rolling Correlation vs Peers",
+        xaxis_title="Date",
+        yaxis_title="Correlation",
+        template="plotly_dark",
+        yaxis=dict(range=[-1, 1]),
+        height=420
+    )
+
+    return fig
+
+
+def rolling_beta_chart(beta_frames: dict, stock: str, window: int):
+    """
+    Rolling beta of a stock vs crude oil benchmarks.
+    beta_frames: {benchmark_label: DataFrame[Date, beta, alpha_pct, r2]}
+    """
+
+    frames = {k: v for k, v in beta_frames.items() if v is not None and not v.empty}
+    if not frames:
+        return None
+
+    fig = go.Figure()
+
+    for label, g in frames.items():
+        fig.add_trace(
+            go.Scatter(
+                x=g["Date"],
+                y=g["beta"],
+                mode="lines",
+                name=f"β vs {label}"
+            )
+        )
+
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+
+    fig.update_layout(
+        title=f"{stock} — {window}D Rolling Beta to Crude Oil",
+        xaxis_title="Date",
+        yaxis_title="Beta",
+        template="plotly_dark",
+        height=420
+    )
+
+    return fig
+
+
+def rolling_r2_chart(beta_frames: dict, stock: str, window: int):
+    """
+    Rolling R² (share of variance explained by crude oil).
+    """
+
+    frames = {k: v for k, v in beta_frames.items() if v is not None and not v.empty}
+    if not frames:
+        return None
+
+    fig = go.Figure()
+
+    for label, g in frames.items():
+        fig.add_trace(
+            go.Scatter(
+                x=g["Date"],
+                y=g["r2"],
+                mode="lines",
+                name=f"R² vs {label}"
+            )
+        )
+
+    fig.update_layout(
+        title=f"{stock} — {window}D Rolling R² vs Crude Oil",
+        xaxis_title="Date",
+        yaxis_title="R²",
+        template="plotly_dark",
+        yaxis=dict(range=[0, 1]),
+        height=360
+    )
+
+    return fig
+
+
+def var_chart(var_df: pd.DataFrame, stock: str, horizon: int, confidence: float):
+    """
+    Rolling VaR / Expected Shortfall (historical vs parametric).
+    """
+
+    if var_df is None or var_df.empty:
+        return None
+
+    series = {
+        "Historical VaR": (f"var_historical_{horizon}d", "#E74C3C", None),
+        "Historical ES": (f"es_historical_{horizon}d", "#E74C3C", "dot"),
+        "Parametric VaR": (f"var_parametric_{horizon}d", "#00B4D8", None),
+        "Parametric ES": (f"es_parametric_{horizon}d", "#00B4D8", "dot"),
+    }
+
+    fig = go.Figure()
+
+    for name, (col, color, dash) in series.items():
+        if col not in var_df.columns:
+            continue
+        fig.add_trace(
+            go.Scatter(
+                x=var_df["Date"],
+                y=var_df[col],
+                mode="lines",
+                name=name,
+                line=dict(color=color, dash=dash)
+            )
+        )
+
+    fig.update_layout(
+        title=f"{stock} — {horizon}-Day VaR / ES ({confidence:.0%}, Rolling)",
+        xaxis_title="Date",
+        yaxis_title="Potential Loss (%)",
+        template="plotly_dark",
+        yaxis=dict(ticksuffix="%"),
+        height=420
+    )
+
+    return fig
+
+
+def technical_indicators_chart(df: pd.DataFrame, stock: str, studies: list):
+    """
+    Price with optional Bollinger Bands, plus one panel per
+    oscillator study (RSI, MACD, ATR).
+    """
+
+    if df is None or df.empty or not studies:
+        return None
+
+    from plotly.subplots import make_subplots
+
+    panels = [s for s in ["RSI", "MACD", "ATR"] if s in studies]
+
+    fig = make_subplots(
+        rows=1 + len(panels),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.04,
+        row_heights=[0.5] + [0.5 / len(panels)] * len(panels) if panels else [1.0]
+    )
+
+    fig.add_trace(
+        go.Scatter(x=df["Date"], y=df["Close"], mode="lines", name="Close"),
+        row=1, col=1
+    )
+
+    if "Bollinger" in studies and "bb_middle_20" in df.columns:
+        for col, name, dash in [
+            ("bb_upper_20", "BB Upper", "dot"),
+            ("bb_middle_20", "BB Middle", None),
+            ("bb_lower_20", "BB Lower", "dot"),
+        ]:
+            fig.add_trace(
+                go.Scatter(
+                    x=df["Date"],
+                    y=df[col],
+                    mode="lines",
+                    name=name,
+                    line=dict(color="#95A5A6", width=1, dash=dash)
+                ),
+                row=1, col=1
+            )
+
+    for row, study in enumerate(panels, start=2):
+        if study == "RSI":
+            fig.add_trace(
+                go.Scatter(x=df["Date"], y=df["rsi_14"], mode="lines", name="RSI 14",
+                           line=dict(color="#F1C40F")),
+                row=row, col=1
+            )
+            for level in (30, 70):
+                fig.add_hline(y=level, line=dict(color="#7F8C8D", dash="dash", width=1), row=row, col=1)
+
+        elif study == "MACD":
+            fig.add_bar(
+                x=df["Date"], y=df["macd_hist"], name="MACD Hist",
+                marker_color=np.where(df["macd_hist"] >= 0, "#2ECC71", "#E74C3C"),
+                row=row, col=1
+            )
+            fig.add_trace(
+                go.Scatter(x=df["Date"], y=df["macd"], mode="lines", name="MACD",
+                           line=dict(color="#00B4D8")),
+                row=row, col=1
+            )
+            fig.add_trace(
+                go.Scatter(x=df["Date"], y=df["macd_signal"], mode="lines", name="Signal",
+                           line=dict(color="#E67E22")),
+                row=row, col=1
+            )
+
+        elif study == "ATR":
+            fig.add_trace(
+                go.Scatter(x=df["Date"], y=df["atr_14"], mode="lines", name="ATR 14",
+                           line=dict(color="#9B59B6")),
+                row=row, col=1
+            )
+
+        fig.update_yaxes(title_text=study, row=row, col=1)
+
+    fig.update_layout(
+        title=f"{stock} Technical Indicators",
+        template="plotly_dark",
+        height=350 + 180 * len(panels)
+    )
+
+    return fig
@@ -1,17 +1,115 @@
 import streamlit as st
-import yfinance as yf
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 
+from services import provider
+from services.freshness import swr_fetch
+from services.intraday_buffer import get_intraday_buffer
+from utils.helpers import format_as_of
+from utils.single_flight import coalesce
 
-def calculate_vwap(df: pd.DataFrame) -> pd.Series:
+INTRADAY_TTL_SECONDS = 60
+DAILY_TTL_SECONDS = 15 * 60
+BARS_TIMEOUT_SECONDS = 6.0
+
+# Intraday refreshes only fetch this much once the buffer is warm
+INTRADAY_TOPUP_PERIOD = "1d"
+
+
+@coalesce
+def download_bars(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    """
+    OHLCV bars for the chart. Identical concurrent requests
+    (same ticker / period / interval) share one download.
+    """
+    df = provider.download(
+        ticker,
+        period=period,
+        interval=interval,
+        progress=False,
+        auto_adjust=False
+    )
+
+    # yfinance logs failures and returns an empty frame;
+    # surface it so the freshness layer can count it
+    if df is None or df.empty:
+        raise ValueError(f"No bars returned for {ticker}")
+
+    return df
+
+
+def load_bars(ticker: str, period: str, interval: str, intraday: bool):
     """
-    Calculate intraday VWAP.
-    VWAP = cumulative(price * volume) / cumulative(volume)
+    Stale-while-revalidate access to chart bars.
+    Returns (DataFrame or None, Fresh result).
     """
-    pv = df["Close"] * df["Volume"]
-    return pv.cumsum() / df["Volume"].cumsum()
+    result = swr_fetch(
+        key=("bars", ticker, period, interval),
+        fetch_fn=lambda: download_bars(ticker, period, interval),
+        ttl=INTRADAY_TTL_SECONDS if intraday else DAILY_TTL_SECONDS,
+        endpoint="chart",
+        timeout=BARS_TIMEOUT_SECONDS,
+    )
+
+    df = result.value.copy() if result.value is not None else None
+    return df, result
+
+
+def clean_bars(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    yfinance bars -> flat frame [Datetime/Date, Open, High, Low, Close, Volume].
+    """
+    # Flatten MultiIndex columns
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+
+    df = df.reset_index()
+
+    # ---------------- Safe numeric conversion ----------------
+    for col in ["Open", "High", "Low", "Close", "Volume"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    return df.dropna(subset=["Close"])
+
+
+def refresh_intraday_buffer(ticker: str, period: str, interval: str):
+    """
+    Top up the (ticker, interval) ring buffer with new bars.
+    A cold buffer, or one more than a day behind, gets the whole
+    window; otherwise only the latest session is downloaded.
+    """
+    buffer = get_intraday_buffer(ticker, interval)
+    last = buffer.last_timestamp
+
+    if last is None or pd.Timestamp.now(tz=last.tz) - last > pd.Timedelta(days=1):
+        fetch_period = period
+    else:
+        fetch_period = INTRADAY_TOPUP_PERIOD
+
+    bars = clean_bars(download_bars(ticker, fetch_period, interval))
+    buffer.extend(bars, time_col="Datetime" if "Datetime" in bars.columns else "Date")
+
+    return buffer
+
+
+def load_intraday(ticker: str, period: str, interval: str):
+    """
+    Stale-while-revalidate access to the intraday ring buffer.
+    Returns (IntradayRingBuffer or None, Fresh result).
+    """
+    result = swr_fetch(
+        key=("intraday", ticker, interval),
+        fetch_fn=lambda: refresh_intraday_buffer(ticker, period, interval),
+        ttl=INTRADAY_TTL_SECONDS,
+        endpoint="chart",
+        timeout=BARS_TIMEOUT_SECONDS,
+        # The ring buffer is a live per-process object
+        shared=False,
+    )
+
+    return result.value, result
 
 
 def render_stock_chart(
@@ -33,6 +131,9 @@ def render_stock_chart(
     CHART_TYPES = ["Line", "Area", "Candlestick", "OHLC"]
     INTRADAY_FRAMES = ["1D", "5D", "1M"]
 
+    # Trading sessions shown per intraday frame (None = whole buffer)
+    INTRADAY_SESSIONS = {"1D": 1, "5D": 5, "1M": None}
+
     # ---------------- Controls ----------------
     col1, col2 = st.columns([3, 2])
 
@@ -57,41 +158,32 @@ def render_stock_chart(
     config = TIMEFRAME_CONFIG[timeframe]
 
     # ---------------- Download ----------------
-    df = yf.download(
-        ticker,
-        period=config["period"],
-        interval=config["interval"],
-        progress=False,
-        auto_adjust=False
-    )
+    # Intraday frames read straight from the ring buffer (VWAP, bands
+    # and returns are maintained per bar); daily frames are plain bars
+    if is_intraday:
+        buffer, fresh = load_intraday(ticker, config["period"], config["interval"])
+        df = buffer.to_frame(INTRADAY_SESSIONS[timeframe]) if buffer is not None else None
+    else:
+        df, fresh = load_bars(ticker, config["period"], config["interval"], is_intraday)
+        if df is not None:
+            df = clean_bars(df)
 
     if df is None or df.empty or len(df) < 2:
-        st.warning("Not enough data for selected timeframe.")
+        if fresh.error in ("timed out", "upstream unavailable"):
+            st.warning("Chart data is loading slowly — it will appear on the next refresh.")
+        else:
+            st.warning("Not enough data for selected timeframe.")
         return
 
-    # Flatten MultiIndex columns
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-
-    df = df.reset_index()
+    if fresh.stale:
+        st.caption(f"⏳ Showing cached chart data from {format_as_of(fresh.fetched_at)} — refreshing in background.")
 
     x_col = "Datetime" if "Datetime" in df.columns else "Date"
 
-    # ---------------- Safe numeric conversion ----------------
-    for col in ["Open", "High", "Low", "Close", "Volume"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    df.dropna(subset=["Close"], inplace=True)
-
     if len(df) < 2:
         st.warning("Data insufficient after cleaning.")
         return
 
-    # ---------------- VWAP (Intraday only) ----------------
-    if show_vwap and is_intraday and "Volume" in df.columns:
-        df["VWAP"] = calculate_vwap(df)
-
     # ---------------- Subplots ----------------
     fig = make_subplots(
         rows=2,
@@ -165,6 +257,20 @@ def render_stock_chart(
             row=1, col=1
         )
 
+        for band in ["VWAP_upper_1", "VWAP_lower_1"]:
+            fig.add_trace(
+                go.Scatter(
+                    x=df[x_col],
+                    y=df[band],
+                    mode="lines",
+                    name="VWAP ±1σ",
+                    showlegend=band == "VWAP_upper_1",
+                    line=dict(color="#f1c40f", width=0.8),
+                    opacity=0.5
+                ),
+                row=1, col=1
+            )
+
     # ---------------- Volume ----------------
     fig.add_trace(
         go.Bar(
@@ -0,0 +1,186 @@
+"""
+Instrument registry with a prebuilt search index.
+
+Lookups never scan the whole universe:
+- prefix matches come from sorted key arrays (bisect)
+- fuzzy matches come from a trigram -> instruments posting index
+"""
+
+import csv
+import heapq
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+REGISTRY_FIELDS = ("ticker", "name", "region", "exchange", "currency")
+
+# Trigrams present in more than this share of instruments (and at
+# least COMMON_TRIGRAM_MIN of them) carry no signal ("oil", " co")
+# and are skipped by the fuzzy matcher
+COMMON_TRIGRAM_SHARE = 0.05
+COMMON_TRIGRAM_MIN = 50
+FUZZY_MIN_SCORE = 0.35
+
+
+@dataclass(frozen=True)
+class Instrument:
+    ticker: str
+    name: str
+    region: str = ""
+    exchange: str = ""
+    currency: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"{self.ticker} — {self.name}"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class InstrumentRegistry:
+    """
+    Instruments keyed by ticker, plus precomputed views
+    (ticker list, name map, display labels) and a search index.
+    """
+
+    def __init__(self, instruments):
+        self.instruments = list({i.ticker: i for i in instruments}.values())
+        self.by_ticker = {i.ticker: i for i in self.instruments}
+
+        # Precomputed views (shared – callers must not mutate them)
+        self.tickers = [i.ticker for i in self.instruments]
+        self.sorted_tickers = sorted(self.tickers)
+        self.name_map = {i.ticker: i.name for i in self.instruments}
+        self.labels = {i.ticker: i.label for i in self.instruments}
+
+        self._build_index()
+
+    @classmethod
+    def from_csv(cls, path: str) -> "InstrumentRegistry":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        return cls(
+            Instrument(**{k: (row.get(k) or "").strip() for k in REGISTRY_FIELDS})
+            for row in rows
+            if (row.get("ticker") or "").strip()
+        )
+
+    def __len__(self) -> int:
+        return len(self.instruments)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.by_ticker
+
+    def get(self, ticker: str):
+        return self.by_ticker.get(ticker)
+
+    # --------------------------------------------------
+    # Index
+    # --------------------------------------------------
+
+    def _build_index(self):
+        ticker_keys = []
+        name_keys = []
+        postings = defaultdict(list)
+
+        for idx, inst in enumerate(self.instruments):
+            ticker = _normalize(inst.ticker)
+            name = _normalize(inst.name)
+
+            ticker_keys.append((ticker, idx))
+
+            # Full name and every word suffix ("exxon mobil", "mobil"),
+            # so a query can start at any word of the name
+            words = name.split()
+            for w in range(len(words)):
+                name_keys.append((" ".join(words[w:]), idx))
+
+            for gram in _trigrams(ticker) | _trigrams(name):
+                postings[gram].append(idx)
+
+        ticker_keys.sort()
+        name_keys.sort()
+
+        self._ticker_keys = [k for k, _ in ticker_keys]
+        self._ticker_ids = [i for _, i in ticker_keys]
+        self._name_keys = [k for k, _ in name_keys]
+        self._name_ids = [i for _, i in name_keys]
+
+        common = max(int(len(self.instruments) * COMMON_TRIGRAM_SHARE), COMMON_TRIGRAM_MIN)
+        self._postings = {
+            gram: ids for gram, ids in postings.items() if len(ids) <= common
+        }
+        self._common_grams = {
+            gram for gram, ids in postings.items() if len(ids) > common
+        }
+
+    @staticmethod
+    def _prefix(keys: list, ids: list, prefix: str):
+        """Instrument ids whose key starts with `prefix`, in key order."""
+        for i in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            yield ids[i]
+
+    def _fuzzy(self, query: str, limit: int) -> list:
+        grams = _trigrams(query) - self._common_grams
+        if not grams:
+            return []
+
+        counts = Counter()
+
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+
+        min_hits = FUZZY_MIN_SCORE * len(grams)
+        best = heapq.nlargest(
+            limit,
+            (item for item in counts.items() if item[1] >= min_hits),
+            key=lambda item: item[1],
+        )
+
+        return [idx for idx, _ in best]
+
+    # --------------------------------------------------
+    # Search
+    # --------------------------------------------------
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """
+        Tickers matching `query`, best first:
+        exact ticker, ticker prefix, name/word prefix; if nothing
+        matches literally, fuzzy (typo-tolerant, 3+ characters).
+        An empty query returns the first `limit` tickers alphabetically.
+        """
+        q = _normalize(query or "")
+
+        if not q:
+            return self.sorted_tickers[:limit]
+
+        found = {}
+
+        def take(ids):
+            for idx in ids:
+                found.setdefault(idx, None)
+                if len(found) >= limit:
+                    return True
+            return False
+
+        # An exact ticker is the shortest key with its prefix,
+        # so it always comes first
+        if not take(self._prefix(self._ticker_keys, self._ticker_ids, q)):
+            take(self._prefix(self._name_keys, self._name_ids, q))
+
+        # Typo fallback only when nothing matched literally
+        if not found and len(q) >= 3:
+            take(self._fuzzy(q, limit))
+
+        return [self.instruments[idx].ticker for idx in found]
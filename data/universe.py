@@ -1,61 +1,53 @@
 """
 Defines the global energy stock universe used in the application.
-This is the ONLY place where core stock lists are maintained.
+The instrument list lives in INSTRUMENTS_PATH; this module is the
+ONLY place that loads it.
 """
 
-ENERGY_STOCKS = {
-    "United States": {
-        "XOM": "Exxon Mobil",
-        "CVX": "Chevron",
-        "COP": "ConocoPhillips",
-        "OXY": "Occidental Petroleum",
-        "PSX": "Phillips 66"
-    },
-    "Europe": {
-        "SHEL": "Shell",
-        "BP": "BP",
-        "TTE": "TotalEnergies",
-        "E": "Eni",
-        "EQNR": "Equinor",
-        "REP.MC": "Repsol"
-    },
-    "India (NSE)": {
-        "RELIANCE.NS": "Reliance Industries",
-        "IOC.NS": "Indian Oil",
-        "ONGC.NS": "ONGC",
-        "BPCL.NS": "BPCL",
-        "HINDPETRO.NS": "Hindustan Petroleum",
-        "GAIL.NS": "GAIL"
-    },
-    "Other Markets": {
-        "PBR": "Petrobras",
-        "EC": "Ecopetrol",
-        "SU": "Suncor Energy",
-        "CNQ": "Canadian Natural Resources",
-        "IMO": "Imperial Oil",
-        "5020.T": "ENEOS",
-        "1605.T": "Inpex",
-        "2222.SR": "Saudi Aramco"
-    }
+from functools import lru_cache
+
+from data.registry import InstrumentRegistry
+
+# ticker, name, region, exchange, currency – one row per instrument
+INSTRUMENTS_PATH = "data/instruments.csv"
+
+# Crude oil benchmarks (futures) used for beta / sensitivity analysis.
+# Loaded through the same data loader path as the stock universe.
+BENCHMARKS = {
+    "BZ=F": "Brent Crude",
+    "CL=F": "WTI Crude"
 }
 
 # --------------------------------------------------
 # Derived helpers (DO NOT duplicate data elsewhere)
 # --------------------------------------------------
 
+@lru_cache(maxsize=1)
+def get_registry() -> InstrumentRegistry:
+    """Registry + search index, built once per process."""
+    return InstrumentRegistry.from_csv(INSTRUMENTS_PATH)
+
+
 def get_all_tickers() -> list:
-    """Returns flat list of all tickers."""
-    return [
-        ticker
-        for region in ENERGY_STOCKS.values()
-        for ticker in region.keys()
-    ]
+    """Returns flat list of all tickers (cached – do not mutate)."""
+    return get_registry().tickers
 
 
 def get_ticker_name_map() -> dict:
-    """Returns {ticker: company_name} mapping."""
-    return {
-        ticker: name
-        for region in ENERGY_STOCKS.values()
-        for ticker, name in region.items()
-    }
+    """Returns {ticker: company_name} mapping (cached – do not mutate)."""
+    return get_registry().name_map
+
+
+def get_ticker_labels() -> dict:
+    """Returns {ticker: "TICKER — Company"} display labels (cached)."""
+    return get_registry().labels
+
+
+def search_instruments(query: str, limit: int = 50) -> list:
+    """Tickers matching a ticker / company-name query, best first."""
+    return get_registry().search(query, limit=limit)
+
+
+def get_benchmark_tickers() -> list:
+    """Returns list of crude oil benchmark tickers."""
+    return list(BENCHMARKS.keys())
@@ -0,0 +1,189 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+FACTORS_PATH = "data/cache/adjustments.parquet"
+
+# Relative change below which two consecutive factors are the same step
+FACTOR_TOLERANCE = 1e-6
+
+ADJUSTED_COLUMNS = ["Open", "High", "Low", "Close"]
+_FACTOR_COLUMNS = ["stock", "Date", "factor"]
+
+_factors = None
+_lock = threading.Lock()
+
+
+# --------------------------------------------------
+# Factor table: one row per (ticker, date a factor starts)
+# --------------------------------------------------
+# Stored prices are raw (auto_adjust=False). The adjusted price of a
+# bar is raw * factor, where factor is the step in effect on its date.
+# Factors only change on ex-dates, so a ticker with a few dividends a
+# year needs a few rows instead of a second price series.
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({
+        "stock": pd.Series(dtype=object),
+        "Date": pd.Series(dtype="datetime64[ns]"),
+        "factor": pd.Series(dtype=float),
+    })
+
+
+def _compact(steps: pd.DataFrame) -> pd.DataFrame:
+    """Keep only the rows where a ticker's factor actually changes."""
+    if steps.empty:
+        return steps
+
+    steps = steps.sort_values(["stock", "Date"]).reset_index(drop=True)
+    factor = steps["factor"].to_numpy()
+    stock = steps["stock"].to_numpy()
+
+    keep = np.ones(len(steps), dtype=bool)
+    keep[1:] = (stock[1:] != stock[:-1]) | (
+        np.abs(factor[1:] - factor[:-1]) > FACTOR_TOLERANCE * np.abs(factor[:-1])
+    )
+
+    return steps[keep].reset_index(drop=True)
+
+
+def extract_factors(df: pd.DataFrame):
+    """
+    Split an unadjusted download into raw bars and factor steps.
+    `df` is a long frame with Date, Close, Adj Close and stock.
+    Returns (frame without Adj Close, steps DataFrame).
+    """
+    if df is None or df.empty or "Adj Close" not in df.columns:
+        return df, _empty()
+
+    valid = df["Close"].notna() & df["Adj Close"].notna() & (df["Close"] != 0)
+
+    steps = pd.DataFrame({
+        "stock": df.loc[valid, "stock"].to_numpy(),
+        "Date": pd.to_datetime(df.loc[valid, "Date"]).astype("datetime64[ns]").to_numpy(),
+        "factor": (df.loc[valid, "Adj Close"] / df.loc[valid, "Close"]).to_numpy(),
+    })
+
+    return df.drop(columns=["Adj Close"]), _compact(steps)
+
+
+# --------------------------------------------------
+# Store
+# --------------------------------------------------
+
+def _load() -> pd.DataFrame:
+    """Factor table, read from disk once per process. Caller holds _lock."""
+    global _factors
+
+    if _factors is None:
+        try:
+            _factors = pd.read_parquet(FACTORS_PATH)[_FACTOR_COLUMNS]
+            _factors["Date"] = _factors["Date"].astype("datetime64[ns]")
+        except Exception:
+            _factors = _empty()
+
+    return _factors
+
+
+def _save(factors: pd.DataFrame):
+    os.makedirs(os.path.dirname(FACTORS_PATH), exist_ok=True)
+    tmp = f"{FACTORS_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    factors.to_parquet(tmp, index=False)
+    os.replace(tmp, FACTORS_PATH)
+
+
+def get_factors(tickers=None) -> pd.DataFrame:
+    with _lock:
+        factors = _load()
+
+    if tickers is not None:
+        factors = factors[factors["stock"].isin(list(tickers))]
+
+    return factors
+
+
+def update_factors(steps: pd.DataFrame, price_ratios: dict | None = None):
+    """
+    Merge factor steps from a download into the table.
+
+    `steps` for a ticker cover the downloaded window only. Steps
+    before the window are kept and rescaled so the adjusted series
+    stays continuous at the window start: a dividend (or split) that
+    went ex inside the window changes every earlier factor by the same
+    ratio, so history is never re-fetched for it.
+
+    `price_ratios` {ticker: fresh raw close / stored raw close} at the
+    window start covers splits, which also rewrite Yahoo's raw closes.
+    """
+    if steps is None or steps.empty:
+        return
+
+    price_ratios = price_ratios or {}
+
+    with _lock:
+        global _factors
+        factors = _load()
+
+        untouched = factors[~factors["stock"].isin(steps["stock"].unique())]
+        merged = [untouched]
+
+        for ticker, new in steps.groupby("stock", sort=False):
+            new = new.sort_values("Date")
+            start = new["Date"].iloc[0]
+
+            old = factors[factors["stock"] == ticker]
+            before = old[old["Date"] < start]
+
+            if not before.empty:
+                in_effect = old[old["Date"] <= start]["factor"].iloc[-1]
+                scale = new["factor"].iloc[0] * price_ratios.get(ticker, 1.0) / in_effect
+                before = before.assign(factor=before["factor"] * scale)
+
+            merged.extend([before, new])
+
+        _factors = _compact(pd.concat(merged, ignore_index=True)[_FACTOR_COLUMNS])
+        _save(_factors)
+
+
+# --------------------------------------------------
+# Read-time adjustment
+# --------------------------------------------------
+
+def apply_adjustments(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adjusted copy of a raw long frame (Date, OHLC..., stock):
+    one as-of join to the factor table and a vectorized multiply.
+    Tickers (or dates) without a factor are left as stored.
+    """
+    if df is None or df.empty:
+        return df
+
+    factors = get_factors(df["stock"].unique())
+    if factors.empty:
+        return df
+
+    left = pd.DataFrame({
+        "Date": pd.to_datetime(df["Date"]).astype("datetime64[ns]").to_numpy(),
+        "stock": df["stock"].to_numpy(),
+        "_row": np.arange(len(df)),
+    }).sort_values("Date")
+
+    joined = pd.merge_asof(
+        left,
+        factors.sort_values("Date"),
+        on="Date",
+        by="stock",
+        direction="backward",
+    )
+
+    factor = np.ones(len(df))
+    factor[joined["_row"].to_numpy()] = joined["factor"].fillna(1.0).to_numpy()
+
+    out = df.copy()
+    for col in ADJUSTED_COLUMNS:
+        if col in out.columns:
+            out[col] = out[col].to_numpy(dtype=float) * factor
+
+    return out
@@ -0,0 +1,291 @@
+import abc
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+ALERTS_DB_PATH = "data/cache/alerts.sqlite"
+DEFAULT_DROP_PCT = 3.0
+SESSION_STATE_SIZE = 256   # sessions whose last prices / flags are kept
+
+
+@dataclass
+class Alert:
+    ticker: str
+    rule: str
+    message: str
+    price: float
+    ts: float = field(default_factory=time.time)
+
+
+# --------------------------------------------------
+# Rules
+# --------------------------------------------------
+# Each rule looks at one ticker's new quote, its daily reference
+# levels and its own flag from the previous evaluation, and fires
+# on a transition only (not on every update while the condition holds).
+
+class Rule(abc.ABC):
+    key = "rule"
+
+    @abc.abstractmethod
+    def check(self, quote: dict, ref: dict):
+        """True / False for the condition, None if it can't be evaluated."""
+
+    def fires(self, previous, current) -> bool:
+        return bool(current) and previous is not True
+
+    @abc.abstractmethod
+    def message(self, ticker: str, quote: dict, ref: dict, current) -> str:
+        """Alert text for a fired rule."""
+
+
+class MovingAverageCross(Rule):
+    """Price crossing its daily moving average (either direction)."""
+
+    def __init__(self, column: str = "ma_50"):
+        self.column = column
+        self.key = f"cross_{column}"
+
+    def check(self, quote, ref):
+        ma = ref.get(self.column)
+        if ma is None or ma != ma:
+            return None
+        return quote["current_price"] > ma
+
+    def fires(self, previous, current):
+        # Needs a known previous side to be a cross
+        return previous is not None and current != previous
+
+    def message(self, ticker, quote, ref, current):
+        direction = "above" if current else "below"
+        label = self.column.upper().replace("_", "")
+        return f"{ticker} crossed {direction} its {label} ({ref[self.column]:.2f})"
+
+
+class High52WeekBreak(Rule):
+    """
+    Price trading above the prior 52-week high: the reference
+    excludes the latest session, whose own high tracks the price.
+    """
+
+    key = "high_52w"
+
+    def check(self, quote, ref):
+        high = ref.get("prior_high_52w")
+        if high is None or high != high:
+            return None
+        return quote["current_price"] > high
+
+    def message(self, ticker, quote, ref, current):
+        return f"{ticker} broke its 52-week high ({ref['prior_high_52w']:.2f})"
+
+
+class IntradayDrop(Rule):
+    """Price down more than `threshold_pct` from the previous close."""
+
+    def __init__(self, threshold_pct: float = DEFAULT_DROP_PCT):
+        self.threshold_pct = threshold_pct
+        self.key = f"drop_{threshold_pct:g}"
+
+    def check(self, quote, ref):
+        change = quote.get("pct_change")
+        if change is None:
+            return None
+        return change <= -self.threshold_pct
+
+    def message(self, ticker, quote, ref, current):
+        return f"{ticker} is down {abs(quote['pct_change']):.2f}% today (>{self.threshold_pct:g}%)"
+
+
+def default_rules(drop_pct: float = DEFAULT_DROP_PCT) -> list:
+    return [MovingAverageCross("ma_50"), High52WeekBreak(), IntradayDrop(drop_pct)]
+
+
+# --------------------------------------------------
+# Store
+# --------------------------------------------------
+
+class AlertStore:
+    """Fired alerts in a local SQLite file."""
+
+    def __init__(self, path: str = ALERTS_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    ticker TEXT NOT NULL,
+                    rule TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    price REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def add(self, alerts: list):
+        if not alerts:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO alerts (ts, ticker, rule, message, price) VALUES (?, ?, ?, ?, ?)",
+                [(a.ts, a.ticker, a.rule, a.message, a.price) for a in alerts],
+            )
+
+    def recent(self, limit: int = 20) -> list:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker, rule, message, price, ts FROM alerts ORDER BY ts DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [Alert(ticker, rule, message, price, ts) for ticker, rule, message, price, ts in rows]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM alerts")
+
+
+# --------------------------------------------------
+# Engine
+# --------------------------------------------------
+
+@dataclass
+class _SessionState:
+    last_price: dict = field(default_factory=dict)   # {ticker: price}
+    flags: dict = field(default_factory=dict)        # {(ticker, rule key): bool}
+
+
+class AlertEngine:
+    """
+    Evaluates every rule incrementally on batches of live quotes.
+
+    Per session it keeps the last price seen per ticker and each rule's
+    last condition, so a batch costs O(changed tickers x rules):
+    unchanged quotes are skipped and no history is re-read. Every
+    session is notified of its own transitions; the store records each
+    transition once, tracked by the engine-wide flags.
+    """
+
+    def __init__(self, rules=None, store: AlertStore | None = None):
+        self.rules = rules or default_rules()
+        self.store = store
+        self.reference = {}       # {ticker: {"ma_50", "prior_high_52w"}}
+        self._sessions = OrderedDict()   # {session: _SessionState}
+        self._flags = {}          # {(ticker, rule key): bool}, for the store
+        self._reference_source = None
+        self._lock = threading.Lock()
+
+    def set_rules(self, rules: list):
+        """Default rules for process() calls that don't pass their own."""
+        with self._lock:
+            self.rules = rules
+
+    def set_reference(self, snapshot):
+        """
+        Daily reference levels from a latest-bar snapshot
+        (services.screener). Reloaded only when the snapshot changes.
+        """
+        if snapshot is self._reference_source or snapshot is None or snapshot.empty:
+            return
+
+        levels = snapshot.set_index("stock")[["ma_50", "prior_high_52w"]].to_dict("index")
+
+        with self._lock:
+            self.reference.update(levels)
+            self._reference_source = snapshot
+            for state in self._sessions.values():
+                state.last_price.clear()
+
+    def update_reference(self, ticker: str, **levels):
+        with self._lock:
+            if self.reference.get(ticker) != levels:
+                self.reference[ticker] = levels
+                for state in self._sessions.values():
+                    state.last_price.pop(ticker, None)
+
+    def _session(self, session) -> _SessionState:
+        state = self._sessions.get(session)
+        if state is None:
+            state = self._sessions[session] = _SessionState()
+        self._sessions.move_to_end(session)
+        while len(self._sessions) > SESSION_STATE_SIZE:
+            self._sessions.popitem(last=False)
+        return state
+
+    def process(self, quotes: dict, rules: list | None = None, session=None) -> list:
+        """
+        Feed {ticker: snapshot dict} (get_live_price_snapshot shape).
+        `rules` (default: the engine's) can differ per caller, e.g. a
+        session's own drop threshold. Last prices and rule flags are
+        tracked per `session`, so sessions seeing the same quotes are
+        each notified. Returns the alerts newly fired for this session;
+        alerts new to the engine are also written to the store.
+        """
+        rules = rules or self.rules
+        fired = []
+        stored = []
+
+        with self._lock:
+            state = self._session(session)
+
+            for ticker, quote in quotes.items():
+                price = (quote or {}).get("current_price")
+                if price is None or state.last_price.get(ticker) == price:
+                    continue
+
+                state.last_price[ticker] = price
+                ref = self.reference.get(ticker, {})
+
+                for rule in rules:
+                    current = rule.check(quote, ref)
+                    if current is None:
+                        continue
+
+                    flag = (ticker, rule.key)
+                    session_fires = rule.fires(state.flags.get(flag), current)
+                    engine_fires = rule.fires(self._flags.get(flag), current)
+                    state.flags[flag] = current
+                    self._flags[flag] = current
+
+                    if not (session_fires or engine_fires):
+                        continue
+
+                    alert = Alert(
+                        ticker=ticker,
+                        rule=rule.key,
+                        message=rule.message(ticker, quote, ref, current),
+                        price=float(price),
+                    )
+                    if session_fires:
+                        fired.append(alert)
+                    if engine_fires:
+                        stored.append(alert)
+
+        if self.store is not None:
+            self.store.add(stored)
+
+        return fired
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> AlertEngine:
+    """Process-wide engine backed by the local alert store."""
+    global _engine
+
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine(store=AlertStore())
+        return _engine
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+
+import pandas as pd
+
+from services import provider
+
+BASE_URL = "https://query1.finance.yahoo.com"
+REQUEST_TIMEOUT_SECONDS = 5.0
+MAX_CONCURRENCY = 32
+
+
+# --------------------------------------------------
+# Parsing (Yahoo chart API JSON)
+# --------------------------------------------------
+
+def parse_chart(payload: dict) -> tuple:
+    """
+    Parse a /v8/finance/chart response.
+    Returns (meta dict, bars DataFrame[Datetime, Open, High, Low, Close, Volume]).
+    """
+    chart = (payload or {}).get("chart") or {}
+
+    if chart.get("error"):
+        raise ValueError(chart["error"].get("description", "chart error"))
+
+    results = chart.get("result") or []
+    if not results:
+        raise ValueError("empty chart result")
+
+    result = results[0]
+    meta = result.get("meta") or {}
+    timestamps = result.get("timestamp") or []
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+
+    bars = pd.DataFrame({
+        "Datetime": pd.to_datetime(timestamps, unit="s", utc=True),
+        "Open": quote.get("open", [None] * len(timestamps)),
+        "High": quote.get("high", [None] * len(timestamps)),
+        "Low": quote.get("low", [None] * len(timestamps)),
+        "Close": quote.get("close", [None] * len(timestamps)),
+        "Volume": quote.get("volume", [None] * len(timestamps)),
+    })
+
+    tz = meta.get("exchangeTimezoneName")
+    if tz and not bars.empty:
+        bars["Datetime"] = bars["Datetime"].dt.tz_convert(tz)
+
+    for col in ["Open", "High", "Low", "Close", "Volume"]:
+        bars[col] = pd.to_numeric(bars[col], errors="coerce")
+
+    return meta, bars.dropna(subset=["Close"]).reset_index(drop=True)
+
+
+def quote_from_meta(meta: dict) -> dict:
+    """
+    Same shape as get_live_price_snapshot().
+    """
+    current_price = meta.get("regularMarketPrice")
+    prev_close = meta.get("previousClose") or meta.get("chartPreviousClose")
+
+    if current_price is None or not prev_close:
+        return {}
+
+    return {
+        "current_price": float(current_price),
+        "previous_close": float(prev_close),
+        "pct_change": float((current_price / prev_close - 1) * 100),
+    }
+
+
+# --------------------------------------------------
+# Async API
+# --------------------------------------------------
+
+def _new_session():
+    from curl_cffi.requests import AsyncSession
+    return AsyncSession(impersonate="chrome", max_clients=MAX_CONCURRENCY)
+
+
+async def _throttle(deadline: float) -> bool:
+    """
+    Take one token from the shared bucket without blocking the loop.
+    Returns False if none is available before `deadline` (loop time).
+    """
+    loop = asyncio.get_running_loop()
+    waited = 0.0
+
+    while True:
+        delay = provider.try_throttle()
+        if delay == 0:
+            if waited:
+                provider.record_wait(waited)
+            return True
+        if loop.time() + delay > deadline:
+            return False
+        await asyncio.sleep(delay)
+        waited += delay
+
+
+async def fetch_chart(
+    session,
+    ticker: str,
+    range_: str = "1d",
+    interval: str = "5m",
+    base_url: str = BASE_URL,
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+) -> tuple:
+    """
+    One chart request -> (meta, bars). Paced by the shared token bucket;
+    `timeout` covers the wait for a token as well as the request, and a
+    ticker that can't get a token in time is skipped (TimeoutError).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    if not await _throttle(deadline):
+        raise TimeoutError(f"No request slot for {ticker} within {timeout:.1f}s")
+
+    remaining = max(deadline - loop.time(), 0.0)
+
+    response = await asyncio.wait_for(
+        session.get(
+            f"{base_url}/v8/finance/chart/{ticker}",
+            params={"range": range_, "interval": interval, "includePrePost": "false"},
+            timeout=remaining,
+        ),
+        timeout=remaining,
+    )
+
+    if response.status_code != 200:
+        raise ValueError(f"HTTP {response.status_code} for {ticker}")
+
+    return parse_chart(response.json())
+
+
+async def gather_charts(
+    tickers,
+    range_: str = "1d",
+    interval: str = "5m",
+    base_url: str = BASE_URL,
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+    session=None,
+) -> dict:
+    """
+    Fan out chart requests for many tickers at once.
+    Each request has its own timeout; failures are isolated.
+    Returns {ticker: (meta, bars) or Exception}.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    owns_session = session is None
+    session = session or _new_session()
+    limit = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def one(ticker):
+        async with limit:
+            return await fetch_chart(session, ticker, range_, interval, base_url, timeout)
+
+    try:
+        results = await asyncio.gather(
+            *(one(t) for t in tickers),
+            return_exceptions=True,
+        )
+    finally:
+        if owns_session:
+            await session.close()
+
+    for result in results:
+        if isinstance(result, Exception):
+            provider.record_failure()
+
+    return dict(zip(tickers, results))
+
+
+async def gather_quotes(tickers, base_url: str = BASE_URL, timeout: float = REQUEST_TIMEOUT_SECONDS) -> dict:
+    """
+    Live quotes for many tickers concurrently: {ticker: snapshot dict}
+    ({} for tickers that failed or timed out).
+    """
+    charts = await gather_charts(tickers, "1d", "1d", base_url=base_url, timeout=timeout)
+
+    return {
+        t: ({} if isinstance(r, Exception) else quote_from_meta(r[0]))
+        for t, r in charts.items()
+    }
+
+
+async def gather_intraday_bars(
+    tickers,
+    range_: str = "1d",
+    interval: str = "5m",
+    base_url: str = BASE_URL,
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+) -> dict:
+    """
+    Intraday bars for many tickers concurrently: {ticker: DataFrame}
+    (empty DataFrame for tickers that failed or timed out).
+    """
+    charts = await gather_charts(tickers, range_, interval, base_url=base_url, timeout=timeout)
+
+    return {
+        t: (pd.DataFrame() if isinstance(r, Exception) else r[1])
+        for t, r in charts.items()
+    }
+
+
+# --------------------------------------------------
+# Sync facade (Streamlit scripts are synchronous)
+# --------------------------------------------------
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from sync code.
+    Uses a private event loop in a helper thread if the calling
+    thread already has a running loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    box = {}
+
+    def runner():
+        try:
+            box["value"] = asyncio.run(coro)
+        except BaseException as exc:
+            box["error"] = exc
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join()
+
+    if "error" in box:
+        raise box["error"]
+    return box["value"]
+
+
+def fetch_quotes(tickers, base_url: str = BASE_URL, timeout: float = REQUEST_TIMEOUT_SECONDS) -> dict:
+    """Sync wrapper around gather_quotes."""
+    return run_sync(gather_quotes(tickers, base_url=base_url, timeout=timeout))
+
+
+def fetch_intraday_bars(
+    tickers,
+    range_: str = "1d",
+    interval: str = "5m",
+    base_url: str = BASE_URL,
+    timeout: float = REQUEST_TIMEOUT_SECONDS,
+) -> dict:
+    """Sync wrapper around gather_intraday_bars."""
+    return run_sync(
+        gather_intraday_bars(tickers, range_, interval, base_url=base_url, timeout=timeout)
+    )
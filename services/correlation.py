@@ -0,0 +1,295 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from services.price_panel import PricePanel
+
+PREFIX_SUBSETS = 8   # ticker subsets with prefix sums per moments object
+
+
+@dataclass
+class RollingMoments:
+    """
+    Daily returns of a panel plus cumulative (prefix) sums of the
+    returns and their cross products.
+
+    Every rolling covariance / correlation for every window is a
+    difference of two rows of the prefix sums, so one pass over the
+    returns serves all windows. The sums are kept only for the ticker
+    subsets asked for (prefix_sums), so memory is O(T * K^2) for K
+    tickers rather than O(T * N^2) for the whole universe; the latest
+    N x N matrix is one window of matrix products over `returns`.
+
+    Missing sessions are handled pairwise: a day only counts for
+    pair (i, j) when both tickers traded.
+    Prefix arrays have a leading zero row, i.e. shape (T + 1, K, K).
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: list
+    returns: np.ndarray   # (T, N) daily returns, NaN where not traded
+    # {tickers: (n, sx, sxx, sxy)} pair counts, sum of x_i where j is
+    # also valid, sum of x_i^2 where j is also valid, sum of x_i * x_j
+    prefix: OrderedDict = field(default_factory=OrderedDict, repr=False)
+
+
+def _cross_sums(returns: np.ndarray) -> tuple:
+    """Per-day pair sums (n, sx, sxx, sxy), each (T, K, K)."""
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    v = valid.astype("float64")
+
+    n = np.einsum("ti,tj->tij", v, v)
+    sx = np.einsum("ti,tj->tij", x, v)
+    sxx = np.einsum("ti,tj->tij", x * x, v)
+    sxy = np.einsum("ti,tj->tij", x, x)
+
+    return n, sx, sxx, sxy
+
+
+def _window_sums(returns: np.ndarray) -> tuple:
+    """Pair sums (n, sx, sxx, sxy) over all rows of `returns`, each (N, N)."""
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    v = valid.astype("float64")
+
+    # sx[i, j] is the sum of x_i over days both i and j traded
+    return v.T @ v, x.T @ v, (x * x).T @ v, x.T @ x
+
+
+def _prefix(values: np.ndarray, start: np.ndarray | None = None) -> np.ndarray:
+    out = np.cumsum(values, axis=0)
+    if start is None:
+        return np.concatenate([np.zeros((1,) + values.shape[1:]), out])
+    return out + start
+
+
+def _cols(moments: RollingMoments, tickers: tuple) -> list:
+    return [moments.tickers.index(t) for t in tickers]
+
+
+def build_rolling_moments(panel: PricePanel) -> RollingMoments:
+    """
+    Single pass over the panel's daily returns.
+    """
+    return RollingMoments(panel.dates, list(panel.tickers), panel.returns(missing="nan"))
+
+
+def prefix_sums(moments: RollingMoments, tickers=None) -> tuple:
+    """
+    Prefix sums (n, sx, sxx, sxy) for `tickers` (default: all), built
+    once per subset and kept on the moments (at most PREFIX_SUBSETS).
+    """
+    if tickers is None:
+        tickers = tuple(moments.tickers)
+    else:
+        tickers = tuple(t for t in tickers if t in moments.tickers)
+
+    with _moments_lock:
+        sums = moments.prefix.get(tickers)
+        if sums is not None:
+            moments.prefix.move_to_end(tickers)
+            return sums
+
+    returns = moments.returns[:, _cols(moments, tickers)]
+    sums = tuple(_prefix(a) for a in _cross_sums(returns))
+
+    with _moments_lock:
+        moments.prefix[tickers] = sums
+        moments.prefix.move_to_end(tickers)
+        while len(moments.prefix) > PREFIX_SUBSETS:
+            moments.prefix.popitem(last=False)
+
+    return sums
+
+
+def update_rolling_moments(moments: RollingMoments, panel: PricePanel) -> RollingMoments:
+    """
+    Extend the returns and every cached prefix sum with bars the panel
+    gained since the moments were built. The last known row is
+    recomputed as well, since the panel may have revised it.
+    Falls back to a full rebuild if the ticker set or history changed.
+    """
+    if panel.tickers != moments.tickers or len(moments.dates) == 0:
+        return build_rolling_moments(panel)
+
+    keep = len(moments.dates) - 1
+    if len(panel.dates) < keep or not panel.dates[:keep].equals(moments.dates[:keep]):
+        return build_rolling_moments(panel)
+
+    # returns for rows keep..T need the close of row keep-1
+    lo = max(keep - 1, 0)
+    tail = PricePanel(
+        panel.dates[lo:], panel.tickers, panel.close[lo:], panel.observed[lo:]
+    ).returns(missing="nan")
+    if keep > 0:
+        tail = tail[1:]
+
+    updated = RollingMoments(
+        panel.dates, list(panel.tickers), np.vstack([moments.returns[:keep], tail])
+    )
+
+    with _moments_lock:
+        subsets = list(moments.prefix.items())
+
+    # prefix row `keep` is the running total through row keep-1
+    for tickers, sums in subsets:
+        updated.prefix[tickers] = tuple(
+            np.concatenate([old[: keep + 1], _prefix(part, start=old[keep])])
+            for old, part in zip(sums, _cross_sums(tail[:, _cols(moments, tickers)]))
+        )
+
+    return updated
+
+
+def _window_diff(prefix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Windowed sums ending at each row.
+    Rows with fewer than `window` prior rows use the expanding sum.
+    """
+    hi = np.arange(1, len(prefix))
+    lo = np.maximum(hi - window, 0)
+    return prefix[hi] - prefix[lo]
+
+
+def _cov_corr(n, sx, sxx, sxy, window: int, min_periods=None):
+    min_periods = min_periods or max(window // 2, 2)
+
+    # The partner's sums are the transposes
+    sy = np.swapaxes(sx, -1, -2)
+    syy = np.swapaxes(sxx, -1, -2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sxy - sx * sy / n) / (n - 1)
+        var_x = (sxx - sx * sx / n) / (n - 1)
+        var_y = (syy - sy * sy / n) / (n - 1)
+        corr = cov / np.sqrt(var_x * var_y)
+
+    too_short = n < min_periods
+    cov[too_short] = np.nan
+    corr[too_short] = np.nan
+
+    return cov, np.clip(corr, -1.0, 1.0)
+
+
+def _rolling(moments: RollingMoments, window: int, min_periods, tickers) -> tuple:
+    sums = [_window_diff(p, window) for p in prefix_sums(moments, tickers)]
+    return _cov_corr(*sums, window, min_periods)
+
+
+def rolling_covariance(moments: RollingMoments, window: int, min_periods=None,
+                       tickers=None) -> np.ndarray:
+    """
+    (T, K, K) rolling covariance of daily returns for `tickers`
+    (default: all). Memory grows with K^2, so pass the subset needed.
+    """
+    return _rolling(moments, window, min_periods, tickers)[0]
+
+
+def rolling_correlation(moments: RollingMoments, window: int, min_periods=None,
+                        tickers=None) -> np.ndarray:
+    """
+    (T, K, K) rolling correlation of daily returns for `tickers`
+    (default: all). Memory grows with K^2, so pass the subset needed.
+    """
+    return _rolling(moments, window, min_periods, tickers)[1]
+
+
+def correlation_matrix(moments: RollingMoments, window: int, end: int = -1) -> pd.DataFrame:
+    """
+    N x N correlation for the window ending at row `end` (default: latest).
+    Only reads the window's rows, so it is O(window * N^2).
+    """
+    if len(moments.dates) == 0:
+        return pd.DataFrame()
+
+    end = end % len(moments.dates)
+    rows = moments.returns[max(end + 1 - window, 0): end + 1]
+
+    corr = _cov_corr(*_window_sums(rows), window)[1]
+    np.fill_diagonal(corr, 1.0)
+
+    return pd.DataFrame(corr, index=moments.tickers, columns=moments.tickers)
+
+
+def pair_correlation_series(
+    moments: RollingMoments,
+    ticker: str,
+    peers: list,
+    window: int,
+) -> pd.DataFrame:
+    """
+    Rolling correlation of `ticker` against each peer over time.
+    """
+    if ticker not in moments.tickers:
+        return pd.DataFrame()
+
+    peers = [p for p in dict.fromkeys(peers) if p in moments.tickers and p != ticker]
+
+    if not peers:
+        return pd.DataFrame()
+
+    # Only the selected pairs are summed: O(T * len(peers)^2)
+    corr = rolling_correlation(moments, window, tickers=[ticker] + peers)[:, 0, 1:]
+
+    return pd.DataFrame(corr, index=moments.dates, columns=peers)
+
+
+def rank_peers(corr: pd.DataFrame, ticker: str, n: int = 5) -> tuple:
+    """
+    Most and least correlated peers for `ticker`.
+    Returns (most_df, least_df) with columns [stock, correlation].
+    """
+    if corr.empty or ticker not in corr.index:
+        return pd.DataFrame(), pd.DataFrame()
+
+    row = corr.loc[ticker].drop(ticker).dropna().sort_values(ascending=False)
+    ranked = row.rename("correlation").rename_axis("stock").reset_index()
+
+    most = ranked.head(n)
+    # With fewer than 2n peers the lists would overlap
+    least = ranked.iloc[len(most):].tail(n).iloc[::-1].reset_index(drop=True)
+
+    return most, least
+
+
+# --------------------------------------------------
+# Process-level cache (updated incrementally)
+# --------------------------------------------------
+
+MOMENTS_CACHE_SIZE = 32   # (key) entries
+
+_MOMENTS_CACHE = OrderedDict()   # {key: (panel, moments)}
+_moments_lock = threading.Lock()
+
+
+def get_rolling_moments(panel: PricePanel, key: str = "universe") -> RollingMoments:
+    """
+    Cached moments for a panel. If the panel was topped up from the
+    cached one (price_panel only does that when the frame just added
+    bars) the returns and prefix sums are extended with the new rows;
+    otherwise they are rebuilt.
+    """
+    with _moments_lock:
+        cached = _MOMENTS_CACHE.get(key)
+        if cached is not None:
+            _MOMENTS_CACHE.move_to_end(key)
+
+    if cached is not None and cached[0] is panel:
+        return cached[1]
+
+    if cached is not None and panel.extends is not None and panel.extends() is cached[0]:
+        moments = update_rolling_moments(cached[1], panel)
+    else:
+        moments = build_rolling_moments(panel)
+
+    with _moments_lock:
+        _MOMENTS_CACHE[key] = (panel, moments)
+        _MOMENTS_CACHE.move_to_end(key)
+        while len(_MOMENTS_CACHE) > MOMENTS_CACHE_SIZE:
+            _MOMENTS_CACHE.popitem(last=False)
+
+    return moments
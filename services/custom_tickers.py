@@ -0,0 +1,275 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from services import provider
+from services.preprocessing import preprocess_price_data
+from services.adjustments import extract_factors, update_factors, apply_adjustments
+from services.validation import validate_and_quarantine
+from services.history_store import (
+    read_history,
+    write_history,
+    touch_history,
+    merge_history,
+    topup_start,
+)
+from utils.single_flight import coalesce
+
+CUSTOM_TTL_SECONDS = 60 * 60
+FAILURE_TTL_SECONDS = 60   # failed tickers are not retried before this
+HISTORY_CACHE_SIZE = 64    # (ticker, period) entries
+MAX_WORKERS = 4
+
+# {(ticker, period): (fetched_at, DataFrame, or None if it failed)}
+_HISTORY_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def quality_key(ticker: str) -> str:
+    """Validation key of a custom ticker (its own report / quarantine file)."""
+    return f"custom_{ticker}"
+
+
+def fetch_custom_history(tickers, period: str = "5y", adjusted: bool = True) -> tuple:
+    """
+    Daily history for ad-hoc tickers outside the universe.
+    Raw bars are cached once they pass the data-quality checks
+    (failing bars are quarantined); split/dividend adjustment is
+    applied on return unless adjusted=False.
+
+    Lookup order per ticker:
+      1. in-process TTL cache (failures are remembered for
+         FAILURE_TTL_SECONDS, so reruns don't re-download them)
+      2. on-disk history cache (incremental top-up when stale)
+      3. network, as ONE batched multi-ticker request
+
+    If a batch fails as a whole, tickers are retried individually on a
+    small bounded pool. A bad ticker never breaks the others.
+
+    Returns ({ticker: preprocessed DataFrame}, [failed tickers]).
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+
+    frames = {}
+    misses = []
+    now = time.time()
+
+    with _CACHE_LOCK:
+        for ticker in tickers:
+            cached = _HISTORY_CACHE.get((ticker, period))
+            if cached is None:
+                misses.append(ticker)
+            elif cached[1] is None and now - cached[0] < FAILURE_TTL_SECONDS:
+                _HISTORY_CACHE.move_to_end((ticker, period))
+            elif cached[1] is not None and now - cached[0] < CUSTOM_TTL_SECONDS:
+                _HISTORY_CACHE.move_to_end((ticker, period))
+                frames[ticker] = cached[1]
+            else:
+                misses.append(ticker)
+
+    # -----------------------------------
+    # Disk cache
+    # -----------------------------------
+    full = []
+    stale = {}
+    validated = set()
+
+    for ticker in misses:
+        df, needs_topup = read_history(ticker, period)
+        if df is not None and "Adj Close" in df.columns:
+            # Written before factors were split out (and validated)
+            df = _validate(ticker, _split_factors({ticker: df})[ticker])
+            write_history(ticker, df, period)
+            validated.add(ticker)
+        if df is None:
+            full.append(ticker)
+        elif needs_topup:
+            stale[ticker] = df
+        else:
+            frames[ticker] = df
+
+    # -----------------------------------
+    # Network: full downloads
+    # -----------------------------------
+    fetched = {}
+
+    if full:
+        downloaded = _split_factors(_download(full, period=period))
+        for ticker, df in downloaded.items():
+            # The query engine reads histories straight from disk, so
+            # only clean bars are persisted
+            df = _validate(ticker, df)
+            write_history(ticker, df, period)
+            fetched[ticker] = df
+            validated.add(ticker)
+
+    # -----------------------------------
+    # Network: incremental top-ups
+    # -----------------------------------
+    if stale:
+        start = min(topup_start(df) for df in stale.values())
+        fresh = _download(list(stale), start=start)
+        fresh = _split_factors(fresh, _price_ratios(stale, fresh))
+
+        for ticker, cached_df in stale.items():
+            if ticker not in fresh:
+                # Serve what we have; retry the top-up next time
+                fetched[ticker] = cached_df
+                continue
+
+            merged = merge_history(cached_df, fresh[ticker])
+            if len(merged) == len(cached_df) and merged["Date"].max() == cached_df["Date"].max():
+                touch_history(ticker)
+            else:
+                merged = _validate(ticker, merged)
+                write_history(ticker, merged, period)
+                validated.add(ticker)
+            fetched[ticker] = merged
+
+    frames.update(fetched)
+
+    # Everything read from disk / the network is validated once; the
+    # in-process cache holds clean frames
+    for ticker in misses:
+        if ticker in frames and ticker not in validated:
+            frames[ticker] = _validate(ticker, frames[ticker])
+
+    with _CACHE_LOCK:
+        for ticker in misses:
+            _HISTORY_CACHE[(ticker, period)] = (time.time(), frames.get(ticker))
+            _HISTORY_CACHE.move_to_end((ticker, period))
+        while len(_HISTORY_CACHE) > HISTORY_CACHE_SIZE:
+            _HISTORY_CACHE.popitem(last=False)
+
+    failed = [t for t in tickers if t not in frames]
+
+    if adjusted:
+        frames = {t: apply_adjustments(df) for t, df in frames.items()}
+
+    return frames, failed
+
+
+def _validate(ticker: str, df: pd.DataFrame) -> pd.DataFrame:
+    return validate_and_quarantine(df, quality_key(ticker))
+
+
+def _split_factors(frames: dict, price_ratios: dict | None = None) -> dict:
+    """
+    Strip Adj Close from downloaded frames into the factor table.
+    Returns {ticker: raw frame}.
+    """
+    raw = {}
+    steps = []
+
+    for ticker, df in frames.items():
+        raw[ticker], ticker_steps = extract_factors(df)
+        steps.append(ticker_steps)
+
+    if steps:
+        update_factors(pd.concat(steps, ignore_index=True), price_ratios)
+
+    return raw
+
+
+def _price_ratios(cached: dict, fresh: dict) -> dict:
+    """
+    Fresh / cached raw close on the first top-up bar. Anything but 1
+    means Yahoo rewrote raw history (a split) since it was cached.
+    """
+    ratios = {}
+
+    for ticker, df in fresh.items():
+        first = df.loc[df["Date"].idxmin()]
+        old = cached[ticker].loc[cached[ticker]["Date"] == first["Date"], "Close"]
+        if not old.empty and old.iloc[0]:
+            ratios[ticker] = first["Close"] / old.iloc[0]
+
+    return ratios
+
+
+def _download(tickers: list, **window) -> dict:
+    fetched = _download_batch(tickers, **window)
+
+    # Whole batch failed (network / provider error): fall back
+    # to per-ticker requests so one bad symbol can't sink the rest
+    if not fetched and len(tickers) > 1:
+        fetched = _download_individually(tickers, **window)
+
+    return fetched
+
+
+@coalesce
+def _download_batch(tickers: list, **window) -> dict:
+    try:
+        data = provider.download(
+            tickers=tickers,
+            interval="1d",
+            group_by="ticker",
+            progress=False,
+            auto_adjust=False,
+            threads=True,
+            **window
+        )
+    except Exception:
+        return {}
+
+    if data is None or data.empty:
+        return {}
+
+    frames = {}
+
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                continue
+            raw = data[ticker]
+        elif len(tickers) == 1:
+            raw = data
+        else:
+            continue
+
+        df = _clean(raw, ticker)
+        if df is not None:
+            frames[ticker] = df
+
+    return frames
+
+
+@coalesce
+def _download_one(ticker: str, **window):
+    try:
+        raw = provider.download(
+            ticker,
+            interval="1d",
+            progress=False,
+            auto_adjust=False,
+            **window
+        )
+    except Exception:
+        return None
+
+    return _clean(raw, ticker)
+
+
+def _download_individually(tickers: list, **window) -> dict:
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tickers))) as pool:
+        results = pool.map(lambda t: _download_one(t, **window), tickers)
+
+    return {t: df for t, df in zip(tickers, results) if df is not None}
+
+
+def _clean(raw: pd.DataFrame, ticker: str):
+    if raw is None or raw.empty:
+        return None
+
+    df = raw.dropna(how="all").reset_index()
+    df = preprocess_price_data(df)
+
+    if df.empty:
+        return None
+
+    df["stock"] = ticker
+    return df
@@ -1,52 +1,192 @@
 import pandas as pd
-import yfinance as yf
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services import provider
+from services.adjustments import extract_factors, update_factors, apply_adjustments
+from services.validation import validate_and_quarantine
+from services.query_engine import publish_prices, is_published, store_path
 
 DATA_PATH = "data/global_energy_stocks.csv"
+BENCHMARK_PATH = "data/crude_benchmarks.csv"
+
+BOOTSTRAP_CHUNK_SIZE = 50
+BOOTSTRAP_WORKERS = 4
+BOOTSTRAP_RETRIES = 2
+BOOTSTRAP_BACKOFF_SECONDS = 2.0
+
+_bootstrap_reports = {}
 
 
-def load_global_energy_data(global_fuel_stocks):
+def load_global_energy_data(global_fuel_stocks, adjusted: bool = True):
     """
     Simple, tested, flat data loader.
     No caching.
     Always produces clean schema.
+    Bars failing data-quality checks are quarantined.
+    Prices are split/dividend adjusted unless adjusted=False.
+    """
+    return _load_or_download(global_fuel_stocks, DATA_PATH, "universe", adjusted)
+
+
+def load_benchmark_data(benchmark_tickers, adjusted: bool = True):
+    """
+    Loads crude oil benchmark series (e.g. BZ=F, CL=F)
+    through the same path and schema as the stock universe.
     """
+    return _load_or_download(benchmark_tickers, BENCHMARK_PATH, "benchmarks", adjusted)
+
+
+def ensure_published(global_fuel_stocks, benchmark_tickers=()) -> bool:
+    """
+    Make sure the parquet store (services.query_engine) holds the
+    universe and benchmarks. The CSVs are only read (or bootstrapped)
+    when the store copy is missing or older, so analytics can query
+    the store without loading the full history into pandas.
+    Returns True if the universe is in the store.
+    """
+    if not is_published("universe", DATA_PATH):
+        load_global_energy_data(global_fuel_stocks)
+    if benchmark_tickers and not is_published("benchmarks", BENCHMARK_PATH):
+        load_benchmark_data(benchmark_tickers)
+
+    return os.path.exists(store_path("universe"))
+
+
+def _load_or_download(tickers, path, quality_key, adjusted=True):
 
     # If CSV already exists, load it
-    if os.path.exists(DATA_PATH):
-        return pd.read_csv(DATA_PATH, parse_dates=["Date"])
-
-    # -----------------------------------
-    # Download data (EXACT LOGIC)
-    # -----------------------------------
-    data = yf.download(
-        tickers=global_fuel_stocks,
-        period="2y",
-        interval="1d"
+    if os.path.exists(path):
+        combined = pd.read_csv(path, parse_dates=["Date"])
+    else:
+        # -----------------------------------
+        # Download data (chunked bootstrap)
+        # -----------------------------------
+        combined, _ = bootstrap_prices(tickers)
+
+        if combined.empty:
+            return pd.DataFrame()
+
+        # Raw bars go to the CSV, adjustment factors to their own table
+        combined, steps = extract_factors(combined)
+        update_factors(steps)
+
+        # Save CSV
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        combined.to_csv(path, index=False)
+
+    combined = validate_and_quarantine(combined, quality_key)
+
+    # Columnar copy for the query engine (services.query_engine)
+    if not is_published(quality_key, path):
+        publish_prices(combined, quality_key)
+
+    return apply_adjustments(combined) if adjusted else combined
+
+
+def bootstrap_prices(tickers, period="2y", interval="1d"):
+    """
+    Download a (possibly large) universe in parallel chunks.
+
+    - tickers are split into chunks of BOOTSTRAP_CHUNK_SIZE,
+      fetched on a bounded thread pool
+    - each chunk is reshaped with one vectorized stack
+      (no per-ticker copies)
+    - only tickers that came back empty are retried
+    - a coverage report is returned (and kept for the UI)
+
+    Prices are raw (auto_adjust=False) with an Adj Close column.
+
+    Returns (long DataFrame[Date, OHLCV..., stock], report dict).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    frames = []
+    missing = tickers
+    attempts = 0
+
+    while missing and attempts <= BOOTSTRAP_RETRIES:
+        if attempts:
+            time.sleep(BOOTSTRAP_BACKOFF_SECONDS * attempts)
+
+        chunks = [
+            missing[i:i + BOOTSTRAP_CHUNK_SIZE]
+            for i in range(0, len(missing), BOOTSTRAP_CHUNK_SIZE)
+        ]
+
+        with ThreadPoolExecutor(max_workers=min(BOOTSTRAP_WORKERS, len(chunks))) as pool:
+            results = list(pool.map(
+                lambda chunk: _download_chunk(chunk, period, interval),
+                chunks
+            ))
+
+        batch = [r for r in results if not r.empty]
+        frames.extend(batch)
+
+        loaded = set()
+        for r in batch:
+            loaded.update(r["stock"].unique())
+
+        missing = [t for t in missing if t not in loaded]
+        attempts += 1
+
+    combined = (
+        pd.concat(frames, ignore_index=True)
+        if frames
+        else pd.DataFrame()
     )
 
-    dfs = []
+    report = {
+        "requested": len(tickers),
+        "loaded": len(tickers) - len(missing),
+        "coverage_pct": (
+            (len(tickers) - len(missing)) / len(tickers) * 100
+            if tickers else 100.0
+        ),
+        "failed": missing,
+        "attempts": attempts,
+        "rows": len(combined),
+    }
+    _bootstrap_reports[tuple(tickers)] = report
 
-    for stock in global_fuel_stocks:
-        try:
-            df = data.xs(stock, level=1, axis=1).copy()
-        except Exception:
-            continue
+    return combined, report
 
-        df.reset_index(inplace=True)
-        df["stock"] = stock
-        dfs.append(df)
 
-    if not dfs:
+def _download_chunk(chunk, period, interval) -> pd.DataFrame:
+    try:
+        # One token per chunk: charging per ticker would serialise the
+        # pool (1000 tickers ≈ 200s at the shared rate); BOOTSTRAP_WORKERS
+        # already bounds how many chunks are in flight
+        data = provider.download(
+            tickers=chunk,
+            period=period,
+            interval=interval,
+            auto_adjust=False,
+            cost=1
+        )
+    except Exception:
         return pd.DataFrame()
 
-    global_oil = pd.concat(dfs, ignore_index=True)
+    if data is None or data.empty:
+        return pd.DataFrame()
+
+    if not isinstance(data.columns, pd.MultiIndex):
+        # Single ticker without a ticker level
+        data.columns = pd.MultiIndex.from_product([data.columns, chunk[:1]])
+
+    # (Date) x (Price, Ticker) -> (Date, Ticker) x Price in one go
+    long = data.stack(level=1, future_stack=True)
+    long.index.names = ["Date", "stock"]
+    long = long.reset_index()
+
+    price_cols = [c for c in long.columns if c not in ("Date", "stock")]
+    long = long[["Date"] + price_cols + ["stock"]]
+    long.columns.name = None
 
     # Drop bad rows
-    global_oil = global_oil.dropna(subset=["Close"])
+    return long.dropna(subset=["Close"])
 
-    # Save CSV
-    os.makedirs("data", exist_ok=True)
-    global_oil.to_csv(DATA_PATH, index=False)
 
-    return global_oil
+def get_bootstrap_reports() -> dict:
+    """Coverage reports of bootstraps run in this process."""
+    return dict(_bootstrap_reports)
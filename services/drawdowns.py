@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from services.price_panel import PricePanel
+
+
+EPISODE_COLUMNS = [
+    "stock",
+    "peak_date",
+    "trough_date",
+    "recovery_date",
+    "depth_pct",
+    "decline_days",
+    "time_to_recover_days",
+    "duration_days",
+    "recovered",
+]
+
+
+def drawdown_episodes(panel: PricePanel, min_depth_pct: float = 0.0) -> pd.DataFrame:
+    """
+    Extract every drawdown episode for every ticker in one sweep.
+
+    An episode starts at a running peak, bottoms at the trough and ends
+    on the first session that closes at or above the old peak
+    (recovery). Ongoing episodes have no recovery date.
+
+    Durations are calendar days:
+        decline_days         peak -> trough
+        time_to_recover_days trough -> recovery
+        duration_days        peak -> recovery (or last date if ongoing)
+    """
+    if len(panel.dates) == 0 or not panel.tickers:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    # Work column-major so each ticker's rows are contiguous
+    close = np.ascontiguousarray(panel.close.T)         # (N, T)
+    N, T = close.shape
+
+    peak = np.fmax.accumulate(close, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = close / peak - 1
+
+    at_peak = close >= peak
+    underwater = dd < 0
+
+    t_idx = np.broadcast_to(np.arange(T), (N, T))
+    peak_row = np.maximum.accumulate(np.where(at_peak, t_idx, -1), axis=1)
+
+    # ---- flatten the underwater rows (already sorted by ticker, time) ----
+    col, row = np.nonzero(underwater)
+    if len(col) == 0:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    start = peak_row[col, row]
+    depth = dd[col, row]
+
+    new_episode = np.ones(len(col), dtype=bool)
+    new_episode[1:] = (col[1:] != col[:-1]) | (start[1:] != start[:-1])
+    bounds = np.flatnonzero(new_episode)
+
+    ep_col = col[bounds]
+    ep_peak = start[bounds]
+    ep_depth = np.minimum.reduceat(depth, bounds)
+    ep_last = np.maximum.reduceat(row, bounds)
+
+    # first row reaching the episode minimum = trough
+    ep_id = np.cumsum(new_episode) - 1
+    is_trough = depth == ep_depth[ep_id]
+    pos = np.where(is_trough, np.arange(len(col)), len(col))
+    ep_trough = row[np.minimum.reduceat(pos, bounds)]
+
+    recovered = ep_last + 1 < T
+    ep_recovery = np.where(recovered, ep_last + 1, T - 1)
+
+    # ---- assemble ----
+    dates = panel.dates.values
+    peak_dates = dates[ep_peak]
+    trough_dates = dates[ep_trough]
+    end_dates = dates[ep_recovery]
+
+    one_day = np.timedelta64(1, "D")
+
+    episodes = pd.DataFrame({
+        "stock": np.asarray(panel.tickers, dtype=object)[ep_col],
+        "peak_date": peak_dates,
+        "trough_date": trough_dates,
+        "recovery_date": np.where(recovered, end_dates, np.datetime64("NaT")),
+        "depth_pct": ep_depth * 100,
+        "decline_days": (trough_dates - peak_dates) // one_day,
+        "time_to_recover_days": np.where(
+            recovered, (end_dates - trough_dates) // one_day, -1
+        ),
+        "duration_days": (end_dates - peak_dates) // one_day,
+        "recovered": recovered,
+    })
+
+    episodes["time_to_recover_days"] = (
+        episodes["time_to_recover_days"].astype("Int64").mask(~episodes["recovered"])
+    )
+
+    if min_depth_pct:
+        episodes = episodes[episodes["depth_pct"] <= -abs(min_depth_pct)]
+
+    return episodes.reset_index(drop=True)
+
+
+def worst_drawdowns(episodes: pd.DataFrame, stock: str, n: int = 5) -> pd.DataFrame:
+    """
+    Top-N deepest episodes for one ticker.
+    """
+    if episodes is None or episodes.empty:
+        return pd.DataFrame(columns=EPISODE_COLUMNS)
+
+    g = episodes[episodes["stock"] == stock]
+    return g.nsmallest(n, "depth_pct").reset_index(drop=True)
+
+
+# --------------------------------------------------
+# Process-level cache
+# --------------------------------------------------
+
+EPISODE_CACHE_SIZE = 32   # (key) entries
+
+_EPISODE_CACHE = OrderedDict()
+
+
+def get_drawdown_episodes(panel: PricePanel, key: str = "universe") -> pd.DataFrame:
+    """
+    Cached episodes for a panel (recomputed when the panel changes).
+    """
+    cached = _EPISODE_CACHE.get(key)
+
+    if cached is not None and cached[0] is panel:
+        _EPISODE_CACHE.move_to_end(key)
+        return cached[1]
+
+    episodes = drawdown_episodes(panel)
+    _EPISODE_CACHE[key] = (panel, episodes)
+    _EPISODE_CACHE.move_to_end(key)
+    while len(_EPISODE_CACHE) > EPISODE_CACHE_SIZE:
+        _EPISODE_CACHE.popitem(last=False)
+    return episodes
@@ -0,0 +1,177 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+
+from services.query_engine import PRICE_COLUMNS, iter_prices, store_path
+
+EXPORT_DIR = "data/cache/exports"
+CHUNK_ROWS = 50_000
+EXPORT_MAX_AGE_SECONDS = 60 * 60   # prepared files are removed after this
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# --------------------------------------------------
+# Chunk sources
+# --------------------------------------------------
+
+def subset_chunk(chunk: pd.DataFrame, start=None, end=None, columns=None, tickers=None) -> pd.DataFrame:
+    """
+    Apply the export filters to one chunk.
+    `columns` keeps the given order; Date (and stock) always lead.
+    """
+    mask = pd.Series(True, index=chunk.index)
+
+    if start is not None:
+        mask &= chunk["Date"] >= pd.to_datetime(start)
+    if end is not None:
+        mask &= chunk["Date"] <= pd.to_datetime(end)
+    if tickers is not None and "stock" in chunk.columns:
+        mask &= chunk["stock"].isin(tickers)
+
+    chunk = chunk[mask]
+
+    if columns:
+        lead = [c for c in ("Date", "stock") if c in chunk.columns]
+        chunk = chunk[lead + [c for c in columns if c in chunk.columns and c not in lead]]
+
+    return chunk
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, **filters):
+    """Slices of an in-memory frame (views, no full copy)."""
+    for i in range(0, len(df), chunk_rows):
+        chunk = subset_chunk(df.iloc[i:i + chunk_rows], **filters)
+        if not chunk.empty:
+            yield chunk
+
+
+def iter_store_chunks(tickers=None, chunk_rows: int = CHUNK_ROWS, start=None, end=None,
+                      columns=None):
+    """
+    Stream the published parquet price store (services.query_engine)
+    in record batches, never holding the whole history in memory.
+    Ticker / date filters and the column list are pushed into the scan.
+    """
+    for chunk in iter_prices(tickers, start, end, columns=columns, batch_rows=chunk_rows):
+        chunk = subset_chunk(chunk, columns=columns)
+        if not chunk.empty:
+            yield chunk
+
+
+def store_columns() -> list:
+    """Column names of the published universe store ([] if not published)."""
+    if not os.path.exists(store_path("universe")):
+        return []
+    return list(PRICE_COLUMNS)
+
+
+# --------------------------------------------------
+# Writers
+# --------------------------------------------------
+
+def _write_csv(chunks, f) -> int:
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(f, index=False, header=(i == 0))
+        rows += len(chunk)
+    return rows
+
+
+def _write_parquet(chunks, f) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    schema = None
+    rows = 0
+
+    try:
+        for chunk in chunks:
+            if schema is None:
+                # Integers can turn into floats in a later chunk (NaNs),
+                # so widen them up front to keep one schema for the file
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                schema = pa.schema([
+                    field.with_type(pa.float64()) if pa.types.is_integer(field.type) else field
+                    for field in schema
+                ])
+                writer = pq.ParquetWriter(f, schema)
+
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+def write_export(chunks, name: str, fmt: str = "csv") -> tuple:
+    """
+    Write chunks to EXPORT_DIR/<name>-<id>.<fmt> one at a time
+    (memory stays at one chunk). Every export gets its own file, so
+    sessions with different filters never overwrite each other; files
+    older than EXPORT_MAX_AGE_SECONDS are removed on the next export.
+    Atomic: readers never see a partial file.
+    Returns (path, rows written), or (None, 0) if nothing matched.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _remove_old_exports()
+
+    path = os.path.join(EXPORT_DIR, f"{_safe_name(name)}-{uuid.uuid4().hex[:12]}.{fmt}")
+    tmp = f"{path}.tmp"
+
+    try:
+        if fmt == "csv":
+            with open(tmp, "w", newline="") as f:
+                rows = _write_csv(chunks, f)
+        else:
+            with open(tmp, "wb") as f:
+                rows = _write_parquet(chunks, f)
+
+        if rows == 0:
+            return None, 0
+
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    return path, rows
+
+
+def _remove_old_exports():
+    cutoff = time.time() - EXPORT_MAX_AGE_SECONDS
+
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass  # removed by another process
+
+
+def _safe_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+# --------------------------------------------------
+# Entry points
+# --------------------------------------------------
+
+def export_frame(df: pd.DataFrame, name: str, fmt: str = "csv", **filters) -> tuple:
+    """Export (a subset of) an in-memory frame. Returns (path, rows)."""
+    return write_export(iter_frame_chunks(df, **filters), name, fmt)
+
+
+def export_universe(fmt: str = "csv", tickers=None, **filters) -> tuple:
+    """Export (a subset of) the whole universe, streamed from the store."""
+    return write_export(iter_store_chunks(tickers, **filters), "universe", fmt)
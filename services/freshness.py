@@ -0,0 +1,291 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from services.shared_cache import try_shared_cache
+
+
+# --------------------------------------------------
+# Circuit breaker (one per upstream endpoint)
+# --------------------------------------------------
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through
+    open      -> calls are skipped for `reset_after` seconds
+    half-open -> one trial call; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_after: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+
+# --------------------------------------------------
+# Per-rerun latency budget
+# --------------------------------------------------
+
+class LatencyBudget:
+    """Wall-clock budget shared by all blocking fetches of one rerun."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.deadline - time.monotonic(), 0.0)
+
+
+# Streamlit runs each script rerun in its own thread, and every thread
+# starts with a fresh context, so this is effectively per rerun.
+_budget = contextvars.ContextVar("latency_budget", default=None)
+
+
+def start_rerun_budget(seconds: float) -> LatencyBudget:
+    budget = LatencyBudget(seconds)
+    _budget.set(budget)
+    return budget
+
+
+def current_budget():
+    return _budget.get()
+
+
+# --------------------------------------------------
+# Stale-while-revalidate store
+# --------------------------------------------------
+
+@dataclass
+class Fresh:
+    """Result of an SWR lookup."""
+
+    value: object
+    fetched_at: float | None
+    stale: bool
+    error: str | None = None
+
+
+# {key: (fetched_at, value)} – last known good values. Backed by the
+# host-wide shared cache so a value fetched by one app process is
+# served by all of them.
+_store = {}
+_store_lock = threading.Lock()
+_refreshing = set()
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="swr")
+
+
+def _is_usable(value) -> bool:
+    if value is None:
+        return False
+    empty = getattr(value, "empty", None)
+    if isinstance(empty, bool):
+        return not empty
+    try:
+        return len(value) > 0
+    except TypeError:
+        return True
+
+
+def _shared():
+    # None when there is no writable cache dir: run process-local
+    return try_shared_cache()
+
+
+def _share(key, fetched_at, value):
+    cache = _shared()
+    if cache is not None:
+        cache.put(key, value, fetched_at)
+
+
+def _lookup(key, ttl: float, shared: bool):
+    """
+    Local (fetched_at, value) for `key`; when it is missing or older
+    than `ttl`, a newer copy from the shared cache is adopted first.
+    """
+    with _store_lock:
+        cached = _store.get(key)
+
+    if not shared or (cached is not None and time.time() - cached[0] < ttl):
+        return cached
+
+    cache = _shared()
+    remote = cache.get(key) if cache is not None else None
+
+    if remote is not None and (cached is None or remote[0] > cached[0]):
+        with _store_lock:
+            current = _store.get(key)
+            if current is None or remote[0] > current[0]:
+                _store[key] = remote
+            cached = _store[key]
+
+    return cached
+
+
+def _run(key, endpoint, fetch_fn, shared=True):
+    """Fetch and record the outcome (runs on the SWR pool)."""
+    breaker = get_breaker(endpoint)
+
+    try:
+        value = fetch_fn()
+    except Exception:
+        breaker.record_failure()
+        raise
+    finally:
+        with _store_lock:
+            _refreshing.discard(key)
+
+    breaker.record_success()
+
+    if _is_usable(value):
+        fetched_at = time.time()
+        with _store_lock:
+            _store[key] = (fetched_at, value)
+        if shared:
+            _share(key, fetched_at, value)
+
+    return value
+
+
+def _submit(key, endpoint, fetch_fn, shared=True):
+    with _store_lock:
+        _refreshing.add(key)
+    return _executor.submit(_run, key, endpoint, fetch_fn, shared)
+
+
+def peek(key, ttl: float):
+    """
+    Cached value for `key` without triggering any fetch (None if absent).
+    """
+    cached = _lookup(key, ttl, shared=True)
+
+    if cached is None:
+        return None
+
+    fetched_at, value = cached
+    return Fresh(value, fetched_at, stale=time.time() - fetched_at >= ttl)
+
+
+def prime(key, value):
+    """
+    Store a value fetched outside swr_fetch (e.g. a batched request).
+    """
+    if _is_usable(value):
+        fetched_at = time.time()
+        with _store_lock:
+            _store[key] = (fetched_at, value)
+        _share(key, fetched_at, value)
+
+
+def swr_fetch(
+    key,
+    fetch_fn,
+    ttl: float,
+    endpoint: str,
+    timeout: float = 5.0,
+    max_stale: float = 24 * 60 * 60,
+    shared: bool = True,
+) -> Fresh:
+    """
+    Serve `key` with a stale-while-revalidate policy.
+
+    - fresh value (age < ttl)        -> returned as is
+    - stale value (age < max_stale)  -> returned immediately, refreshed
+                                        in the background
+    - nothing cached                 -> fetched, waiting at most `timeout`
+                                        seconds and never longer than the
+                                        rerun's remaining latency budget;
+                                        on timeout the fetch keeps running
+                                        and fills the cache for next time
+
+    Empty / None results never overwrite a last known good value.
+    The endpoint's circuit breaker skips upstream calls after repeated
+    failures. Values are shared with the host's other app processes
+    unless shared=False (e.g. for values that can't be pickled).
+    """
+    now = time.time()
+    breaker = get_breaker(endpoint)
+
+    cached = _lookup(key, ttl, shared)
+
+    with _store_lock:
+        in_flight = key in _refreshing
+
+    if cached is not None:
+        fetched_at, value = cached
+        age = now - fetched_at
+
+        if age < ttl:
+            return Fresh(value, fetched_at, stale=False)
+
+        if age < max_stale:
+            if not in_flight and breaker.allow():
+                _submit(key, endpoint, fetch_fn, shared)
+            return Fresh(value, fetched_at, stale=True)
+
+    if in_flight:
+        return Fresh(None, None, stale=True, error="refresh in progress")
+
+    if not breaker.allow():
+        return Fresh(None, None, stale=True, error="upstream unavailable")
+
+    budget = current_budget()
+    wait = timeout if budget is None else min(timeout, budget.remaining())
+
+    future = _submit(key, endpoint, fetch_fn, shared)
+
+    try:
+        value = future.result(timeout=wait)
+    except FutureTimeout:
+        return Fresh(None, None, stale=True, error="timed out")
+    except Exception as exc:
+        return Fresh(None, None, stale=True, error=str(exc) or type(exc).__name__)
+
+    return Fresh(value, time.time(), stale=False)
@@ -1,18 +1,48 @@
-import yfinance as yf
 import pandas as pd
 
+from services import provider
+
+from services.freshness import swr_fetch
+from utils.single_flight import coalesce
+
+FUNDAMENTALS_TTL_SECONDS = 6 * 60 * 60
+FUNDAMENTALS_TIMEOUT_SECONDS = 8.0
+
 
 def load_fundamentals(ticker: str, frequency: str = "Yearly") -> pd.DataFrame:
     """
     Load and normalize revenue & net profit data.
+
+    Served stale-while-revalidate; df.attrs["stale"] / df.attrs["as_of"]
+    tell the UI whether it is looking at a cached copy.
     """
+    result = swr_fetch(
+        key=("fundamentals", ticker, frequency),
+        fetch_fn=lambda: _fetch_fundamentals(ticker, frequency),
+        ttl=FUNDAMENTALS_TTL_SECONDS,
+        endpoint="fundamentals",
+        timeout=FUNDAMENTALS_TIMEOUT_SECONDS,
+        max_stale=7 * 24 * 60 * 60,
+    )
+
+    if result.value is None or result.value.empty:
+        return pd.DataFrame()
+
+    df = result.value.copy()
+    df.attrs["stale"] = result.stale
+    df.attrs["as_of"] = result.fetched_at
+    return df
+
+
+@coalesce
+def _fetch_fundamentals(ticker: str, frequency: str) -> pd.DataFrame:
 
-    stock = yf.Ticker(ticker)
+    stock = provider.ticker(ticker)
 
     if frequency == "Quarterly":
-        fin = stock.quarterly_financials
+        fin = provider.request(lambda: stock.quarterly_financials)
     else:
-        fin = stock.financials
+        fin = provider.request(lambda: stock.financials)
 
     if fin is None or fin.empty:
         return pd.DataFrame()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+CACHE_DIR = "data/cache/history"
+INDEX_PATH = os.path.join(CACHE_DIR, "_index.json")
+
+DISK_BUDGET_BYTES = 200 * 1024 * 1024
+REFRESH_AFTER_SECONDS = 60 * 60
+TOPUP_OVERLAP_DAYS = 5
+
+_LOCK = threading.Lock()
+
+
+# --------------------------------------------------
+# Index: {ticker: {"fetched_at", "last_used", "period"}}
+# --------------------------------------------------
+
+def _read_index() -> dict:
+    try:
+        with open(INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(index: dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{INDEX_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, INDEX_PATH)
+
+
+def _safe_name(ticker: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker)
+
+
+def history_path(ticker: str) -> str:
+    return os.path.join(CACHE_DIR, f"{_safe_name(ticker)}.parquet")
+
+
+# --------------------------------------------------
+# Read / write
+# --------------------------------------------------
+
+def read_history(ticker: str, period: str = "5y"):
+    """
+    Cached history for a ticker.
+    Returns (DataFrame or None, needs_topup: bool).
+    Marks the entry as recently used.
+    """
+    path = history_path(ticker)
+
+    with _LOCK:
+        index = _read_index()
+        meta = index.get(ticker)
+
+        if meta is None or meta.get("period") != period or not os.path.exists(path):
+            return None, True
+
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            return None, True
+
+        meta["last_used"] = time.time()
+        _write_index(index)
+
+    stale = time.time() - meta.get("fetched_at", 0) > REFRESH_AFTER_SECONDS
+    return df, stale
+
+
+def topup_start(df: pd.DataFrame):
+    """
+    Start date for an incremental top-up (a few days of overlap
+    so revised / partial last bars get replaced).
+    """
+    return (df["Date"].max() - pd.Timedelta(days=TOPUP_OVERLAP_DAYS)).date()
+
+
+def merge_history(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append fresh bars to cached history; fresh rows win on overlap.
+    """
+    if cached is None or cached.empty:
+        return fresh
+    if fresh is None or fresh.empty:
+        return cached
+
+    merged = pd.concat([cached, fresh], ignore_index=True)
+    merged = merged.drop_duplicates(subset=["Date"], keep="last")
+    return merged.sort_values("Date").reset_index(drop=True)
+
+
+def write_history(ticker: str, df: pd.DataFrame, period: str = "5y"):
+    """
+    Atomically persist a ticker's history, then enforce the disk budget.
+    """
+    if df is None or df.empty:
+        return
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = history_path(ticker)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+    with _LOCK:
+        index = _read_index()
+        now = time.time()
+        index[ticker] = {"fetched_at": now, "last_used": now, "period": period}
+        _evict(index, keep=ticker)
+        _write_index(index)
+
+
+def touch_history(ticker: str):
+    """
+    Mark cached history as fresh without rewriting it
+    (e.g. top-up returned no new bars).
+    """
+    with _LOCK:
+        index = _read_index()
+        if ticker in index:
+            index[ticker]["fetched_at"] = time.time()
+            _write_index(index)
+
+
+def _evict(index: dict, keep: str | None = None):
+    """
+    Drop least-recently-used tickers until the cache fits the budget.
+    Caller holds _LOCK.
+    """
+    sizes = {}
+    for ticker in list(index):
+        path = history_path(ticker)
+        if os.path.exists(path):
+            sizes[ticker] = os.path.getsize(path)
+        else:
+            index.pop(ticker)
+
+    total = sum(sizes.values())
+    if total <= DISK_BUDGET_BYTES:
+        return
+
+    for ticker in sorted(sizes, key=lambda t: index[t].get("last_used", 0)):
+        if total <= DISK_BUDGET_BYTES:
+            break
+        if ticker == keep:
+            continue
+        try:
+            os.remove(history_path(ticker))
+        except OSError:
+            pass
+        total -= sizes[ticker]
+        index.pop(ticker, None)
+
+
+def cache_size_bytes() -> int:
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    return sum(
+        os.path.getsize(os.path.join(CACHE_DIR, f))
+        for f in os.listdir(CACHE_DIR)
+        if f.endswith(".parquet")
+    )
@@ -1,72 +1,374 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
 import pandas as pd
 
-def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+# Columns add_indicators() has always produced
+DEFAULT_INDICATORS = ["daily_return_pct", "ma_20", "ma_50", "volatility_20", "drawdown_pct"]
+
+INDICATOR_CACHE_SIZE = 2048   # (ticker, last bar) entries
+
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+# Every indicator declares the columns / indicators it reads and its
+# lookback window. Names starting with "_" are intermediates shared
+# between indicators (never added to the output frame).
+
+@dataclass(frozen=True)
+class Indicator:
+    name: str
+    inputs: tuple
+    compute: Callable
+    window: int = 0
+    label: str = ""
+
+
+INDICATORS = {}
+
+
+def register(name: str, inputs=("Close",), window: int = 0, label: str = ""):
+    def wrap(compute):
+        INDICATORS[name] = Indicator(name, tuple(inputs), compute, window, label or name)
+        return compute
+    return wrap
+
+
+def available_indicators() -> list:
+    """Public indicator names (intermediates excluded)."""
+    return [name for name in INDICATORS if not name.startswith("_")]
+
+
+def resolve(columns) -> list:
     """
-    Adds financial & risk indicators to stock price data.
-    Assumes data is already preprocessed.
-    Safe for global markets.
+    Requested indicators plus everything they depend on,
+    in dependency order (a topological sort of the DAG).
     """
+    order = []
+    state = {}   # name -> "visiting" / "done"
+
+    def visit(name):
+        if name not in INDICATORS:
+            return  # raw column (Close, High, ...)
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Indicator dependency cycle at {name}")
+
+        state[name] = "visiting"
+        for dep in INDICATORS[name].inputs:
+            visit(dep)
+        state[name] = "done"
+        order.append(name)
+
+    for name in columns:
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator: {name}")
+        visit(name)
+
+    return order
+
+
+# --------------------------------------------------
+# Grouped rolling primitives
+# --------------------------------------------------
+# The frame is sorted by (stock, Date), so every ticker is one
+# contiguous segment. Rolling sums come from one cumulative sum over
+# the whole frame, with the window clipped at each segment start,
+# instead of a per-ticker groupby.
+
+class _Frame:
+    """Columns being computed for one (sorted) frame, plus shared intermediates."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.values = {}
+        self._memo = {}
+
+        stock = df["stock"].to_numpy()
+        n = len(df)
+        self.n = n
+        self.first = np.ones(n, dtype=bool)
+        self.first[1:] = stock[1:] != stock[:-1]
+
+        starts = np.flatnonzero(self.first)
+        self.start = np.repeat(starts, np.diff(np.append(starts, n)))
+        self.group = np.cumsum(self.first) - 1
+
+    def __getitem__(self, name) -> np.ndarray:
+        if name in self.values:
+            return self.values[name]
+        return self.df[name].to_numpy(dtype=float)
+
+    def _memoized(self, key, fn):
+        if key not in self._memo:
+            self._memo[key] = fn()
+        return self._memo[key]
+
+    def shift(self, name) -> np.ndarray:
+        """Previous bar's value within the ticker (NaN on its first bar)."""
+        def run():
+            x = self[name]
+            out = np.empty(self.n)
+            out[0:1] = np.nan
+            out[1:] = x[:-1]
+            out[self.first] = np.nan
+            return out
+        return self._memoized(("shift", name), run)
+
+    def _window_sum(self, x: np.ndarray, window: int) -> np.ndarray:
+        cs = np.concatenate([[0.0], np.cumsum(x)])
+        idx = np.arange(self.n)
+        lo = np.maximum(idx - window + 1, self.start)
+        return cs[idx + 1] - cs[lo]
+
+    def rolling_stats(self, name, window: int):
+        """(count, sum, sum of squares) of non-NaN values over the window."""
+        def run():
+            x = self[name]
+            valid = ~np.isnan(x)
+            # Shift each ticker to its own first valid value to keep the
+            # squared sums small (variance is shift-invariant)
+            base = pd.Series(np.where(valid, x, np.nan)).groupby(self.group).transform("first")
+            centered = np.where(valid, x - base.to_numpy(), 0.0)
+            return (
+                self._window_sum(valid.astype(float), window),
+                self._window_sum(centered, window),
+                self._window_sum(centered * centered, window),
+                base.to_numpy(),
+            )
+        return self._memoized(("rolling", name, window), run)
+
+    def rolling_mean(self, name, window: int, min_periods: int) -> np.ndarray:
+        count, total, _, base = self.rolling_stats(name, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count + base
+        return np.where(count >= min_periods, mean, np.nan)
+
+    def rolling_std(self, name, window: int, min_periods: int) -> np.ndarray:
+        count, total, squares, _ = self.rolling_stats(name, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (squares - total * total / count) / (count - 1)
+        std = np.sqrt(np.maximum(var, 0.0))
+        return np.where((count >= min_periods) & (count > 1), std, np.nan)
+
+    def ewm(self, name, alpha: float, min_periods: int = 0) -> np.ndarray:
+        """Per-ticker exponential mean (adjust=False)."""
+        def run():
+            series = pd.Series(self[name])
+            out = (
+                series.groupby(self.group)
+                .ewm(alpha=alpha, adjust=False, min_periods=min_periods)
+                .mean()
+                .reset_index(level=0, drop=True)
+                .sort_index()
+            )
+            return out.to_numpy()
+        return self._memoized(("ewm", name, alpha, min_periods), run)
+
+    def ema(self, name, span: int) -> np.ndarray:
+        return self.ewm(name, 2 / (span + 1))
+
+
+# --------------------------------------------------
+# Indicators
+# --------------------------------------------------
+
+@register("_prev_close")
+def _prev_close(f):
+    return f.shift("Close")
+
+
+@register("daily_return_pct", inputs=("Close", "_prev_close"), label="Daily Return (%)")
+def _daily_return_pct(f):
+    return (f["Close"] / f["_prev_close"] - 1) * 100
+
+
+@register("ma_20", window=20, label="MA 20")
+def _ma_20(f):
+    return f.rolling_mean("Close", 20, min_periods=5)
+
+
+@register("ma_50", window=50, label="MA 50")
+def _ma_50(f):
+    return f.rolling_mean("Close", 50, min_periods=10)
+
+
+@register("volatility_20", inputs=("daily_return_pct",), window=20, label="Volatility (20D)")
+def _volatility_20(f):
+    return f.rolling_std("daily_return_pct", 20, min_periods=5)
+
+
+@register("drawdown_pct", label="Drawdown (%)")
+def _drawdown_pct(f):
+    # Peak of the cumulative-return curve, which starts at the
+    # ticker's second bar (its first return)
+    close = np.where(f.first, np.nan, f["Close"])
+    peak = pd.Series(close).groupby(f.group).cummax().to_numpy()
+    return (close / peak - 1) * 100
+
+
+@register("_gain", inputs=("Close", "_prev_close"))
+def _gain(f):
+    change = f["Close"] - f["_prev_close"]
+    return np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
 
-    # -----------------------------------
-    # Step 0: Safety check
-    # -----------------------------------
+
+@register("_loss", inputs=("Close", "_prev_close"))
+def _loss(f):
+    change = f["Close"] - f["_prev_close"]
+    return np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+
+
+@register("rsi_14", inputs=("_gain", "_loss"), window=14, label="RSI 14")
+def _rsi_14(f):
+    # Wilder smoothing
+    gain = f.ewm("_gain", 1 / 14, min_periods=14)
+    loss = f.ewm("_loss", 1 / 14, min_periods=14)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = 100 - 100 / (1 + gain / loss)
+    return np.where(loss == 0, 100.0, rsi)
+
+
+@register("macd", window=26, label="MACD")
+def _macd(f):
+    return f.ema("Close", 12) - f.ema("Close", 26)
+
+
+@register("macd_signal", inputs=("macd",), window=9, label="MACD Signal")
+def _macd_signal(f):
+    return f.ema("macd", 9)
+
+
+@register("macd_hist", inputs=("macd", "macd_signal"), label="MACD Histogram")
+def _macd_hist(f):
+    return f["macd"] - f["macd_signal"]
+
+
+@register("bb_middle_20", window=20, label="Bollinger Middle")
+def _bb_middle_20(f):
+    return f.rolling_mean("Close", 20, min_periods=20)
+
+
+@register("bb_upper_20", inputs=("bb_middle_20",), window=20, label="Bollinger Upper")
+def _bb_upper_20(f):
+    # Same rolling sums as the middle band / MA 20
+    return f["bb_middle_20"] + 2 * f.rolling_std("Close", 20, min_periods=20)
+
+
+@register("bb_lower_20", inputs=("bb_middle_20",), window=20, label="Bollinger Lower")
+def _bb_lower_20(f):
+    return f["bb_middle_20"] - 2 * f.rolling_std("Close", 20, min_periods=20)
+
+
+@register("_true_range", inputs=("High", "Low", "_prev_close"))
+def _true_range(f):
+    high, low, prev = f["High"], f["Low"], f["_prev_close"]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+@register("atr_14", inputs=("_true_range",), window=14, label="ATR 14")
+def _atr_14(f):
+    return f.ewm("_true_range", 1 / 14, min_periods=14)
+
+
+# --------------------------------------------------
+# Engine
+# --------------------------------------------------
+
+def compute_indicators(df: pd.DataFrame, columns=DEFAULT_INDICATORS) -> pd.DataFrame:
+    """
+    Copy of `df` (sorted by stock, Date) with the requested indicator
+    columns. Only the requested indicators and their dependencies are
+    computed; intermediates are shared and not added.
+    """
+    if df is None or df.empty:
+        return df
+
+    df = df.sort_values(["stock", "Date"], kind="stable")
+    frame = _Frame(df)
+
+    for name in resolve(columns):
+        if name not in frame.values:
+            frame.values[name] = np.asarray(INDICATORS[name].compute(frame), dtype=float)
+
+    out = df.copy()
+    for name in columns:
+        out[name] = frame.values[name]
+    return out
+
+
+_cache = OrderedDict()   # {(ticker, last Date, rows, closes): {column: ndarray}}
+_cache_lock = threading.Lock()
+
+
+def get_indicators(df: pd.DataFrame, columns=DEFAULT_INDICATORS) -> pd.DataFrame:
+    """
+    compute_indicators with a cache per (ticker, last bar): tickers
+    whose history is unchanged reuse their columns, and only missing
+    (ticker, column) pairs are computed.
+    """
     if df is None or df.empty:
         return df
 
-    df = df.copy()
-
-    # Ensure correct sorting
-    df = df.sort_values(["stock", "Date"])
-
-    # -----------------------------------
-    # Step 1: Daily Returns (%)
-    # -----------------------------------
-    df["daily_return_pct"] = (
-        df.groupby("stock")["Close"]
-        .pct_change() * 100
-    )
-
-    # ------------------------------------
-    # Step 2: Moving Averages
-    # ------------------------------------
-    df["ma_20"] = (
-        df.groupby("stock")["Close"]
-        .rolling(window=20, min_periods=5)
-        .mean()
-        .reset_index(level=0, drop=True)
-    )
-
-    df["ma_50"] = (
-        df.groupby("stock")["Close"]
-        .rolling(window=50, min_periods=10)
-        .mean()
-        .reset_index(level=0, drop=True)
-    )
-
-    # ------------------------------------
-    # Step 3: Rolling Volatility (20D)
-    # ------------------------------------
-    df["volatility_20"] = (
-        df.groupby("stock")["daily_return_pct"]
-        .rolling(window=20, min_periods=5)
-        .std()
-        .reset_index(level=0, drop=True)
-    )
-
-    # ------------------------------------
-    # Step 4: Drawdown (%)
-    # ------------------------------------
-    def _drawdown(series):
-        returns = series.pct_change()
-        cumulative = (1 + returns).cumprod()
-        rolling_max = cumulative.cummax()
-        return (cumulative / rolling_max - 1) * 100
-
-    df["drawdown_pct"] = (
-        df.groupby("stock")["Close"]
-        .apply(_drawdown)
-        .reset_index(level=0, drop=True)
-    )
+    columns = list(columns)
+    df = df.sort_values(["stock", "Date"], kind="stable")
+
+    stock = df["stock"].to_numpy()
+    close = df["Close"].to_numpy(dtype=float)
+    starts = np.flatnonzero(np.r_[True, stock[1:] != stock[:-1]])
+    ends = np.append(starts[1:], len(df))
+    last_dates = df["Date"].to_numpy()[ends - 1]
+
+    # First / last close tell raw and adjusted copies of a ticker apart
+    keys = [
+        (stock[s], last_dates[i], e - s, close[s], close[e - 1])
+        for i, (s, e) in enumerate(zip(starts, ends))
+    ]
+
+    with _cache_lock:
+        entries = []
+        for key in keys:
+            entry = _cache.get(key)
+            if entry is None:
+                entry = {}
+                _cache[key] = entry
+            _cache.move_to_end(key)
+            entries.append(entry)
 
+    missing = sorted({c for entry in entries for c in columns if c not in entry})
+    stale = [i for i, entry in enumerate(entries) if any(c not in entry for c in missing)]
+
+    if stale:
+        rows = np.concatenate([np.arange(starts[i], ends[i]) for i in stale])
+        computed = compute_indicators(df.iloc[rows], missing)
+
+        offset = 0
+        for i in stale:
+            size = ends[i] - starts[i]
+            for c in missing:
+                entries[i].setdefault(c, computed[c].to_numpy()[offset:offset + size])
+            offset += size
+
+    with _cache_lock:
+        while len(_cache) > INDICATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    out = df.copy()
+    for c in columns:
+        out[c] = np.concatenate([entry[c] for entry in entries])
+    return out
+
+
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds financial & risk indicators to stock price data.
+    Assumes data is already preprocessed.
+    Safe for global markets.
+    """
     # ❗ DO NOT drop rows here
-    return df
+    return compute_indicators(df, DEFAULT_INDICATORS)
@@ -0,0 +1,232 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+BUFFER_CAPACITY = 2048
+VWAP_BAND_STDEVS = (1.0, 2.0)
+
+# Per-bar fields kept in the ring
+_FIELDS = (
+    "open", "high", "low", "close", "volume",
+    "cum_pv", "cum_v", "cum_p2v",     # session accumulators at this bar
+    "session_open",
+    "vwap", "vwap_std", "bar_return_pct", "session_return_pct",
+)
+
+
+class IntradayRingBuffer:
+    """
+    Fixed-size ring of intraday bars for one ticker / interval.
+
+    Appending a bar is O(1): session-anchored VWAP, its standard
+    deviation (for bands) and intraday returns are carried forward
+    from the previous bar's accumulators. A revision of the last bar
+    (same timestamp) replaces it in O(1) as well; older bars are
+    ignored. The oldest bar is overwritten once the ring is full.
+    """
+
+    def __init__(self, capacity: int = BUFFER_CAPACITY):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype="int64")          # epoch ns (UTC)
+        self.session = np.zeros(capacity, dtype="int64")     # local date ordinal
+        self.values = {f: np.full(capacity, np.nan) for f in _FIELDS}
+        self.start = 0
+        self.size = 0
+        self.tz = None
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _slot(self, i: int) -> int:
+        """Physical slot of the i-th bar (0 = oldest, -1 = newest)."""
+        if i < 0:
+            i += self.size
+        return (self.start + i) % self.capacity
+
+    @property
+    def last_timestamp(self):
+        if self.size == 0:
+            return None
+        return pd.Timestamp(int(self.ts[self._slot(-1)]), tz="UTC").tz_convert(self.tz)
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+
+    def append(self, ts_ns: int, session: int, o, h, l, c, v):
+        """Add (or revise the last) bar. O(1)."""
+        with self._lock:
+            self._append(ts_ns, session, o, h, l, c, v)
+            self.version += 1
+
+    def _append(self, ts_ns, session, o, h, l, c, v):
+        if self.size:
+            last = self._slot(-1)
+            if ts_ns < self.ts[last]:
+                return
+            if ts_ns == self.ts[last]:
+                # Revised last bar: rebuild it from the bar before
+                self.size -= 1
+
+        if self.size:
+            prev = self._slot(-1)
+            same_session = self.session[prev] == session
+        else:
+            same_session = False
+
+        v = 0.0 if v != v else float(v)
+        vals = self.values
+
+        if same_session:
+            cum_pv = vals["cum_pv"][prev] + c * v
+            cum_v = vals["cum_v"][prev] + v
+            cum_p2v = vals["cum_p2v"][prev] + c * c * v
+            session_open = vals["session_open"][prev]
+        else:
+            cum_pv, cum_v, cum_p2v = c * v, v, c * c * v
+            session_open = o if o == o else c
+
+        prev_close = vals["close"][prev] if self.size else np.nan
+
+        if cum_v > 0:
+            vwap = cum_pv / cum_v
+            vwap_std = max(cum_p2v / cum_v - vwap * vwap, 0.0) ** 0.5
+        else:
+            vwap = vwap_std = np.nan
+
+        bar_return = (c / prev_close - 1) * 100 if prev_close == prev_close else np.nan
+        session_return = (c / session_open - 1) * 100
+
+        if self.size < self.capacity:
+            slot = self._slot(self.size)
+            self.size += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self.ts[slot] = ts_ns
+        self.session[slot] = session
+        for name, value in (
+            ("open", o), ("high", h), ("low", l), ("close", c), ("volume", v),
+            ("cum_pv", cum_pv), ("cum_v", cum_v), ("cum_p2v", cum_p2v),
+            ("session_open", session_open),
+            ("vwap", vwap), ("vwap_std", vwap_std),
+            ("bar_return_pct", bar_return), ("session_return_pct", session_return),
+        ):
+            vals[name][slot] = value
+
+    def extend(self, bars: pd.DataFrame, time_col: str = "Datetime") -> int:
+        """
+        Append clean bars (Datetime, Open, High, Low, Close, Volume).
+        Only bars at/after the current last bar are taken.
+        Returns the number of bars written.
+        """
+        if bars is None or bars.empty:
+            return 0
+
+        times = pd.DatetimeIndex(bars[time_col])
+        if times.tz is None:
+            times = times.tz_localize("UTC")
+
+        with self._lock:
+            if self.tz is None:
+                self.tz = str(times.tz)
+
+            local = times.tz_convert(self.tz)
+            ts_ns = times.tz_convert("UTC").asi8
+            sessions = local.normalize().tz_localize(None).asi8 // (86_400 * 10**9)
+
+            if self.size:
+                keep = ts_ns >= self.ts[self._slot(-1)]
+            else:
+                keep = np.ones(len(ts_ns), dtype=bool)
+
+            cols = [bars[c].to_numpy(dtype=float) for c in ("Open", "High", "Low", "Close", "Volume")]
+
+            written = 0
+            for i in np.flatnonzero(keep):
+                self._append(
+                    int(ts_ns[i]), int(sessions[i]),
+                    cols[0][i], cols[1][i], cols[2][i], cols[3][i], cols[4][i],
+                )
+                written += 1
+
+            if written:
+                self.version += 1
+
+        return written
+
+    # --------------------------------------------------
+    # Reads
+    # --------------------------------------------------
+
+    def latest(self) -> dict:
+        """Newest bar with its VWAP / bands / returns (O(1))."""
+        with self._lock:
+            if self.size == 0:
+                return {}
+            return self._frame(np.array([self._slot(-1)])).iloc[0].to_dict()
+
+    def _ordered_slots(self, sessions: int | None = None) -> np.ndarray:
+        slots = (self.start + np.arange(self.size)) % self.capacity
+
+        if sessions is not None and self.size:
+            keys = self.session[slots]
+            wanted = np.unique(keys)[-sessions:]
+            slots = slots[np.isin(keys, wanted)]
+
+        return slots
+
+    def _frame(self, slots: np.ndarray) -> pd.DataFrame:
+        vals = self.values
+        vwap = vals["vwap"][slots]
+        std = vals["vwap_std"][slots]
+
+        frame = pd.DataFrame({
+            "Datetime": pd.to_datetime(self.ts[slots], utc=True).tz_convert(self.tz or "UTC"),
+            "Open": vals["open"][slots],
+            "High": vals["high"][slots],
+            "Low": vals["low"][slots],
+            "Close": vals["close"][slots],
+            "Volume": vals["volume"][slots],
+            "VWAP": vwap,
+            "bar_return_pct": vals["bar_return_pct"][slots],
+            "session_return_pct": vals["session_return_pct"][slots],
+        })
+
+        for k in VWAP_BAND_STDEVS:
+            frame[f"VWAP_upper_{k:g}"] = vwap + k * std
+            frame[f"VWAP_lower_{k:g}"] = vwap - k * std
+
+        return frame
+
+    def to_frame(self, sessions: int | None = None) -> pd.DataFrame:
+        """
+        Bars oldest -> newest with their stored VWAP / bands / returns
+        (read straight from the ring, nothing recomputed).
+        `sessions` keeps only the last N trading sessions.
+        """
+        with self._lock:
+            slots = self._ordered_slots(sessions)
+            if len(slots) == 0:
+                return pd.DataFrame()
+            return self._frame(slots)
+
+
+# --------------------------------------------------
+# Registry: one buffer per (ticker, interval)
+# --------------------------------------------------
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_intraday_buffer(ticker: str, interval: str) -> IntradayRingBuffer:
+    with _buffers_lock:
+        key = (ticker, interval)
+        if key not in _buffers:
+            _buffers[key] = IntradayRingBuffer()
+        return _buffers[key]
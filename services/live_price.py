@@ -1,49 +1,131 @@
 # services/live_price.py
 
-import yfinance as yf
-import streamlit as st
+import time
+
+from services import provider
+from services.async_provider import fetch_quotes
+from services.freshness import swr_fetch, peek, prime, current_budget, get_breaker
+from utils.single_flight import coalesce
+
+LIVE_TTL_SECONDS = 120
+LIVE_TIMEOUT_SECONDS = 3.0
+
 
-@st.cache_data(ttl=120)
 def get_live_price_snapshot(ticker: str) -> dict:
     """
     Fetches a best-effort live price snapshot.
     Falls back to latest available close if live data is unavailable.
+
+    Served stale-while-revalidate: a snapshot older than the TTL is
+    returned right away (marked "stale": True) while a background
+    refresh runs. Returns {} only if nothing has ever been fetched.
     """
+    result = swr_fetch(
+        key=("live_snapshot", ticker),
+        fetch_fn=lambda: _fetch_live_snapshot(ticker),
+        ttl=LIVE_TTL_SECONDS,
+        endpoint="quote",
+        timeout=LIVE_TIMEOUT_SECONDS,
+    )
+
+    if not result.value:
+        return {}
 
-    try:
-        t = yf.Ticker(ticker)
+    return {
+        **result.value,
+        "stale": result.stale,
+        "as_of": result.fetched_at,
+    }
 
-        # -----------------------------
-        # Try FAST live data
-        # -----------------------------
-        info = t.fast_info or {}
 
-        current_price = info.get("last_price")
-        prev_close = info.get("previous_close")
+def get_live_price_snapshots(tickers) -> dict:
+    """
+    Snapshots for a whole watchlist: {ticker: snapshot dict}.
+
+    Fresh cached snapshots are reused; every other ticker is fetched
+    in one concurrent async fan-out, so refreshing dozens of tickers
+    takes about as long as the slowest single request.
+    Tickers that fail keep their last known (stale) snapshot, if any.
+    """
+    snapshots = {}
+    to_fetch = []
 
-        # -----------------------------
-        # Fallback: use recent history
-        # -----------------------------
-        if current_price is None or prev_close is None:
-            hist = t.history(period="5d")
+    for ticker in dict.fromkeys(tickers):
+        cached = peek(("live_snapshot", ticker), LIVE_TTL_SECONDS)
+        if cached is not None and not cached.stale:
+            snapshots[ticker] = {**cached.value, "stale": False, "as_of": cached.fetched_at}
+        else:
+            to_fetch.append(ticker)
 
-            if hist.empty:
-                return {}
+    budget = current_budget()
+    timeout = LIVE_TIMEOUT_SECONDS if budget is None else min(LIVE_TIMEOUT_SECONDS, budget.remaining())
+    breaker = get_breaker("quote")
 
-            current_price = hist["Close"].iloc[-1]
+    if to_fetch:
+        quotes = {}
 
-            if len(hist) > 1:
-                prev_close = hist["Close"].iloc[-2]
+        if timeout > 0 and breaker.allow():
+            quotes = fetch_quotes(to_fetch, timeout=timeout)
+            if any(quotes.values()):
+                breaker.record_success()
             else:
-                prev_close = current_price
+                breaker.record_failure()
 
-        pct_change = ((current_price / prev_close) - 1) * 100
+        for ticker in to_fetch:
+            quote = quotes.get(ticker)
+            if quote:
+                prime(("live_snapshot", ticker), quote)
+                snapshots[ticker] = {**quote, "stale": False, "as_of": time.time()}
+                continue
 
-        return {
-            "current_price": float(current_price),
-            "previous_close": float(prev_close),
-            "pct_change": float(pct_change),
-        }
+            cached = peek(("live_snapshot", ticker), LIVE_TTL_SECONDS)
+            snapshots[ticker] = (
+                {**cached.value, "stale": True, "as_of": cached.fetched_at}
+                if cached is not None else {}
+            )
 
-    except Exception:
-        return {}
+    return snapshots
+
+
+@coalesce
+def _fetch_live_snapshot(ticker: str) -> dict:
+    """
+    Network part of the snapshot; concurrent sessions asking for
+    the same ticker share one request. Errors propagate so the
+    freshness layer can count them.
+    """
+
+    t = provider.ticker(ticker)
+
+    # -----------------------------
+    # Try FAST live data
+    # -----------------------------
+    info = t.fast_info or {}
+
+    current_price, prev_close = provider.request(
+        lambda: (info.get("last_price"), info.get("previous_close"))
+    )
+
+    # -----------------------------
+    # Fallback: use recent history
+    # -----------------------------
+    if current_price is None or prev_close is None:
+        hist = provider.request(t.history, period="5d")
+
+        if hist.empty:
+            return {}
+
+        current_price = hist["Close"].iloc[-1]
+
+        if len(hist) > 1:
+            prev_close = hist["Close"].iloc[-2]
+        else:
+            prev_close = current_price
+
+    pct_change = ((current_price / prev_close) - 1) * 100
+
+    return {
+        "current_price": float(current_price),
+        "previous_close": float(prev_close),
+        "pct_change": float(pct_change),
+    }
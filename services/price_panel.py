@@ -0,0 +1,325 @@
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class PricePanel:
+    """
+    Calendar-aligned close matrix (dates x tickers).
+
+    The date axis is the union of every ticker's sessions, so
+    exchanges with different holidays / weekends line up.
+    Missing sessions are handled explicitly:
+      - `close` is forward-filled (price carried over the gap)
+      - `observed` is True only where the ticker actually traded
+      - rows before a ticker's first bar stay NaN
+
+    `extends` points (weakly) at the panel this one was topped up from
+    by update_price_panel, so results built on that panel can be
+    extended rather than rebuilt.
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: list
+    close: np.ndarray      # (T, N) float64, C-contiguous
+    observed: np.ndarray   # (T, N) bool
+    extends: weakref.ref | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def shape(self) -> tuple:
+        return self.close.shape
+
+    def returns(self, missing: str = "zero") -> np.ndarray:
+        """
+        Simple daily returns on the aligned calendar.
+
+        missing="zero" -> 0.0 on sessions a ticker did not trade
+        missing="nan"  -> NaN on those sessions (the next traded
+                          session carries the full multi-day move)
+        """
+        rets = np.full_like(self.close, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets[1:] = self.close[1:] / self.close[:-1] - 1
+
+        if missing == "nan":
+            rets[~self.observed] = np.nan
+
+        return rets
+
+    def normalized(self, base: float = 100.0) -> np.ndarray:
+        """
+        Rebase every column to `base` at its first available close.
+        """
+        first_idx = first_valid_index(self.close)
+        n = len(self.tickers)
+        base_price = self.close[np.minimum(first_idx, len(self.dates) - 1), np.arange(n)]
+        base_price = np.where(base_price == 0, np.nan, base_price)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.close / base_price * base
+
+    def column(self, ticker: str) -> int:
+        return self.tickers.index(ticker)
+
+    def subset(self, tickers=None, start=None) -> "PricePanel":
+        """
+        Slice by tickers and/or start date (views where possible).
+        """
+        rows = slice(None)
+        if start is not None:
+            rows = slice(self.dates.searchsorted(pd.to_datetime(start)), None)
+
+        if tickers is None:
+            cols = np.arange(len(self.tickers))
+        else:
+            cols = np.array(
+                [self.tickers.index(t) for t in tickers if t in self.tickers],
+                dtype=int,
+            )
+
+        return PricePanel(
+            dates=self.dates[rows],
+            tickers=[self.tickers[i] for i in cols],
+            close=np.ascontiguousarray(self.close[rows][:, cols]),
+            observed=np.ascontiguousarray(self.observed[rows][:, cols]),
+        )
+
+    def to_frame(self, values: np.ndarray | None = None) -> pd.DataFrame:
+        """
+        Wrap a (T, N) array (default: close) back into a DataFrame.
+        """
+        return pd.DataFrame(
+            self.close if values is None else values,
+            index=self.dates,
+            columns=self.tickers,
+        )
+
+
+def first_valid_index(values: np.ndarray) -> np.ndarray:
+    """
+    Row index of the first non-NaN value per column
+    (len(values) for all-NaN columns).
+    """
+    valid = ~np.isnan(values)
+    idx = valid.argmax(axis=0)
+    return np.where(valid.any(axis=0), idx, len(values))
+
+
+def _pivot_close(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[["Date", "stock", "Close"]].dropna(subset=["Date", "Close"])
+    df = df.drop_duplicates(subset=["Date", "stock"], keep="last")
+    return df.pivot(index="Date", columns="stock", values="Close").sort_index()
+
+
+def _ffill(values: np.ndarray, seed: np.ndarray | None = None) -> np.ndarray:
+    """
+    Column-wise forward fill on a (T, N) array, optionally seeded
+    with the previous last row.
+    """
+    if seed is not None:
+        values = np.vstack([seed[None, :], values])
+
+    t = np.arange(len(values))[:, None]
+    idx = np.where(np.isnan(values), 0, t)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = np.take_along_axis(values, idx, axis=0)
+
+    return filled[1:] if seed is not None else filled
+
+
+def build_price_panel(df: pd.DataFrame, tickers=None) -> PricePanel:
+    """
+    Build an aligned PricePanel from the long (Date, stock, Close) frame.
+    """
+    if df is None or df.empty:
+        return PricePanel(pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty((0, 0), dtype=bool))
+
+    wide = _pivot_close(df)
+
+    if tickers is not None:
+        wide = wide.reindex(columns=list(tickers))
+
+    raw = wide.to_numpy(dtype="float64", na_value=np.nan)
+
+    return PricePanel(
+        dates=pd.DatetimeIndex(wide.index),
+        tickers=list(wide.columns),
+        close=np.ascontiguousarray(_ffill(raw)),
+        observed=~np.isnan(raw),
+    )
+
+
+def update_price_panel(panel: PricePanel, new_bars: pd.DataFrame) -> PricePanel:
+    """
+    Incrementally append new bars to an existing panel.
+
+    Only bars on or after the panel's last date are applied:
+    the last row is revised in place (intraday updates) and
+    later dates are appended. New tickers get NaN history.
+    """
+    if new_bars is None or new_bars.empty:
+        return panel
+
+    if len(panel.dates) == 0:
+        return build_price_panel(new_bars)
+
+    last_date = panel.dates[-1]
+    new_bars = new_bars[pd.to_datetime(new_bars["Date"]) >= last_date]
+
+    if new_bars.empty:
+        return panel
+
+    wide = _pivot_close(new_bars)
+
+    tickers = panel.tickers + [t for t in wide.columns if t not in panel.tickers]
+    wide = wide.reindex(columns=tickers)
+    raw_new = wide.to_numpy(dtype="float64", na_value=np.nan)
+
+    n_old = len(panel.tickers)
+    n_new = len(tickers)
+
+    # Widen the existing arrays if new tickers showed up
+    close = panel.close
+    observed = panel.observed
+    if n_new > n_old:
+        pad = n_new - n_old
+        close = np.hstack([close, np.full((len(close), pad), np.nan)])
+        observed = np.hstack([observed, np.zeros((len(observed), pad), dtype=bool)])
+
+    # Revise the overlapping last row, keep untouched tickers as they were
+    revise_last = wide.index[0] == last_date
+    if revise_last:
+        last_raw = raw_new[0]
+        close = close.copy()
+        observed = observed.copy()
+        hit = ~np.isnan(last_raw)
+        close[-1, hit] = last_raw[hit]
+        observed[-1, hit] = True
+        raw_new = raw_new[1:]
+        new_index = wide.index[1:]
+    else:
+        new_index = wide.index
+
+    if len(new_index) == 0:
+        return PricePanel(
+            panel.dates, tickers, np.ascontiguousarray(close), observed,
+            extends=weakref.ref(panel),
+        )
+
+    appended = _ffill(raw_new, seed=close[-1])
+
+    return PricePanel(
+        dates=panel.dates.append(pd.DatetimeIndex(new_index)),
+        tickers=tickers,
+        close=np.ascontiguousarray(np.vstack([close, appended])),
+        observed=np.vstack([observed, ~np.isnan(raw_new)]),
+        extends=weakref.ref(panel),
+    )
+
+
+# --------------------------------------------------
+# Process-level cache (rebuilt incrementally)
+# --------------------------------------------------
+
+PANEL_CACHE_SIZE = 32   # (key) entries
+
+_PANEL_CACHE = OrderedDict()   # {key: (frame signature, panel)}
+_panel_lock = threading.Lock()
+
+
+def frame_signature(df: pd.DataFrame) -> tuple:
+    """
+    Per-ticker (stock, rows, last Date, last Close), sorted by ticker.
+    Two frames with the same signature hold the same tickers with the
+    same latest bars; a NaN close is recorded as None so it compares equal.
+    """
+    if df is None or df.empty:
+        return ()
+
+    dates = pd.Series(pd.to_datetime(df["Date"]).to_numpy())
+    codes, tickers = pd.factorize(df["stock"], sort=True)
+
+    last = dates.groupby(codes).idxmax().to_numpy()
+    rows = np.bincount(codes, minlength=len(tickers))
+    close = df["Close"].to_numpy(dtype=float)[last]
+
+    return tuple(
+        (t, int(n), d, None if np.isnan(c) else float(c))
+        for t, n, d, c in zip(tickers, rows, dates.to_numpy()[last], close)
+    )
+
+
+def _only_adds_bars(old: tuple, new: tuple, df: pd.DataFrame, dates: pd.Series,
+                    last_date) -> bool:
+    """
+    True if `df` is the frame behind `old` plus bars update_price_panel
+    can apply: same tickers, new rows only on or after the panel's last
+    date, and last-bar revisions only on that date.
+    """
+    if [s[0] for s in old] != [s[0] for s in new]:
+        return False
+
+    old_last = {s[0]: s[2] for s in old}
+    newer = dates.to_numpy() > df["stock"].map(old_last).to_numpy()
+
+    if (dates.to_numpy()[newer] < last_date).any():
+        return False
+
+    added = pd.Series(newer).groupby(df["stock"].to_numpy()).sum()
+
+    for (ticker, rows, last, close), (_, new_rows, new_last, new_close) in zip(old, new):
+        if new_last < last or new_rows - rows != added.get(ticker, 0):
+            return False
+        if new_last == last and new_close != close and last != last_date:
+            return False
+
+    return True
+
+
+def get_price_panel(df: pd.DataFrame, key: str = "universe") -> PricePanel:
+    """
+    Cached panel for a long price frame.
+
+    The cache is keyed on the frame's per-ticker signature
+    (frame_signature). If the frame only adds newer bars to the cached
+    one the panel is topped up incrementally; any other change
+    (including a different ticker set) triggers a full rebuild.
+    """
+    if df is None or df.empty:
+        return build_price_panel(df)
+
+    dates = pd.to_datetime(df["Date"])
+    signature = frame_signature(df)
+
+    with _panel_lock:
+        cached = _PANEL_CACHE.get(key)
+        if cached is not None:
+            _PANEL_CACHE.move_to_end(key)
+
+    if cached is not None:
+        old_signature, panel = cached
+
+        if old_signature == signature:
+            return panel
+
+        last_date = panel.dates[-1] if len(panel.dates) else None
+
+        if last_date is not None and _only_adds_bars(old_signature, signature, df, dates, last_date):
+            panel = update_price_panel(panel, df[dates >= last_date])
+        else:
+            panel = build_price_panel(df)
+    else:
+        panel = build_price_panel(df)
+
+    with _panel_lock:
+        _PANEL_CACHE[key] = (signature, panel)
+        _PANEL_CACHE.move_to_end(key)
+        while len(_PANEL_CACHE) > PANEL_CACHE_SIZE:
+            _PANEL_CACHE.popitem(last=False)
+
+    return panel
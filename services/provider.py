@@ -0,0 +1,222 @@
+import threading
+import time
+
+from utils.startup import measure_imports
+
+# Token bucket: sustained requests/second and burst size
+REQUESTS_PER_SECOND = 5.0
+BURST = 10
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0
+
+
+def _yf():
+    """
+    yfinance, imported on first use: it is the slowest import
+    in the app and cached reruns never need it.
+    """
+    with measure_imports("yfinance"):
+        import yfinance
+
+    return yfinance
+
+
+def _rate_limit_errors() -> tuple:
+    error = getattr(_yf().exceptions, "YFRateLimitError", None)
+    return (error,) if error is not None else ()
+
+# Counters for the provider (read by the sidebar diagnostics)
+stats = {
+    "requests": 0,
+    "retries": 0,
+    "failures": 0,
+    "throttle_waits": 0,
+    "throttle_wait_seconds": 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, amount=1):
+    with _stats_lock:
+        stats[name] += amount
+
+
+# --------------------------------------------------
+# Shared, pooled HTTP session
+# --------------------------------------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    One keep-alive HTTP session shared by every provider call.
+    curl_cffi (a yfinance dependency) keeps a connection pool per
+    thread, so it is safe to share across Streamlit sessions.
+    Returns None if curl_cffi is unavailable (yfinance default session).
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                try:
+                    from curl_cffi import requests as curl_requests
+                except ImportError:
+                    return None
+                _session = curl_requests.Session(impersonate="chrome")
+
+    return _session
+
+
+# --------------------------------------------------
+# Rate limiting
+# --------------------------------------------------
+
+class TokenBucket:
+    """Thread-safe token bucket; `acquire` blocks until tokens are available."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Take `tokens` (requests larger than the burst are paced in
+        burst-sized steps). Returns seconds spent waiting.
+        """
+        waited = 0.0
+        remaining = tokens
+
+        while remaining > 0:
+            step = min(remaining, self.capacity)
+
+            with self._lock:
+                self._refill()
+                if self.tokens >= step:
+                    self.tokens -= step
+                    remaining -= step
+                    continue
+                delay = (step - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+        return waited
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """
+        Non-blocking acquire: takes `tokens` and returns 0.0 if they are
+        available, otherwise takes nothing and returns the seconds until
+        they would be.
+        """
+        step = min(tokens, self.capacity)
+
+        with self._lock:
+            self._refill()
+            if self.tokens >= step:
+                self.tokens -= step
+                return 0.0
+            return (step - self.tokens) / self.rate
+
+
+_bucket = TokenBucket(REQUESTS_PER_SECOND, BURST)
+
+
+def throttle(cost: int = 1):
+    """
+    Take `cost` tokens from the shared bucket and count the request.
+    Used directly by callers that do their own HTTP (async path).
+    """
+    waited = _bucket.acquire(cost)
+    if waited > 0:
+        _count("throttle_waits")
+        _count("throttle_wait_seconds", waited)
+
+    _count("requests", cost)
+
+
+def try_throttle(cost: int = 1) -> float:
+    """
+    Non-blocking throttle for async callers, which wait on their own
+    event loop (and their own deadline). Returns 0.0 once the tokens
+    are taken and the request counted, else the seconds to wait.
+    """
+    delay = _bucket.try_acquire(cost)
+    if delay == 0:
+        _count("requests", cost)
+    return delay
+
+
+def record_wait(seconds: float):
+    _count("throttle_waits")
+    _count("throttle_wait_seconds", seconds)
+
+
+def record_failure():
+    _count("failures")
+
+
+def request(fn, *args, cost: int = 1, **kwargs):
+    """
+    Run one provider call paced by the shared token bucket.
+    Rate-limit errors are retried with exponential backoff;
+    other errors propagate after being counted.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        throttle(cost)
+
+        try:
+            return fn(*args, **kwargs)
+        except Exception as exc:
+            if not isinstance(exc, _rate_limit_errors()) or attempt == MAX_RETRIES:
+                _count("failures")
+                raise
+            _count("retries")
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+
+
+# --------------------------------------------------
+# yfinance entry points
+# --------------------------------------------------
+
+def download(tickers, cost: int | None = None, **kwargs):
+    """
+    yf.download through the shared session and rate limiter.
+    yfinance issues one request per ticker, so the cost defaults to
+    the number of tickers; bulk callers that pace themselves (bounded
+    pools of chunked requests) can charge less.
+    """
+    if cost is None:
+        cost = len(tickers) if isinstance(tickers, (list, tuple)) else 1
+    kwargs.setdefault("progress", False)
+
+    return request(
+        _yf().download,
+        tickers=tickers,
+        session=get_session(),
+        cost=cost,
+        **kwargs
+    )
+
+
+def ticker(symbol: str):
+    """
+    yf.Ticker bound to the shared session. Its attributes load lazily,
+    so wrap the attribute access in `request(...)`.
+    """
+    return _yf().Ticker(symbol, session=get_session())
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        return dict(stats)
@@ -0,0 +1,474 @@
+"""
+Analytical queries over the on-disk parquet price store.
+
+Filters, resampling and per-ticker aggregates / KPIs run inside
+DuckDB (when installed) directly on the parquet files, so only the
+result is materialised in pandas; `iter_prices` streams large slices
+in record batches. Without DuckDB the same API falls back to a
+pyarrow dataset scan with filter pushdown and finishes in pandas.
+
+Sources:
+- STORE_DIR/<name>.parquet  published universe / benchmark bars
+- history_store.CACHE_DIR   per-ticker custom histories (validated
+                            before they are written)
+Stored bars are raw; adjusted=True applies the factor table
+(services.adjustments) as part of the query.
+"""
+
+import glob
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from services import adjustments
+from services.history_store import CACHE_DIR as HISTORY_DIR
+
+STORE_DIR = "data/cache/store"
+STORE_ROW_GROUP_SIZE = 64_000
+STREAM_BATCH_ROWS = 100_000
+
+PRICE_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume", "stock"]
+
+# DuckDB date_trunc units
+RESAMPLE_UNITS = {"W": "week", "M": "month", "Q": "quarter", "Y": "year"}
+# pandas equivalents for the fallback
+_PANDAS_PERIODS = {"W": "W", "M": "M", "Q": "Q", "Y": "Y"}
+
+_duckdb_conn = None
+_duckdb_lock = threading.Lock()
+
+
+def _duckdb():
+    """DuckDB connection (process-wide), or None if not installed."""
+    global _duckdb_conn
+
+    if _duckdb_conn is None:
+        with _duckdb_lock:
+            if _duckdb_conn is None:
+                try:
+                    import duckdb
+                except ImportError:
+                    return None
+                _duckdb_conn = duckdb.connect(database=":memory:")
+
+    # Connections are not thread-safe; cursors are cheap per-thread handles
+    return _duckdb_conn.cursor()
+
+
+# --------------------------------------------------
+# Store
+# --------------------------------------------------
+
+def store_path(name: str) -> str:
+    return os.path.join(STORE_DIR, f"{name}.parquet")
+
+
+def publish_prices(df: pd.DataFrame, name: str):
+    """
+    Write a raw long frame to the store (atomically). Rows are sorted
+    by (stock, Date) so row-group statistics let scans skip tickers
+    and date ranges that a query does not touch.
+    """
+    if df is None or df.empty:
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    path = store_path(name)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    frame = df[[c for c in PRICE_COLUMNS if c in df.columns]].sort_values(["stock", "Date"])
+    frame = frame.assign(Date=pd.to_datetime(frame["Date"]).astype("datetime64[ns]"))
+
+    pq.write_table(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        tmp,
+        row_group_size=STORE_ROW_GROUP_SIZE,
+    )
+    os.replace(tmp, path)
+
+
+def is_published(name: str, source_path: str) -> bool:
+    """True if the store copy is at least as new as `source_path`."""
+    path = store_path(name)
+    return (
+        os.path.exists(path)
+        and os.path.exists(source_path)
+        and os.path.getmtime(path) >= os.path.getmtime(source_path)
+    )
+
+
+def _sources() -> list:
+    return sorted(
+        glob.glob(os.path.join(STORE_DIR, "*.parquet"))
+        + glob.glob(os.path.join(HISTORY_DIR, "*.parquet"))
+    )
+
+
+def store_version() -> tuple:
+    """
+    (files, newest mtime) of the store: changes whenever a source is
+    published or rewritten, so callers can key their caches on it.
+    """
+    sources = _sources()
+    newest = max((os.path.getmtime(p) for p in sources if os.path.exists(p)), default=0.0)
+    return len(sources), newest
+
+
+def _columns(columns) -> list:
+    """Requested price columns in store order; Date and stock always lead."""
+    if not columns:
+        return list(PRICE_COLUMNS)
+    return [c for c in PRICE_COLUMNS if c in ("Date", "stock") or c in columns]
+
+
+# --------------------------------------------------
+# SQL building (DuckDB)
+# --------------------------------------------------
+
+def _where(tickers, start, end) -> tuple:
+    clauses, params = [], []
+
+    if tickers is not None:
+        tickers = list(tickers)
+        clauses.append(f"stock IN ({', '.join('?' * len(tickers))})" if tickers else "FALSE")
+        params.extend(tickers)
+    if start is not None:
+        clauses.append("Date >= ?")
+        params.append(pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        clauses.append("Date <= ?")
+        params.append(pd.Timestamp(end).to_pydatetime())
+
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _prices_sql(sources, tickers, start, end, adjusted) -> tuple:
+    """SELECT over the store with filters pushed into the parquet scan."""
+    where, params = _where(tickers, start, end)
+    files = ", ".join(f"'{p}'" for p in sources)
+
+    # A ticker both published and in the custom history cache is read
+    # from the published (validated) store
+    raw = f"""
+        SELECT Date::TIMESTAMP AS Date, Open, High, Low, Close, Volume, stock
+        FROM read_parquet([{files}], union_by_name = true, filename = true)
+        {where}
+        QUALIFY row_number() OVER (PARTITION BY stock, Date ORDER BY filename DESC) = 1
+    """
+
+    if not adjusted or not os.path.exists(adjustments.FACTORS_PATH):
+        return raw, params
+
+    sql = f"""
+        SELECT p.Date,
+               p.Open * coalesce(f.factor, 1) AS Open,
+               p.High * coalesce(f.factor, 1) AS High,
+               p.Low * coalesce(f.factor, 1) AS Low,
+               p.Close * coalesce(f.factor, 1) AS Close,
+               p.Volume,
+               p.stock
+        FROM ({raw}) p
+        ASOF LEFT JOIN read_parquet('{adjustments.FACTORS_PATH}') f
+          ON p.stock = f.stock AND p.Date >= f.Date::TIMESTAMP
+    """
+    return sql, params
+
+
+# --------------------------------------------------
+# Fallback scan (pyarrow)
+# --------------------------------------------------
+
+def _scan(sources, tickers, start, end):
+    """pyarrow dataset scanner with the filters pushed down."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(sources, format="parquet")
+    names = dataset.schema.names
+
+    expr = None
+    if tickers is not None:
+        expr = ds.field("stock").isin(list(tickers))
+    if start is not None:
+        cond = ds.field("Date") >= pd.Timestamp(start)
+        expr = cond if expr is None else expr & cond
+    if end is not None:
+        cond = ds.field("Date") <= pd.Timestamp(end)
+        expr = cond if expr is None else expr & cond
+
+    return dataset.scanner(
+        columns=[c for c in PRICE_COLUMNS if c in names],
+        filter=expr,
+        batch_size=STREAM_BATCH_ROWS,
+    )
+
+
+def _finish(df: pd.DataFrame, adjusted: bool) -> pd.DataFrame:
+    df = df.drop_duplicates(subset=["stock", "Date"], keep="last")
+    df = df.sort_values(["stock", "Date"]).reset_index(drop=True)
+    return adjustments.apply_adjustments(df) if adjusted else df
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=PRICE_COLUMNS)
+
+
+# --------------------------------------------------
+# Queries
+# --------------------------------------------------
+
+def query_prices(tickers=None, start=None, end=None, adjusted: bool = True,
+                 columns=None) -> pd.DataFrame:
+    """
+    Bars for `tickers` in [start, end], sorted by (stock, Date).
+    `columns` limits the price columns read (Date and stock always
+    come back), e.g. ["Close"] for a returns panel.
+    """
+    columns = _columns(columns)
+    sources = _sources()
+    if not sources:
+        return _empty()[columns]
+
+    con = _duckdb()
+    if con is None:
+        df = _finish(_scan(sources, tickers, start, end).to_table().to_pandas(), adjusted)
+        return df[[c for c in columns if c in df.columns]]
+
+    sql, params = _prices_sql(sources, tickers, start, end, adjusted)
+    df = con.execute(
+        f"SELECT {', '.join(columns)} FROM ({sql}) ORDER BY stock, Date", params
+    ).df()
+    return df.assign(Date=df["Date"].astype("datetime64[ns]"))
+
+
+def iter_prices(tickers=None, start=None, end=None, adjusted: bool = True,
+                columns=None, batch_rows: int = STREAM_BATCH_ROWS):
+    """
+    Stream the same slice as query_prices in DataFrame batches,
+    never holding more than one batch in memory. Batches are in
+    (stock, Date) order.
+    """
+    columns = _columns(columns)
+    sources = _sources()
+    if not sources:
+        return
+
+    con = _duckdb()
+    if con is None:
+        for batch in _scan(sources, tickers, start, end).to_batches():
+            if batch.num_rows:
+                df = batch.to_pandas()
+                df = adjustments.apply_adjustments(df) if adjusted else df
+                yield df[[c for c in columns if c in df.columns]]
+        return
+
+    sql, params = _prices_sql(sources, tickers, start, end, adjusted)
+    reader = con.execute(
+        f"SELECT {', '.join(columns)} FROM ({sql}) ORDER BY stock, Date", params
+    ).fetch_record_batch(batch_rows)
+
+    for batch in reader:
+        if batch.num_rows:
+            df = batch.to_pandas()
+            yield df.assign(Date=df["Date"].astype("datetime64[ns]"))
+
+
+def resample_prices(tickers, rule: str = "M", start=None, end=None,
+                    adjusted: bool = True) -> pd.DataFrame:
+    """
+    OHLCV bars per ticker and period (rule: W / M / Q / Y), labelled
+    by period start, with the period return in %.
+    """
+    if rule not in RESAMPLE_UNITS:
+        raise ValueError(f"Unsupported resample rule: {rule}")
+
+    sources = _sources()
+    if not sources:
+        return pd.DataFrame(columns=PRICE_COLUMNS + ["return_pct"])
+
+    con = _duckdb()
+    if con is None:
+        df = query_prices(tickers, start, end, adjusted)
+        period = df["Date"].dt.to_period(_PANDAS_PERIODS[rule]).dt.start_time
+        out = df.groupby(["stock", period]).agg(
+            Open=("Open", "first"),
+            High=("High", "max"),
+            Low=("Low", "min"),
+            Close=("Close", "last"),
+            Volume=("Volume", "sum"),
+        ).reset_index()
+    else:
+        sql, params = _prices_sql(sources, tickers, start, end, adjusted)
+        out = con.execute(
+            f"""
+            SELECT stock,
+                   date_trunc('{RESAMPLE_UNITS[rule]}', Date) AS Date,
+                   arg_min(Open, Date) AS Open,
+                   max(High) AS High,
+                   min(Low) AS Low,
+                   arg_max(Close, Date) AS Close,
+                   sum(Volume) AS Volume
+            FROM ({sql})
+            GROUP BY ALL
+            ORDER BY stock, Date
+            """,
+            params,
+        ).df()
+
+    prev_close = out.groupby("stock")["Close"].shift()
+    out["return_pct"] = (out["Close"] / prev_close - 1) * 100
+    return out[["Date", "Open", "High", "Low", "Close", "Volume", "stock", "return_pct"]]
+
+
+# --------------------------------------------------
+# Per-ticker aggregates
+# --------------------------------------------------
+# Same definitions as components.metrics.calculate_kpis and the latest
+# row of services.indicators (MA / volatility / drawdown), so a ticker
+# gets identical numbers whether they come from its enriched frame or
+# from the store:
+#   - returns are close-to-close; the first bar has none
+#   - drawdowns run from the second bar's close (first return)
+#   - win rate counts the first bar (no return) as a non-win
+#   - MA 20 / 50 need 5 / 10 bars, 20D volatility 5 returns
+
+KPI_COLUMNS = [
+    "latest_price", "total_return_pct", "cagr_pct", "volatility_20",
+    "downside_vol", "max_drawdown", "high_52w", "low_52w", "win_rate_pct",
+]
+
+AGGREGATE_COLUMNS = ["stock", "date", "volume", "daily_return_pct", "ma_20", "ma_50",
+                     "drawdown_pct", "prior_high_52w"] + KPI_COLUMNS
+
+
+def ticker_aggregates(tickers=None, start=None, end=None, adjusted: bool = True) -> pd.DataFrame:
+    """
+    One row per ticker: the KPIs (KPI_COLUMNS) plus latest-bar fields
+    (date, volume, daily return, MA 20 / 50, drawdown, 52-week high
+    before the latest session), computed inside the query engine in
+    one pass over the store.
+    """
+    sources = _sources()
+    if not sources:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+
+    con = _duckdb()
+    if con is None:
+        return _ticker_aggregates_pandas(query_prices(tickers, start, end, adjusted))
+
+    sql, params = _prices_sql(sources, tickers, start, end, adjusted)
+    df = con.execute(
+        f"""
+        WITH bars AS (
+            SELECT stock, Date, High, Low, Close, Volume,
+                   Close / lag(Close) OVER w - 1 AS ret,
+                   row_number() OVER w AS rn,
+                   row_number() OVER (PARTITION BY stock ORDER BY Date DESC) AS age
+            FROM ({sql})
+            WHERE Close IS NOT NULL
+            WINDOW w AS (PARTITION BY stock ORDER BY Date)
+        ),
+        drawdowns AS (
+            SELECT *,
+                   CASE WHEN rn > 1 THEN
+                       Close / max(CASE WHEN rn > 1 THEN Close END) OVER (
+                           PARTITION BY stock ORDER BY Date ROWS UNBOUNDED PRECEDING
+                       ) - 1
+                   END AS dd
+            FROM bars
+        )
+        SELECT stock,
+               max(Date) AS date,
+               arg_max(Volume, Date) AS volume,
+               max(ret) FILTER (WHERE age = 1) * 100 AS daily_return_pct,
+               CASE WHEN count(*) FILTER (WHERE age <= 20) >= 5
+                    THEN avg(Close) FILTER (WHERE age <= 20) END AS ma_20,
+               CASE WHEN count(*) FILTER (WHERE age <= 50) >= 10
+                    THEN avg(Close) FILTER (WHERE age <= 50) END AS ma_50,
+               max(dd) FILTER (WHERE age = 1) * 100 AS drawdown_pct,
+               max(High) FILTER (WHERE age BETWEEN 2 AND 253) AS prior_high_52w,
+               arg_max(Close, Date) AS latest_price,
+               (arg_max(Close, Date) / arg_min(Close, Date) - 1) * 100 AS total_return_pct,
+               CASE WHEN max(Date) > min(Date) THEN
+                   (pow(arg_max(Close, Date) / arg_min(Close, Date),
+                        365.25 / date_diff('day', min(Date), max(Date))) - 1) * 100
+               END AS cagr_pct,
+               CASE WHEN count(ret) FILTER (WHERE age <= 20) >= 5
+                    THEN stddev_samp(ret * 100) FILTER (WHERE age <= 20) END AS volatility_20,
+               stddev_samp(ret * 100) FILTER (WHERE ret < 0) AS downside_vol,
+               min(dd) * 100 AS max_drawdown,
+               max(High) FILTER (WHERE age <= 252) AS high_52w,
+               min(Low) FILTER (WHERE age <= 252) AS low_52w,
+               CASE WHEN count(ret) > 0
+                    THEN avg(CASE WHEN ret > 0 THEN 100.0 ELSE 0.0 END) END AS win_rate_pct
+        FROM drawdowns
+        GROUP BY stock
+        ORDER BY stock
+        """,
+        params,
+    ).df()[AGGREGATE_COLUMNS]
+    return df.assign(date=df["date"].astype("datetime64[ns]"))
+
+
+def ticker_kpis(tickers=None, start=None, end=None, adjusted: bool = True) -> pd.DataFrame:
+    """
+    One row per ticker with the components.metrics KPIs (latest
+    price, total return, CAGR, 20D volatility, downside volatility,
+    max drawdown, 52-week high/low, win rate).
+    """
+    return ticker_aggregates(tickers, start, end, adjusted)[["stock"] + KPI_COLUMNS]
+
+
+def _ticker_aggregates_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=AGGREGATE_COLUMNS)
+
+    df = df.dropna(subset=["Close"]).sort_values(["stock", "Date"])
+    g = df.groupby("stock", sort=True)
+
+    ret = g["Close"].pct_change() * 100
+    later = g.cumcount() > 0
+    peak = df["Close"].where(later).groupby(df["stock"]).cummax()
+    df = df.assign(
+        ret=ret,
+        dd=(df["Close"].where(later) / peak - 1) * 100,
+        age=g.cumcount(ascending=False) + 1,
+    )
+
+    g = df.groupby("stock", sort=True)
+    first, last = g["Close"].first(), g["Close"].last()
+    days = (g["Date"].max() - g["Date"].min()).dt.days
+
+    def recent(bars: int):
+        return df[df["age"] <= bars].groupby("stock")
+
+    def at_least(values, counts, n):
+        return values.where(counts >= n)
+
+    latest = df[df["age"] == 1].set_index("stock")
+
+    out = pd.DataFrame({
+        "date": latest["Date"],
+        "volume": latest["Volume"],
+        "daily_return_pct": latest["ret"],
+        "ma_20": at_least(recent(20)["Close"].mean(), recent(20)["Close"].count(), 5),
+        "ma_50": at_least(recent(50)["Close"].mean(), recent(50)["Close"].count(), 10),
+        "drawdown_pct": latest["dd"],
+        "prior_high_52w": df[(df["age"] >= 2) & (df["age"] <= 253)].groupby("stock")["High"].max(),
+        "latest_price": last,
+        "total_return_pct": (last / first - 1) * 100,
+        "cagr_pct": ((last / first) ** (365.25 / days.where(days > 0)) - 1) * 100,
+        "volatility_20": at_least(recent(20)["ret"].std(), recent(20)["ret"].count(), 5),
+        "downside_vol": df[df["ret"] < 0].groupby("stock")["ret"].std(),
+        "max_drawdown": g["dd"].min(),
+        "high_52w": recent(252)["High"].max(),
+        "low_52w": recent(252)["Low"].min(),
+        "win_rate_pct": ((df["ret"] > 0) * 100.0).groupby(df["stock"]).mean().where(
+            g["ret"].count() > 0
+        ),
+    })
+    return out.rename_axis("stock").reset_index().replace({np.inf: np.nan})[AGGREGATE_COLUMNS]
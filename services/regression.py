@@ -0,0 +1,185 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from services.price_panel import PricePanel
+
+
+@dataclass
+class RollingRegression:
+    """
+    Rolling OLS of every ticker's daily returns on each benchmark.
+
+    Arrays are shaped (windows, benchmarks, T, N):
+        beta  - slope vs the benchmark
+        alpha - intercept, daily return in %
+        r2    - coefficient of determination
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: list
+    benchmarks: list
+    windows: list
+    beta: np.ndarray
+    alpha: np.ndarray
+    r2: np.ndarray
+
+    def series(self, ticker: str, benchmark: str, window: int) -> pd.DataFrame:
+        """
+        Beta / alpha / R² over time for one ticker-benchmark-window.
+        """
+        if ticker not in self.tickers or benchmark not in self.benchmarks:
+            return pd.DataFrame(columns=["Date", "beta", "alpha_pct", "r2"])
+
+        w = self.windows.index(window)
+        b = self.benchmarks.index(benchmark)
+        i = self.tickers.index(ticker)
+
+        return pd.DataFrame({
+            "Date": self.dates,
+            "beta": self.beta[w, b, :, i],
+            "alpha_pct": self.alpha[w, b, :, i],
+            "r2": self.r2[w, b, :, i],
+        })
+
+    def latest(self, window: int) -> pd.DataFrame:
+        """
+        Latest beta / R² per ticker and benchmark (long format).
+        """
+        w = self.windows.index(window)
+        frames = []
+
+        for b, bench in enumerate(self.benchmarks):
+            frames.append(pd.DataFrame({
+                "stock": self.tickers,
+                "benchmark": bench,
+                "beta": self.beta[w, b, -1],
+                "alpha_pct": self.alpha[w, b, -1],
+                "r2": self.r2[w, b, -1],
+            }))
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+
+
+def rolling_regression(
+    panel: PricePanel,
+    benchmarks: list,
+    windows=(60, 120, 250),
+    min_periods=None,
+) -> RollingRegression:
+    """
+    Rolling OLS via running sums.
+
+    For every (benchmark, ticker) pair the five sums n, Σx, Σy, Σx², Σxy, Σy²
+    are prefix-summed once; each window is then a two-row difference,
+    so cost is O(T * N * B) per window regardless of window length.
+    A day counts only when both the ticker and the benchmark traded.
+    """
+    windows = list(windows)
+    bench_cols = [panel.tickers.index(b) for b in benchmarks if b in panel.tickers]
+    benchmarks = [panel.tickers[c] for c in bench_cols]
+    stock_cols = [i for i, t in enumerate(panel.tickers) if t not in benchmarks]
+    tickers = [panel.tickers[i] for i in stock_cols]
+
+    T = len(panel.dates)
+    shape = (len(windows), len(benchmarks), T, len(tickers))
+    if not benchmarks or not tickers:
+        empty = np.full(shape, np.nan)
+        return RollingRegression(panel.dates, tickers, benchmarks, windows, empty, empty, empty)
+
+    returns = panel.returns(missing="nan")
+    y = returns[:, stock_cols]             # (T, N)
+    x = returns[:, bench_cols]             # (T, B)
+
+    valid = ~np.isnan(y)[:, None, :] & ~np.isnan(x)[:, :, None]   # (T, B, N)
+    xb = np.where(valid, x[:, :, None], 0.0)
+    yb = np.where(valid, y[:, None, :], 0.0)
+
+    n = _prefix(valid.astype("float64"))
+    sx = _prefix(xb)
+    sy = _prefix(yb)
+    sxx = _prefix(xb * xb)
+    syy = _prefix(yb * yb)
+    sxy = _prefix(xb * yb)
+
+    beta = np.full(shape, np.nan)
+    alpha = np.full(shape, np.nan)
+    r2 = np.full(shape, np.nan)
+
+    hi = np.arange(1, T + 1)
+
+    for k, window in enumerate(windows):
+        lo = np.maximum(hi - window, 0)
+        min_n = min_periods or max(window // 2, 2)
+
+        wn = n[hi] - n[lo]
+        wx = sx[hi] - sx[lo]
+        wy = sy[hi] - sy[lo]
+        wxx = sxx[hi] - sxx[lo]
+        wyy = syy[hi] - syy[lo]
+        wxy = sxy[hi] - sxy[lo]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = wn * wxy - wx * wy
+            var_x = wn * wxx - wx * wx
+            var_y = wn * wyy - wy * wy
+
+            b_k = cov / var_x
+            a_k = (wy - b_k * wx) / wn
+            r2_k = cov * cov / (var_x * var_y)
+
+        short = (wn < min_n) | (var_x <= 0)
+        b_k[short] = np.nan
+        a_k[short] = np.nan
+        r2_k[short] = np.nan
+
+        # (T, B, N) -> (B, T, N)
+        beta[k] = b_k.transpose(1, 0, 2)
+        alpha[k] = a_k.transpose(1, 0, 2) * 100
+        r2[k] = np.clip(r2_k, 0.0, 1.0).transpose(1, 0, 2)
+
+    return RollingRegression(panel.dates, tickers, benchmarks, windows, beta, alpha, r2)
+
+
+# --------------------------------------------------
+# Process-level cache
+# --------------------------------------------------
+
+REGRESSION_CACHE_SIZE = 32   # (key, benchmarks, windows) entries
+
+_REGRESSION_CACHE = OrderedDict()
+_regression_lock = threading.Lock()
+
+
+def get_rolling_regression(
+    panel: PricePanel,
+    benchmarks: list,
+    windows=(60, 120, 250),
+    key: str = "universe",
+) -> RollingRegression:
+    """
+    Cached regression for a panel (recomputed when the panel changes).
+    """
+    cache_key = (key, tuple(benchmarks), tuple(windows))
+
+    with _regression_lock:
+        cached = _REGRESSION_CACHE.get(cache_key)
+        if cached is not None and cached[0] is panel:
+            _REGRESSION_CACHE.move_to_end(cache_key)
+            return cached[1]
+
+    result = rolling_regression(panel, benchmarks, windows)
+
+    with _regression_lock:
+        _REGRESSION_CACHE[cache_key] = (panel, result)
+        _REGRESSION_CACHE.move_to_end(cache_key)
+        while len(_REGRESSION_CACHE) > REGRESSION_CACHE_SIZE:
+            _REGRESSION_CACHE.popitem(last=False)
+    return result
@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from services.price_panel import PricePanel
+
+
+@dataclass
+class RollingVaR:
+    """
+    Rolling Value-at-Risk / Expected Shortfall for a whole panel.
+
+    `values` maps (method, horizon, measure) -> (T, N) array, e.g.
+    ("historical", 1, "var"). All figures are positive loss in %.
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: list
+    confidence: float
+    window: int
+    values: dict = field(default_factory=dict)
+
+    def series(self, ticker: str) -> pd.DataFrame:
+        """
+        All VaR / ES series for one ticker, one column per
+        method/horizon/measure (e.g. `var_historical_1d`).
+        """
+        if ticker not in self.tickers:
+            return pd.DataFrame()
+
+        i = self.tickers.index(ticker)
+        out = {"Date": self.dates}
+
+        for (method, horizon, measure), arr in self.values.items():
+            out[f"{measure}_{method}_{horizon}d"] = arr[:, i]
+
+        return pd.DataFrame(out)
+
+    def latest(self) -> pd.DataFrame:
+        """
+        Latest VaR / ES per ticker.
+        """
+        out = {"stock": self.tickers}
+
+        for (method, horizon, measure), arr in self.values.items():
+            out[f"{measure}_{method}_{horizon}d"] = arr[-1]
+
+        return pd.DataFrame(out)
+
+
+def rolling_tail_quantile(
+    values: np.ndarray,
+    window: int,
+    q: float,
+    min_periods: int | None = None,
+) -> tuple:
+    """
+    Rolling lower-tail quantile and tail mean for every column at once.
+
+    Keeps one sorted window per column (shape (N, window)). Each step
+    removes the expiring value and inserts the new one by shifting,
+    i.e. O(window) per column instead of re-sorting each window.
+    NaNs are stored as +inf at the end of the window and excluded.
+
+    Returns (quantile, tail_mean), both (T, N).
+    """
+    T, N = values.shape
+    min_periods = min_periods or max(window // 2, 2)
+
+    x = np.where(np.isnan(values), np.inf, values)
+    expiring = np.vstack([np.full((window, N), np.inf), x])
+
+    buf = np.full((N, window), np.inf)
+    count = np.zeros(N, dtype=int)
+    rows = np.arange(N)
+    slots = np.arange(window)
+
+    quantile = np.full((T, N), np.nan)
+    tail_mean = np.full((T, N), np.nan)
+
+    for t in range(T):
+        new = x[t]
+        old = expiring[t]
+
+        # ---- remove the expiring value (first match) ----
+        pos_old = (buf < old[:, None]).sum(axis=1)
+        keep = slots[None, :] != pos_old[:, None]
+        trimmed = buf[keep].reshape(N, window - 1)
+
+        # ---- insert the new value ----
+        pos_new = (trimmed < new[:, None]).sum(axis=1)
+        src = slots[None, :] - (slots[None, :] > pos_new[:, None])
+        buf = trimmed[rows[:, None], np.minimum(src, window - 2)]
+        buf[rows, pos_new] = new
+
+        count += np.isfinite(new).astype(int) - np.isfinite(old).astype(int)
+
+        ready = count >= max(min_periods, 1)
+        if not ready.any():
+            continue
+
+        # ---- linear-interpolated quantile (numpy / pandas default) ----
+        h = q * (count - 1)
+        lo = np.floor(h).astype(int).clip(0, window - 1)
+        hi = np.ceil(h).astype(int).clip(0, window - 1)
+        q_lo = buf[rows, lo]
+        q_hi = buf[rows, hi]
+        with np.errstate(invalid="ignore"):
+            q_val = q_lo + (h - lo) * (q_hi - q_lo)
+
+        # ---- tail mean: average of values at or below the quantile ----
+        in_tail = buf <= q_val[:, None]
+        n_tail = np.maximum(in_tail.sum(axis=1), 1)
+        t_val = np.where(in_tail, buf, 0.0).sum(axis=1) / n_tail
+
+        quantile[t] = np.where(ready, q_val, np.nan)
+        tail_mean[t] = np.where(ready, t_val, np.nan)
+
+    return quantile, tail_mean
+
+
+def _rolling_mean_std(values: np.ndarray, window: int, min_periods: int) -> tuple:
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+
+    def prefix(a):
+        return np.concatenate([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+
+    n_p, s_p, ss_p = prefix(valid.astype("float64")), prefix(x), prefix(x * x)
+
+    hi = np.arange(1, len(values) + 1)
+    lo = np.maximum(hi - window, 0)
+
+    n = n_p[hi] - n_p[lo]
+    s = s_p[hi] - s_p[lo]
+    ss = ss_p[hi] - ss_p[lo]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s / n
+        var = (ss - s * s / n) / (n - 1)
+
+    short = n < min_periods
+    mean[short] = np.nan
+    var[short] = np.nan
+
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def rolling_var(
+    panel: PricePanel,
+    confidence: float = 0.95,
+    window: int = 250,
+    horizons=(1, 10),
+    min_periods: int | None = None,
+) -> RollingVaR:
+    """
+    Historical and parametric (normal) VaR / ES for every ticker
+    in one batched call.
+
+    Historical multi-day figures use overlapping h-day returns;
+    parametric ones scale mean by h and volatility by sqrt(h).
+    """
+    q = 1 - confidence
+    min_periods = min_periods or max(window // 2, 2)
+
+    result = RollingVaR(panel.dates, list(panel.tickers), confidence, window)
+
+    if len(panel.dates) == 0:
+        return result
+
+    daily = panel.returns(missing="nan")
+    mean, std = _rolling_mean_std(daily, window, min_periods)
+
+    z = NormalDist().inv_cdf(q)
+    pdf_z = NormalDist().pdf(z)
+
+    for h in horizons:
+        # ---- historical ----
+        if h == 1:
+            returns_h = daily
+        else:
+            returns_h = np.full_like(panel.close, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                returns_h[h:] = panel.close[h:] / panel.close[:-h] - 1
+            returns_h[~panel.observed] = np.nan
+
+        var_h, es_h = rolling_tail_quantile(returns_h, window, q, min_periods)
+
+        result.values[("historical", h, "var")] = -var_h * 100
+        result.values[("historical", h, "es")] = -es_h * 100
+
+        # ---- parametric (normal) ----
+        mu_h = mean * h
+        sigma_h = std * np.sqrt(h)
+
+        result.values[("parametric", h, "var")] = -(mu_h + z * sigma_h) * 100
+        result.values[("parametric", h, "es")] = -(mu_h - sigma_h * pdf_z / q) * 100
+
+    return result
+
+
+# --------------------------------------------------
+# Process-level cache
+# --------------------------------------------------
+
+VAR_CACHE_SIZE = 32   # (key, confidence, window) entries
+
+_VAR_CACHE = OrderedDict()
+
+
+def get_rolling_var(
+    panel: PricePanel,
+    confidence: float = 0.95,
+    window: int = 250,
+    key: str = "universe",
+) -> RollingVaR:
+    """
+    Cached VaR / ES for a panel (recomputed when the panel changes).
+    """
+    cache_key = (key, confidence, window)
+    cached = _VAR_CACHE.get(cache_key)
+
+    if cached is not None and cached[0] is panel:
+        _VAR_CACHE.move_to_end(cache_key)
+        return cached[1]
+
+    result = rolling_var(panel, confidence=confidence, window=window)
+    _VAR_CACHE[cache_key] = (panel, result)
+    _VAR_CACHE.move_to_end(cache_key)
+    while len(_VAR_CACHE) > VAR_CACHE_SIZE:
+        _VAR_CACHE.popitem(last=False)
+    return result
@@ -0,0 +1,317 @@
+import ast
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from services.indicators import get_indicators
+from services.price_panel import frame_signature
+from services.query_engine import ticker_aggregates, store_version
+
+TRADING_DAYS_52W = 252
+RESULT_CACHE_SIZE = 64
+
+# Latest-row fields available to screens (plus "stock")
+SCREEN_FIELDS = [
+    "close",
+    "volume",
+    "daily_return_pct",
+    "ma_20",
+    "ma_50",
+    "volatility_20",
+    "drawdown_pct",
+    "high_52w",
+    "prior_high_52w",
+    "low_52w",
+    "pct_from_52w_high",
+    "total_return_pct",
+]
+
+
+class ScreenError(ValueError):
+    """Invalid screen expression."""
+
+
+# --------------------------------------------------
+# Snapshot: one row per ticker (latest bar)
+# --------------------------------------------------
+
+def build_screen_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Latest-row indicator / KPI table for a long price frame
+    (Date, OHLCV, stock). Every step is a grouped vectorized op.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=["stock", "date"] + SCREEN_FIELDS)
+
+    if "ma_50" not in df.columns:
+        df = get_indicators(df)
+    else:
+        df = df.sort_values(["stock", "Date"])
+
+    groups = df.groupby("stock", sort=True)
+    last = groups.tail(1).set_index("stock")
+    year = groups.tail(TRADING_DAYS_52W).groupby("stock")
+    first_close = groups["Close"].first()
+
+    # 52-week high before the latest session (what a live price breaks)
+    prior = df[groups.cumcount(ascending=False) > 0]
+    prior_high = prior.groupby("stock").tail(TRADING_DAYS_52W).groupby("stock")["High"].max()
+
+    snapshot = pd.DataFrame({
+        "date": last["Date"],
+        "close": last["Close"],
+        "volume": last["Volume"] if "Volume" in last else np.nan,
+        "daily_return_pct": last["daily_return_pct"],
+        "ma_20": last["ma_20"],
+        "ma_50": last["ma_50"],
+        "volatility_20": last["volatility_20"],
+        "drawdown_pct": last["drawdown_pct"],
+        "high_52w": year["High"].max(),
+        "prior_high_52w": prior_high,
+        "low_52w": year["Low"].min(),
+        "total_return_pct": (last["Close"] / first_close - 1) * 100,
+    })
+    snapshot["pct_from_52w_high"] = (snapshot["close"] / snapshot["high_52w"] - 1) * 100
+
+    return snapshot.rename_axis("stock").reset_index()[["stock", "date"] + SCREEN_FIELDS]
+
+
+_SNAPSHOT_CACHE = {}
+
+
+def get_screen_snapshot(df: pd.DataFrame, key: str = "universe") -> pd.DataFrame:
+    """Cached snapshot, rebuilt when the frame changes."""
+    if df is None or df.empty:
+        return build_screen_snapshot(df)
+
+    signature = frame_signature(df)
+
+    cached = _SNAPSHOT_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    snapshot = build_screen_snapshot(df)
+    _SNAPSHOT_CACHE[key] = (signature, snapshot)
+    return snapshot
+
+
+STORE_SNAPSHOT_CACHE_SIZE = 4   # ticker sets
+
+_STORE_SNAPSHOT_CACHE = OrderedDict()   # {tickers: (store version, snapshot)}
+_store_snapshot_lock = threading.Lock()
+
+
+def get_store_snapshot(tickers=None) -> pd.DataFrame:
+    """
+    Snapshot for tickers in the parquet store, aggregated inside the
+    query engine (no history is loaded into pandas). Same columns and
+    numbers as build_screen_snapshot; cached until the store changes.
+    """
+    key = tuple(sorted(tickers)) if tickers is not None else None
+    version = store_version()
+
+    with _store_snapshot_lock:
+        cached = _STORE_SNAPSHOT_CACHE.get(key)
+        if cached is not None and cached[0] == version:
+            _STORE_SNAPSHOT_CACHE.move_to_end(key)
+            return cached[1]
+
+    snapshot = ticker_aggregates(key).rename(columns={"latest_price": "close"})
+    snapshot["pct_from_52w_high"] = (snapshot["close"] / snapshot["high_52w"] - 1) * 100
+    snapshot = snapshot[["stock", "date"] + SCREEN_FIELDS]
+
+    with _store_snapshot_lock:
+        _STORE_SNAPSHOT_CACHE[key] = (version, snapshot)
+        _STORE_SNAPSHOT_CACHE.move_to_end(key)
+        while len(_STORE_SNAPSHOT_CACHE) > STORE_SNAPSHOT_CACHE_SIZE:
+            _STORE_SNAPSHOT_CACHE.popitem(last=False)
+
+    return snapshot
+
+
+# --------------------------------------------------
+# Expression language
+# --------------------------------------------------
+#   drawdown_pct < -20 and volatility_20 > 2 and close above ma_50
+#   (stock == "XOM" or stock == "CVX") and not daily_return_pct < 0
+#
+# Comparisons (<, <=, >, >=, ==, !=, above, below, chains like
+# 1 < x < 5), arithmetic (+ - * /), and / or / not, parentheses,
+# numbers, strings, and the SCREEN_FIELDS names (case-insensitive).
+
+_WORD_OPS = [(re.compile(r"\babove\b", re.I), ">"), (re.compile(r"\bbelow\b", re.I), "<")]
+
+_COMPARE = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+_ARITH = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+}
+
+
+def _compile(node, fields: set, used: set):
+    """AST node -> function(columns dict) -> ndarray / scalar."""
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v, fields, used) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def run(cols):
+            out = np.asarray(parts[0](cols), dtype=bool)
+            for part in parts[1:]:
+                out = combine(out, np.asarray(part(cols), dtype=bool))
+            return out
+        return run
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile(node.operand, fields, used)
+        if isinstance(node.op, ast.Not):
+            return lambda cols: np.logical_not(np.asarray(operand(cols), dtype=bool))
+        if isinstance(node.op, ast.USub):
+            return lambda cols: np.negative(operand(cols))
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+    if isinstance(node, ast.Compare):
+        terms = [_compile(node.left, fields, used)] + [
+            _compile(c, fields, used) for c in node.comparators
+        ]
+        ops = []
+        for op in node.ops:
+            if type(op) not in _COMPARE:
+                raise ScreenError(f"Unsupported comparison: {type(op).__name__}")
+            ops.append(_COMPARE[type(op)])
+
+        def run(cols):
+            values = [t(cols) for t in terms]
+            out = None
+            for op, a, b in zip(ops, values, values[1:]):
+                # NaN compares False, so tickers with missing data drop out
+                result = np.asarray(op(a, b), dtype=bool)
+                out = result if out is None else np.logical_and(out, result)
+            return out
+        return run
+
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in _ARITH:
+            raise ScreenError(f"Unsupported operator: {type(node.op).__name__}")
+        left = _compile(node.left, fields, used)
+        right = _compile(node.right, fields, used)
+        fn = _ARITH[type(node.op)]
+
+        def run(cols):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return fn(left(cols), right(cols))
+        return run
+
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        if name not in fields:
+            raise ScreenError(f"Unknown field: {node.id}")
+        used.add(name)
+        return lambda cols: cols[name]
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+            and not isinstance(node.value, bool):
+        value = node.value
+        return lambda cols: value
+
+    raise ScreenError(f"Unsupported syntax: {type(node).__name__}")
+
+
+class Screen:
+    """A compiled screen expression."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+
+        source = expression.strip()
+        for pattern, op in _WORD_OPS:
+            source = pattern.sub(op, source)
+
+        if not source:
+            raise ScreenError("Empty screen expression")
+
+        try:
+            tree = ast.parse(source, mode="eval")
+        except SyntaxError as exc:
+            raise ScreenError(f"Invalid expression: {exc.msg}") from None
+
+        used = set()
+        self._fn = _compile(tree.body, set(SCREEN_FIELDS) | {"stock"}, used)
+        self.fields = sorted(used)
+
+    def mask(self, snapshot: pd.DataFrame) -> np.ndarray:
+        """Boolean mask over the snapshot rows (one vectorized pass)."""
+        cols = {
+            name: (snapshot[name].to_numpy(dtype=object) if name == "stock"
+                   else snapshot[name].to_numpy(dtype=float))
+            for name in self.fields
+        }
+        try:
+            result = np.asarray(self._fn(cols))
+        except TypeError:
+            raise ScreenError("Type mismatch (e.g. comparing stock to a number)") from None
+
+        if result.dtype != bool:
+            raise ScreenError("Expression must be a condition (e.g. close > ma_50)")
+
+        return np.broadcast_to(result, (len(snapshot),))
+
+
+@lru_cache(maxsize=128)
+def compile_screen(expression: str) -> Screen:
+    return Screen(expression)
+
+
+# --------------------------------------------------
+# Running screens
+# --------------------------------------------------
+
+_RESULT_CACHE = OrderedDict()
+
+
+def run_screen(
+    snapshot: pd.DataFrame,
+    expression: str,
+    sort_by: str | None = None,
+    descending: bool = True,
+) -> pd.DataFrame:
+    """
+    Tickers of `snapshot` matching `expression`, optionally sorted.
+    Results are cached per (snapshot, expression).
+    Raises ScreenError for invalid expressions.
+    """
+    screen = compile_screen(expression)
+
+    key = (id(snapshot), screen.expression)
+    cached = _RESULT_CACHE.get(key)
+
+    # The cache holds the snapshot itself, so an id is never reused
+    # while its entry lives; the identity check guards the rest
+    if cached is not None and cached[0] is snapshot:
+        _RESULT_CACHE.move_to_end(key)
+        matched = cached[1]
+    else:
+        matched = snapshot[screen.mask(snapshot)]
+        _RESULT_CACHE[key] = (snapshot, matched)
+        while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+
+    if sort_by is not None:
+        matched = matched.sort_values(sort_by, ascending=not descending, na_position="last")
+
+    return matched.reset_index(drop=True)
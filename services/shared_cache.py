@@ -0,0 +1,240 @@
+"""
+Host-wide cache shared by every app process.
+
+One SQLite database in WAL mode: readers never block the writer and
+each put is a single transaction, so a value is either fully visible
+to all workers or not at all. Values are pickled (DataFrames, dicts).
+
+Entries carry the time they were fetched; callers decide freshness
+with their own TTL (see services.freshness). Entries past
+MAX_AGE_SECONDS are purged, and the least recently used ones go
+once the cache grows past SIZE_BUDGET_BYTES.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+SHARED_CACHE_PATH = "data/cache/shared.sqlite"
+SIZE_BUDGET_BYTES = 256 * 1024 * 1024
+MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# last_used is refreshed at most this often per entry (saves writes)
+TOUCH_INTERVAL_SECONDS = 60
+# Eviction runs after this many bytes have been written by a process
+EVICT_EVERY_BYTES = 8 * 1024 * 1024
+
+
+class SharedCache:
+
+    def __init__(self, path: str = SHARED_CACHE_PATH, size_budget: int = SIZE_BUDGET_BYTES):
+        self.path = path
+        self.size_budget = size_budget
+        self._local = threading.local()
+        self._written = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(key) -> str:
+        return key if isinstance(key, str) else repr(key)
+
+    # --------------------------------------------------
+    # Reads / writes
+    # --------------------------------------------------
+
+    def get(self, key):
+        """(fetched_at, value) or None."""
+        k = self._key(key)
+
+        try:
+            row = self._conn().execute(
+                "SELECT value, fetched_at, last_used FROM entries WHERE key = ?", (k,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+
+        if row is None:
+            return None
+
+        blob, fetched_at, last_used = row
+        now = time.time()
+
+        if now - fetched_at > MAX_AGE_SECONDS:
+            return None
+
+        try:
+            value = pickle.loads(blob)
+        except Exception:
+            return None
+
+        if now - last_used > TOUCH_INTERVAL_SECONDS:
+            try:
+                with self._conn() as conn:
+                    conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, k))
+            except sqlite3.Error:
+                pass
+
+        return fetched_at, value
+
+    def put(self, key, value, fetched_at: float | None = None) -> bool:
+        """
+        Store `value` unless a newer copy is already there.
+        Returns False if the value can't be pickled or written.
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+
+        fetched_at = time.time() if fetched_at is None else fetched_at
+
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO entries (key, value, size, fetched_at, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = excluded.value,
+                        size = excluded.size,
+                        fetched_at = excluded.fetched_at,
+                        last_used = excluded.last_used
+                    WHERE excluded.fetched_at >= entries.fetched_at
+                    """,
+                    (self._key(key), blob, len(blob), fetched_at, time.time()),
+                )
+        except sqlite3.Error:
+            return False
+
+        with self._lock:
+            self._written += len(blob)
+            evict = self._written >= EVICT_EVERY_BYTES
+            if evict:
+                self._written = 0
+
+        if evict:
+            self.evict()
+
+        return True
+
+    def remember(self, key, compute_fn, ttl: float):
+        """
+        Value for `key` if another process (or this one) computed it
+        less than `ttl` seconds ago; otherwise compute and share it.
+        """
+        cached = self.get(key)
+        if cached is not None and time.time() - cached[0] < ttl:
+            return cached[1]
+
+        value = compute_fn()
+        self.put(key, value)
+        return value
+
+    # --------------------------------------------------
+    # Maintenance
+    # --------------------------------------------------
+
+    def evict(self):
+        """Purge expired entries, then LRU entries down to the budget."""
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "DELETE FROM entries WHERE fetched_at < ?",
+                    (time.time() - MAX_AGE_SECONDS,),
+                )
+
+                total = conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+                if total <= self.size_budget:
+                    return
+
+                # Oldest-used first until what remains fits
+                conn.execute(
+                    """
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key,
+                                   sum(size) OVER (ORDER BY last_used DESC) AS kept
+                            FROM entries
+                        )
+                        WHERE kept > ?
+                    )
+                    """,
+                    (self.size_budget,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        try:
+            entries, size = self._conn().execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = 0, 0
+        return {"entries": entries, "bytes": size}
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM entries")
+
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """Process-wide handle on the host's shared cache."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache()
+        return _cache
+
+
+def try_shared_cache() -> SharedCache | None:
+    """
+    get_shared_cache(), or None if the cache can't be opened (e.g. no
+    writable cache dir). A failure is remembered: the process then
+    runs with process-local caches instead of retrying on every call.
+    """
+    global _cache_failed
+
+    if _cache_failed:
+        return None
+
+    try:
+        return get_shared_cache()
+    except Exception:
+        _cache_failed = True
+        return None
@@ -0,0 +1,188 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from services.query_engine import PRICE_COLUMNS, iter_prices, store_version
+
+# Columns with a precomputed sort order (the "index")
+INDEXED_COLUMNS = ("Date", "stock", "Close", "Volume", "daily_return_pct")
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+# --------------------------------------------------
+# Columnar table with per-column sort indexes
+# --------------------------------------------------
+
+@dataclass
+class TableView:
+    """
+    A columnar (Arrow) table queried server side.
+
+    Filters touch only the filtered columns, sorting uses a cached
+    argsort per indexed column, and only the requested page is
+    materialized as a DataFrame.
+    """
+
+    table: pa.Table
+    _sort_index: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def columns(self) -> list:
+        return self.table.column_names
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def indexed_columns(self) -> list:
+        return [c for c in INDEXED_COLUMNS if c in self.table.column_names]
+
+    def sort_index(self, column: str, descending: bool = False) -> np.ndarray:
+        """Row order for an indexed column (nulls last), built once per direction."""
+        key = (column, descending)
+
+        if key not in self._sort_index:
+            indices = pc.sort_indices(
+                self.table,
+                sort_keys=[(column, "descending" if descending else "ascending")],
+                null_placement="at_end",
+            )
+            self._sort_index[key] = indices.to_numpy()
+
+        return self._sort_index[key]
+
+    def mask(self, start=None, end=None, tickers=None, ranges=None) -> np.ndarray | None:
+        """
+        Boolean row mask for the filters (None = no filter).
+        `ranges` is {column: (low, high)}, either bound may be None.
+        """
+        conditions = []
+
+        if start is not None:
+            conditions.append(pc.greater_equal(self.table["Date"], pa.scalar(pd.Timestamp(start))))
+        if end is not None:
+            # Whole end day included
+            end = pd.Timestamp(end) + pd.Timedelta(days=1)
+            conditions.append(pc.less(self.table["Date"], pa.scalar(end)))
+        if tickers and "stock" in self.table.column_names:
+            conditions.append(pc.is_in(self.table["stock"], value_set=pa.array(list(tickers))))
+
+        for column, (low, high) in (ranges or {}).items():
+            if low is not None:
+                conditions.append(pc.greater_equal(self.table[column], low))
+            if high is not None:
+                conditions.append(pc.less_equal(self.table[column], high))
+
+        if not conditions:
+            return None
+
+        combined = conditions[0]
+        for condition in conditions[1:]:
+            combined = pc.and_kleene(combined, condition)
+
+        return pc.fill_null(combined, False).to_numpy(zero_copy_only=False)
+
+    def query(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        sort_by: str | None = None,
+        descending: bool = False,
+        columns=None,
+        **filters,
+    ) -> tuple:
+        """
+        One page of the filtered, sorted table.
+        Returns (page DataFrame, matching rows, number of pages).
+        """
+        if sort_by is not None:
+            rows = self.sort_index(sort_by, descending)
+        else:
+            rows = np.arange(self.num_rows)
+
+        keep = self.mask(**filters)
+        if keep is not None:
+            rows = rows[keep[rows]]
+
+        total = len(rows)
+        pages = max(math.ceil(total / page_size), 1)
+        page = min(max(page, 1), pages)
+
+        page_rows = rows[(page - 1) * page_size:page * page_size]
+
+        table = self.table if not columns else self.table.select(
+            [c for c in self.columns if c in columns]
+        )
+        page_df = table.take(pa.array(page_rows)).to_pandas()
+
+        return page_df, total, pages
+
+
+def view_from_frame(df: pd.DataFrame) -> TableView:
+    return TableView(pa.Table.from_pandas(df, preserve_index=False))
+
+
+def view_from_store(tickers=None) -> TableView:
+    """
+    Bars for `tickers` from the parquet price store (services.query_engine),
+    streamed batch by batch into one Arrow table (no full pandas copy).
+    """
+    batches = [pa.Table.from_pandas(b, preserve_index=False) for b in iter_prices(tickers)]
+
+    if not batches:
+        return view_from_frame(pd.DataFrame(columns=PRICE_COLUMNS))
+    return TableView(pa.concat_tables(batches))
+
+
+# --------------------------------------------------
+# Process-level cache
+# --------------------------------------------------
+
+VIEW_CACHE_SIZE = 32   # (key) entries
+
+_VIEW_CACHE = OrderedDict()   # {key: (signature, view)}
+_view_lock = threading.Lock()
+
+
+def _cached_view(key, signature, build) -> TableView:
+    with _view_lock:
+        cached = _VIEW_CACHE.get(key)
+        if cached is not None and cached[0] == signature:
+            _VIEW_CACHE.move_to_end(key)
+            return cached[1]
+
+    view = build()
+
+    with _view_lock:
+        _VIEW_CACHE[key] = (signature, view)
+        _VIEW_CACHE.move_to_end(key)
+        while len(_VIEW_CACHE) > VIEW_CACHE_SIZE:
+            _VIEW_CACHE.popitem(last=False)
+
+    return view
+
+
+def get_table_view(df: pd.DataFrame, key: str) -> TableView:
+    """Cached view of an in-memory frame, rebuilt when the frame changes."""
+    signature = (
+        len(df),
+        df["Date"].min(),
+        df["Date"].max(),
+        tuple(df.columns),
+        tuple(df["stock"].unique()) if "stock" in df.columns else None,
+    )
+
+    return _cached_view(key, signature, lambda: view_from_frame(df))
+
+
+def get_store_view(tickers=None) -> TableView:
+    """Cached view of the price store, reloaded when the store changes."""
+    key = ("store", tuple(sorted(tickers)) if tickers is not None else None)
+    return _cached_view(key, store_version(), lambda: view_from_store(tickers))
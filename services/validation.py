@@ -0,0 +1,200 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+QUARANTINE_DIR = "data/cache/quarantine"
+
+SPIKE_RATIO = 10.0        # bar vs both neighbours (or vs previous, for the newest bar)
+STALE_RUN_BARS = 5        # identical closes in a row before repeats count as stale
+
+# Checks in report / priority order
+CHECKS = [
+    "duplicate_date",
+    "non_positive_price",
+    "ohlc_inconsistent",
+    "zero_volume",
+    "stale_close",
+    "price_spike",
+]
+
+_reports = {}        # {key: per-ticker report}
+_quarantined = {}    # {key: quarantined rows}
+_lock = threading.Lock()
+
+
+def _check_masks(df: pd.DataFrame) -> dict:
+    """
+    Every check as a boolean mask over `df` (sorted by stock, Date).
+    Neighbour comparisons use plain shifted arrays with a same-ticker
+    mask, so the whole universe is one pass with no per-ticker groupby.
+    """
+    n = len(df)
+    stock = df["stock"].to_numpy()
+    dates = df["Date"].to_numpy()
+
+    o = df["Open"].to_numpy(dtype=float)
+    h = df["High"].to_numpy(dtype=float)
+    l = df["Low"].to_numpy(dtype=float)
+    c = df["Close"].to_numpy(dtype=float)
+    v = df["Volume"].to_numpy(dtype=float) if "Volume" in df.columns else np.full(n, np.nan)
+
+    same_prev = np.zeros(n, dtype=bool)
+    same_prev[1:] = stock[1:] == stock[:-1]
+    same_next = np.zeros(n, dtype=bool)
+    same_next[:-1] = same_prev[1:]
+
+    prev_c = np.roll(c, 1)
+    next_c = np.roll(c, -1)
+
+    # ---------------- Duplicates (the last copy wins) ----------------
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[:-1] = same_next[:-1] & (dates[:-1] == dates[1:])
+
+    # ---------------- Price sanity ----------------
+    with np.errstate(invalid="ignore"):
+        non_positive = (c <= 0) | (o <= 0) | (h <= 0) | (l <= 0)
+
+        # NaN open/high/low compare False and are not flagged here
+        inconsistent = (
+            (h < l)
+            | (h < np.fmax(o, c) * (1 - 1e-9))
+            | (l > np.fmin(o, c) * (1 + 1e-9))
+        )
+
+    # ---------------- Zero volume ----------------
+    # Only for tickers that normally report volume (benchmarks /
+    # some exchanges report 0 on every bar)
+    starts = np.flatnonzero(~same_prev)
+    sizes = np.diff(np.append(starts, n))
+    has_volume = np.repeat(np.logical_or.reduceat(v > 0, starts), sizes)
+    zero_volume = (v == 0) & has_volume
+
+    # ---------------- Stale closes ----------------
+    repeat = same_prev & (c == prev_c)
+    run_start = np.where(~repeat, np.arange(n), 0)
+    np.maximum.accumulate(run_start, out=run_start)
+    stale = (np.arange(n) - run_start) >= STALE_RUN_BARS
+
+    # ---------------- Spikes (jump and revert) ----------------
+    with np.errstate(divide="ignore", invalid="ignore"):
+        up_prev = np.where(same_prev, c / prev_c, np.nan)
+        up_next = np.where(same_next, c / next_c, np.nan)
+
+    low = 1 / SPIKE_RATIO
+    spike = (
+        ((up_prev >= SPIKE_RATIO) & ((up_next >= SPIKE_RATIO) | ~same_next))
+        | ((up_prev <= low) & ((up_next <= low) | ~same_next))
+    )
+
+    return {
+        "duplicate_date": duplicate,
+        "non_positive_price": non_positive,
+        "ohlc_inconsistent": inconsistent,
+        "zero_volume": zero_volume,
+        "stale_close": stale,
+        "price_spike": spike,
+    }
+
+
+def validate_prices(df: pd.DataFrame):
+    """
+    Run all data-quality checks over a long price frame
+    (Date, OHLCV, stock).
+
+    Returns (clean DataFrame, quarantined rows with an `issue`
+    column, per-ticker report DataFrame).
+    """
+    if df is None or df.empty:
+        return df, pd.DataFrame(), pd.DataFrame(columns=["stock", "rows", "quarantined"] + CHECKS)
+
+    df = df.sort_values(["stock", "Date"], kind="stable").reset_index(drop=True)
+    masks = _check_masks(df)
+
+    flags = np.column_stack([masks[name] for name in CHECKS])
+    bad = flags.any(axis=1)
+
+    quarantine = df[bad].copy()
+    # First failing check, in CHECKS order
+    quarantine["issue"] = np.array(CHECKS)[flags[bad].argmax(axis=1)]
+
+    # Rows are grouped by ticker, so per-ticker counts are segment sums
+    stock = df["stock"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, stock[1:] != stock[:-1]])
+    counts = np.add.reduceat(np.column_stack([bad, flags]).astype(int), starts, axis=0)
+
+    report = pd.DataFrame(counts, columns=["quarantined"] + CHECKS)
+    report.insert(0, "rows", np.diff(np.append(starts, len(df))))
+    report.insert(0, "stock", stock[starts])
+
+    return df[~bad].reset_index(drop=True), quarantine.reset_index(drop=True), report
+
+
+def _merge_by_stock(old, new: pd.DataFrame, tickers) -> pd.DataFrame:
+    """Replace the rows of `tickers` in `old` with `new`."""
+    if old is None or old.empty:
+        return new
+    return pd.concat([old[~old["stock"].isin(tickers)], new], ignore_index=True)
+
+
+def validate_and_quarantine(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Validate `df` and record the result under `key` (e.g. "universe"):
+    the per-ticker report is kept in memory, quarantined rows are
+    persisted (atomically, only when they change). Tickers not in
+    `df` keep their earlier entries.
+    Returns the clean frame.
+    """
+    clean, quarantine, report = validate_prices(df)
+
+    if df is None or df.empty:
+        return clean
+
+    tickers = report["stock"].unique()
+
+    with _lock:
+        _reports[key] = _merge_by_stock(_reports.get(key), report, tickers)
+
+        previous = _quarantined.get(key)
+        merged = _merge_by_stock(previous, quarantine, tickers)
+        _quarantined[key] = merged
+
+        changed = previous is None or not merged.equals(previous)
+
+    if changed:
+        _write_quarantine(key, merged)
+
+    return clean
+
+
+def _write_quarantine(key: str, rows: pd.DataFrame):
+    path = os.path.join(QUARANTINE_DIR, f"{key}.parquet")
+
+    if rows.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    os.makedirs(QUARANTINE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    rows.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def get_quality_reports() -> dict:
+    """{key: per-ticker report} for validations run in this process."""
+    with _lock:
+        return dict(_reports)
+
+
+def read_quarantine(key: str) -> pd.DataFrame:
+    with _lock:
+        rows = _quarantined.get(key)
+    if rows is not None:
+        return rows
+
+    path = os.path.join(QUARANTINE_DIR, f"{key}.parquet")
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_parquet(path)
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services import async_provider, provider
+
+
+def _chart(price: float, previous_close: float) -> dict:
+    return {
+        "chart": {
+            "result": [{
+                "meta": {"regularMarketPrice": price, "previousClose": previous_close},
+                "timestamp": [1_700_000_000],
+                "indicators": {"quote": [{
+                    "open": [price], "high": [price], "low": [price],
+                    "close": [price], "volume": [100],
+                }]},
+            }],
+            "error": None,
+        }
+    }
+
+
+class _ChartHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        ticker = self.path.split("?")[0].rsplit("/", 1)[-1]
+
+        if ticker == "MISSING":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = json.dumps(_chart(110.0, 100.0)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChartHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_quotes_from_stub_server(stub_url, monkeypatch):
+    monkeypatch.setattr(provider, "_bucket", provider.TokenBucket(rate=1000.0, capacity=100))
+
+    quotes = async_provider.fetch_quotes(["XOM", "MISSING"], base_url=stub_url, timeout=2.0)
+
+    assert quotes["XOM"] == {
+        "current_price": 110.0,
+        "previous_close": 100.0,
+        "pct_change": pytest.approx(10.0),
+    }
+    assert quotes["MISSING"] == {}
+
+
+def test_throttle_wait_is_bounded_by_timeout(stub_url, monkeypatch):
+    # 2 tokens up front, then one every 10s: most tickers can't get one in time
+    monkeypatch.setattr(provider, "_bucket", provider.TokenBucket(rate=0.1, capacity=2))
+    tickers = [f"T{i}" for i in range(40)]
+
+    start = time.monotonic()
+    quotes = async_provider.fetch_quotes(tickers, base_url=stub_url, timeout=0.5)
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 2.0
+    assert sum(1 for q in quotes.values() if q) == 2
+    assert set(quotes) == set(tickers)
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from millify import millify
 
 
@@ -33,3 +35,12 @@ def normalize_series(series):
     Normalize a price series for comparison charts.
     """
     return series / series.iloc[0] * 100
+
+
+def format_as_of(timestamp):
+    """
+    Format a fetch timestamp (epoch seconds) for "as of" captions.
+    """
+    if timestamp is None:
+        return "N/A"
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
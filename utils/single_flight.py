@@ -0,0 +1,100 @@
+import functools
+import threading
+
+
+class _Call:
+    """One in-flight call that followers wait on."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_lock = threading.Lock()
+
+# Simple counters, handy when checking how much traffic got coalesced
+stats = {"calls": 0, "coalesced": 0}
+
+
+def single_flight(key, fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) once per key at a time.
+
+    Streamlit runs every session in its own thread, so when several
+    sessions ask for the same ticker at once, the first caller (leader)
+    does the fetch and everyone else blocks until it finishes and then
+    shares the result (or the exception).
+
+    Every caller receives its own copy of the result: `.copy()` when
+    available, applied to the values of dict / list / tuple results too,
+    so a session mutating its DataFrame can't affect another session.
+    """
+    with _lock:
+        stats["calls"] += 1
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _inflight[key] = call
+        else:
+            stats["coalesced"] += 1
+
+    if not leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return _copy(call.result)
+
+    try:
+        call.result = fn(*args, **kwargs)
+    except BaseException as exc:
+        call.error = exc
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        call.event.set()
+
+    return _copy(call.result)
+
+
+def coalesce(fn):
+    """
+    Decorator form of single_flight, keyed on the function and its
+    (hashable) arguments.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__module__, fn.__qualname__, _freeze(args), _freeze(kwargs))
+        return single_flight(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        return tuple(_freeze(v) for v in items)
+    return value
+
+
+def _copy(result):
+    """Copy of a result, down into dict / list / tuple containers."""
+    if isinstance(result, dict):
+        return {k: _copy(v) for k, v in result.items()}
+    if isinstance(result, list):
+        return [_copy(v) for v in result]
+    if isinstance(result, tuple):
+        items = [_copy(v) for v in result]
+        # namedtuples take their fields positionally
+        return type(result)(*items) if hasattr(result, "_fields") else tuple(items)
+
+    copy = getattr(result, "copy", None)
+    return copy() if callable(copy) else result
@@ -0,0 +1,21 @@
+import time
+from contextlib import contextmanager
+
+# {label: seconds} – cold import cost, measured on first import only
+import_times = {}
+
+
+@contextmanager
+def measure_imports(label: str):
+    """
+    Time the imports inside the block.
+    Only the first (cold) run is recorded; later reruns hit
+    sys.modules and would just report ~0.
+    """
+    start = time.perf_counter()
+    yield
+    import_times.setdefault(label, time.perf_counter() - start)
+
+
+def get_import_times() -> dict:
+    return dict(import_times)